@@ -126,8 +126,18 @@ export default function Home() {
       headers: { 'Content-Type': 'application/json' },
       body: JSON.stringify({ path }),
     });
-    const json = await res.json();
-    toast.success('Indexed', { description: `Chunks: ${json.chunks_indexed}` });
+    let job = await res.json();
+    toast('Indexing started', { description: `Job ${job.id}` });
+    // indexing runs in the background; poll until it settles
+    while (job.state === 'queued' || job.state === 'running') {
+      await new Promise((r) => setTimeout(r, 1000));
+      job = await fetch(`${API_BASE}/jobs/${job.id}`).then((r) => r.json());
+    }
+    if (job.state === 'done') {
+      toast.success('Indexed', { description: `Chunks: ${job.result?.chunks_indexed ?? 0}` });
+    } else {
+      toast.error('Indexing failed', { description: job.error });
+    }
   }
 
   async function runDigest() {
@@ -362,7 +372,9 @@ export default function Home() {
                       <Rocket className="h-4 w-4" /> Onboarding Plan
                     </div>
                     <div className="text-sm mt-1">Path: {onboard.path}</div>
-                    <div className="text-sm">Chunks indexed: {onboard.chunks_indexed}</div>
+                    <div className="text-sm">
+                      {onboard.index_job ? `Indexing in background (job ${onboard.index_job})` : `Chunks indexed: ${onboard.chunks_indexed}`}
+                    </div>
                     <Separator className="my-3" />
                     <div className="text-sm font-medium mb-1">Quick links</div>
                     <ul className="text-sm space-y-1">
@@ -1,12 +1,36 @@
 import typer
-from repoguide_indexer.index_repo import index_local_repo
 
 app = typer.Typer(add_completion=False)
 
 @app.command()
 def index(path: str = "."):
+    from repoguide_indexer.index_repo import index_local_repo
+
     count = index_local_repo(path)
-    typer.echo(f"Indexed {count} files from {path} (stub).")
+    typer.echo(f"Embedded {count} new or changed chunk(s) from {path}.")
+
+@app.command()
+def watch(
+    path: str = typer.Argument("."),
+    quiet_ms: int = typer.Option(None, help="Quiet period before a burst of edits is indexed."),
+    max_ms: int = typer.Option(None, help="Longest a continuous burst is held back."),
+    poll: bool = typer.Option(False, help="Poll file stats instead of OS notifications."),
+):
+    """Keep the index in step with PATH: re-index changed files as they are saved."""
+    from repoguide_indexer.watch import watch_repo
+
+    def report(p):
+        what = "full pass" if p.paths is None else f"{len(p.paths)} path(s)"
+        if p.error:
+            typer.echo(f"{what}: failed ({p.error}); will retry", err=True)
+        else:
+            typer.echo(f"{what}: embedded {p.embedded} chunk(s) in {p.seconds}s")
+
+    typer.echo(f"Watching {path} (Ctrl-C to stop)")
+    try:
+        watch_repo(path, quiet_ms=quiet_ms, max_ms=max_ms, poll=poll, on_pass=report)
+    except KeyboardInterrupt:
+        pass
 
 if __name__ == "__main__":
     app()
@@ -0,0 +1,128 @@
+# src/repoguide_api/jobs.py
+from __future__ import annotations
+import logging, threading, uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+from repoguide_config.env import env_int
+from repoguide_indexer.progress import IndexProgress
+from repoguide_schemas.models import JobProgress, JobStatus
+
+log = logging.getLogger("repoguide.jobs")
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    path: str
+    state: str = "queued"
+    progress: IndexProgress = field(default_factory=IndexProgress)
+    result: dict | None = None
+    error: str | None = None
+
+    def status(self) -> JobStatus:
+        snap = self.progress.snapshot() if self.state != "queued" else {}
+        return JobStatus(
+            id=self.id, kind=self.kind, path=self.path, state=self.state,
+            progress=JobProgress(**snap), result=self.result, error=self.error,
+        )
+
+class JobManager:
+    """Runs long indexing work off the request threads.
+
+    A fixed pool of ``workers`` threads drains the queue, so a burst of
+    /index calls cannot starve the threadpool that serves /explain. A job
+    submitted while an identical one (same kind + path) is still queued is
+    merged into it; one submitted while it runs is queued as a single
+    follow-up that starts when it ends, so edits the running walk already
+    passed are still picked up. The last ``keep`` finished jobs stay queryable.
+    """
+
+    def __init__(self, workers: int = 2, keep: int = 200):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="repoguide-job")
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._queued: dict[tuple[str, str], tuple[Job, Callable[[IndexProgress], Any]]] = {}
+        self._running: dict[tuple[str, str], Job] = {}
+        self._keep = keep
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, kind: str, path: str, fn: Callable[[IndexProgress], dict]) -> Job:
+        key = (kind, str(Path(path).resolve()))
+        with self._lock:
+            if key in self._queued:
+                return self._queued[key][0]
+            job = Job(id=uuid.uuid4().hex[:12], kind=kind, path=path)
+            self._queued[key] = (job, fn)
+            self._jobs[job.id] = job
+            self._trim()
+            start = key not in self._running  # else _run starts it once the current one ends
+        if start:
+            self._pool.submit(self._run, key)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, key: tuple[str, str]) -> None:
+        with self._lock:
+            if self._closed or key not in self._queued:
+                return
+            job, fn = self._queued.pop(key)
+            self._running[key] = job
+            job.state = "running"
+        try:
+            job.result = fn(job.progress)
+            job.state = "done"
+        except Exception as e:
+            log.exception("job %s (%s %s) failed", job.id, job.kind, job.path)
+            job.error = f"{type(e).__name__}: {e}"
+            job.state = "failed"
+        finally:
+            with self._lock:
+                del self._running[key]
+                follow = key in self._queued and not self._closed
+            if follow:
+                self._pool.submit(self._run, key)
+
+    def _trim(self) -> None:
+        finished = [jid for jid, j in self._jobs.items() if j.state in ("done", "failed")]
+        for jid in finished[: max(0, len(self._jobs) - self._keep)]:
+            del self._jobs[jid]
+
+    def shutdown(self) -> None:
+        """Fail queued jobs, cancel running ones and wait for them to stop.
+
+        A cancelled index run keeps the files it finished (see
+        index_local_repo), so nothing is left half-written for the store
+        and caches that get closed after this.
+        """
+        with self._lock:
+            self._closed = True
+            for job, _ in self._queued.values():
+                job.state, job.error = "failed", "cancelled: server shutting down"
+            self._queued.clear()
+            for job in self._running.values():
+                job.progress.cancel.set()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+_manager: JobManager | None = None
+_manager_lock = threading.Lock()
+
+def get_jobs() -> JobManager:
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager(workers=env_int("REPOGUIDE_JOB_WORKERS", 2))
+        return _manager
+
+def close_jobs() -> None:
+    global _manager
+    with _manager_lock:
+        m, _manager = _manager, None
+    if m is not None:
+        m.shutdown()
@@ -1,16 +1,66 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from repoguide_indexer.index_repo import index_local_repo
-import os
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+import logging, os, threading
 
-from repoguide_schemas.models import Answer, APIInfo, Citation, PreflightReport, ChangeDigestReport, OnboardReport
+from repoguide_schemas.models import (
+    Answer, BatchAnswer, APIInfo, Citation, PreflightReport, BulkPreflightReport, ChangeDigestReport, OnboardReport, OnboardAction, JobStatus,
+)
 from repoguide_tools.onboard import run_onboard
 from repoguide_tools.changedigest import change_digest
-from repoguide_retriever.hybrid import explain_from_qdrant
-from repoguide_tools.preflight import run_preflight
-
-app = FastAPI(title="RepoGuide API", version="0.1.0")
+from repoguide_tools.preflight import close_preflight, find_project_roots, run_preflight, run_preflight_bulk
+from repoguide_retriever.answer_cache import close_answer_cache, get_answer_cache
+from repoguide_indexer import routes
+from repoguide_store.backend import close_store, collections_for, get_store
+from repoguide_store.base import VectorStore
+from repoguide_api.jobs import close_jobs, get_jobs
+from repoguide_metrics import timing
+
+log = logging.getLogger("repoguide.api")
+
+# The retriever, indexer, embedding client (httpx, numpy) and vector store
+# (qdrant_client) are imported on first use, not at module load, so workers
+# start fast and /health answers while they load in the background.
+COLLECTION = "repoguide_docs"
+_ready = threading.Event()
+
+def _warm_up() -> None:
+    # Build the shared clients once so requests never pay for construction
+    # or a cold connection; handlers get them through Depends().
+    from repoguide_embeddings import client as embeddings
+    from repoguide_retriever import hybrid  # noqa: F401 (import cost only)
+
+    try:
+        get_store().collection_exists(COLLECTION)
+    except Exception as e:  # Qdrant may come up after us; /health must still work
+        log.warning("vector store warm-up failed: %s", e)
+    try:
+        embeddings.get_client()
+    except KeyError:
+        log.warning("AZURE_OPENAI_* not set; /explain and /index will fail")
+    _ready.set()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm = threading.Thread(target=_warm_up, name="repoguide-warm-up", daemon=True)
+    warm.start()
+    get_answer_cache()
+    yield
+    warm.join()
+    close_jobs()
+    from repoguide_embeddings import client as embeddings
+    embeddings.close_client()
+    _ready.clear()
+    close_answer_cache()
+    close_preflight()
+    close_store()
+
+def vector_store() -> VectorStore:
+    return get_store()
+
+app = FastAPI(title="RepoGuide API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,21 +68,27 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+app.add_middleware(timing.TimingMiddleware)
 
 class ExplainRequest(BaseModel):
     question: str
+    scope: str | None = None  # "myrepo" or "repo:myrepo path:src/api lang:python"
+
+class ExplainBatchRequest(BaseModel):
+    questions: list[str] = Field(min_length=1, max_length=256)
     scope: str | None = None
 
 class PreflightRequest(BaseModel):
     path: str = "/app/src/demo_repo"
 
-class IndexRequest(BaseModel):
-    path: str
+class BulkPreflightRequest(BaseModel):
+    paths: list[str] = []
+    root: str | None = None     # scan every project under this directory too
 
-class IndexResponse(BaseModel):
+class IndexRequest(BaseModel):
     path: str
-    chunks_indexed: int
 
 class ChangeDigestRequest(BaseModel):
     path: str = "/app/src/demo_repo"
@@ -42,9 +98,25 @@ class OnboardRequest(BaseModel):
     path: str = "/app/src/demo_repo"
     index: bool = False
 
+def _submit_index(path: str, vs: VectorStore):
+    from repoguide_indexer.index_repo import index_local_repo
+
+    # /index and /onboard?index=true share a kind, so they merge per path
+    return get_jobs().submit(
+        "index", path,
+        lambda progress: {"chunks_indexed": index_local_repo(path, store=vs, progress=progress)},
+    )
+
 @app.post("/onboard", response_model=OnboardReport)
-def onboard(req: OnboardRequest):
-    return run_onboard(req.path, do_index=req.index)
+def onboard(req: OnboardRequest, vs: VectorStore = Depends(vector_store)):
+    report = run_onboard(req.path)
+    if req.index:
+        job = _submit_index(req.path, vs)
+        report.index_job = job.id
+        report.next_steps.insert(0, OnboardAction(
+            name="Index repository", status="todo", detail=f"Indexing in the background: GET /jobs/{job.id}",
+        ))
+    return report
 
 @app.post("/change-digest", response_model=ChangeDigestReport)
 def change_digest_route(req: ChangeDigestRequest):
@@ -53,29 +125,69 @@ def change_digest_route(req: ChangeDigestRequest):
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "qdrant_url": os.getenv("QDRANT_URL")}
+    cache = get_answer_cache()
+    return {
+        "status": "ok",
+        "ready": _ready.is_set(),  # vector store and embedding client loaded
+        "vector_store": os.getenv("REPOGUIDE_VECTOR_STORE", "qdrant"),
+        "qdrant_url": os.getenv("QDRANT_URL"),
+        "answer_cache": cache.stats() if cache else None,
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(timing.render(), media_type="text/plain; version=0.0.4")
 
 @app.post("/explain", response_model=Answer)
-def explain(req: ExplainRequest):
-    ans = explain_from_qdrant(req.question, req.scope)
+def explain(req: ExplainRequest, vs: VectorStore = Depends(vector_store)):
+    from repoguide_retriever.hybrid import explain_from_qdrant
+
+    ans = explain_from_qdrant(req.question, req.scope, store=vs)
     if not ans:
         raise HTTPException(status_code=404, detail="NEEDS_MORE_CONTEXT")
     return ans
 
+@app.post("/explain/batch", response_model=BatchAnswer)
+def explain_many(req: ExplainBatchRequest, vs: VectorStore = Depends(vector_store)):
+    from repoguide_retriever.hybrid import explain_batch
+
+    return BatchAnswer(answers=explain_batch(req.questions, req.scope, store=vs))
+
 @app.post("/preflight", response_model=PreflightReport)
 def preflight(req: PreflightRequest):
     return run_preflight(req.path)
 
-@app.post("/index", response_model=IndexResponse)
-def index_repo(req: IndexRequest):
-    n = index_local_repo(req.path)
-    return IndexResponse(path=req.path, chunks_indexed=n)
+@app.post("/preflight/bulk", response_model=BulkPreflightReport)
+def preflight_bulk(req: BulkPreflightRequest):
+    paths = list(req.paths)
+    if req.root:
+        paths += find_project_roots(req.root)
+    return run_preflight_bulk(paths)
+
+@app.post("/index", response_model=JobStatus, status_code=202)
+def index_repo(req: IndexRequest, vs: VectorStore = Depends(vector_store)):
+    return _submit_index(req.path, vs).status()
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+def job_status(job_id: str):
+    job = get_jobs().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job.status()
+
+def _cite(repo: str, span: tuple[str, int, int]) -> Citation:
+    return Citation(source=repo, file=span[0], start_line=span[1], end_line=span[2], url="")
 
 @app.get("/api-info", response_model=APIInfo)
-def api_info(route: str = "/", method: str = "GET"):
+def api_info(route: str = "/", method: str = "GET", repo: str | None = None):
+    # answered from the route table the indexer compiles; no source is read here
+    method = method.upper()
+    handlers, tests = routes.lookup(method, route, collections_for(COLLECTION, repo), repo)
+    if not handlers and not tests:
+        raise HTTPException(status_code=404, detail="UNKNOWN_ROUTE")
     example = f"curl -X {method} http://localhost:8000{route} -H 'Authorization: Bearer <token>'"
     return APIInfo(
         route=route, method=method, example_curl=example,
-        code_paths=[Citation(source="repo", file="app/routes.py", start_line=10, end_line=40, url="")],
-        tests=[Citation(source="repo", file="tests/test_routes.py", start_line=1, end_line=30, url="")]
+        code_paths=[_cite(r, s) for r, s in handlers],
+        tests=[_cite(r, s) for r, s in tests],
     )
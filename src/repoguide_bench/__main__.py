@@ -0,0 +1,41 @@
+# src/repoguide_bench/__main__.py
+import json
+from pathlib import Path
+
+import typer
+
+from repoguide_bench.run import BenchConfig, compare, run
+
+app = typer.Typer(add_completion=False)
+
+@app.command()
+def bench(
+    files: int = 200,
+    file_bytes: int = 4000,
+    queries: int = 100,
+    dim: int = 1536,
+    embed_latency_ms: float = 0.0,
+    seed: int = 0,
+    store: str = typer.Option("qdrant", help="Vector store backend: qdrant (in-memory) or local."),
+    out: Path = typer.Option(None, help="Write the JSON report here as well as to stdout."),
+    baseline: Path = typer.Option(None, help="Earlier report; exit 1 if a metric regressed."),
+    tolerance: float = 0.2,
+):
+    cfg = BenchConfig(
+        files=files, file_bytes=file_bytes, queries=queries, dim=dim,
+        embed_latency_ms=embed_latency_ms, seed=seed, store=store,
+    )
+    result = run(cfg)
+    text = json.dumps(result, indent=2)
+    typer.echo(text)
+    if out:
+        out.write_text(text + "\n", encoding="utf-8")
+    if baseline:
+        regressions = compare(result, json.loads(baseline.read_text(encoding="utf-8")), tolerance)
+        for r in regressions:
+            typer.echo(f"REGRESSION {r}", err=True)
+        if regressions:
+            raise typer.Exit(1)
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,89 @@
+# src/repoguide_bench/fake_embed.py
+from __future__ import annotations
+import base64, hashlib, json, threading, time
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def fake_vector(text: str, dim: int = 8) -> list[float]:
+    """Deterministic pseudo-embedding: sha256 bytes of the text, stretched to ``dim``."""
+    raw = hashlib.sha256(text.encode()).digest()
+    i = 0
+    while len(raw) < dim:
+        i += 1
+        raw += hashlib.sha256(f"{i}\0{text}".encode()).digest()
+    return [b / 255.0 for b in raw[:dim]]
+
+class FakeEmbeddingServer:
+    """Azure-shaped /embeddings endpoint with knobs for throttling and failures.
+
+    Answers every POST with ``fake_vector`` embeddings of the inputs, so runs
+    are reproducible and need no network. ``delay`` simulates service latency.
+    """
+
+    def __init__(self, dim: int = 8, delay: float = 0.0):
+        self.dim = dim
+        self.calls: list[list[str]] = []  # input batches, in arrival order
+        self.throttle = 0           # answer the next N requests with 429
+        self.fail_after = None      # answer 400 once this many batches were served
+        self.max_request_chars = None  # answer 400 "maximum context length" to bigger batches
+        self.delay = delay
+        self.active = self.peak = 0
+        self._lock = threading.Lock()
+        srv = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real service
+            disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+            def log_message(self, *a):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                status, payload, headers = srv._handle(body["input"], body.get("encoding_format", "float"))
+                raw = json.dumps(payload).encode()
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def _handle(self, texts, encoding="float"):
+        with self._lock:
+            if self.throttle:
+                self.throttle -= 1
+                return 429, {"error": "throttled"}, {"Retry-After": "0"}
+            if self.fail_after is not None and len(self.calls) >= self.fail_after:
+                return 400, {"error": "rejected"}, {}
+            if self.max_request_chars is not None and sum(map(len, texts)) > self.max_request_chars:
+                msg = f"This model's maximum context length is {self.max_request_chars} tokens"
+                return 400, {"error": {"code": "context_length_exceeded", "message": msg}}, {}
+            self.calls.append(list(texts))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            if self.delay:
+                time.sleep(self.delay)
+            vecs = [fake_vector(t, self.dim) for t in texts]
+            if encoding == "base64":
+                vecs = [base64.b64encode(array("f", v).tobytes()).decode() for v in vecs]
+            data = [{"index": i, "embedding": v} for i, v in enumerate(vecs)]
+            return 200, {"data": data}, {}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    @property
+    def embedded(self) -> int:
+        return sum(len(c) for c in self.calls)
+
+    def close(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
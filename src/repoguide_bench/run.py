@@ -0,0 +1,188 @@
+# src/repoguide_bench/run.py
+from __future__ import annotations
+import os, resource, sys, tempfile, time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from repoguide_bench.fake_embed import FakeEmbeddingServer
+from repoguide_bench.synth import SynthRepo, generate_repo, touch_files
+
+@dataclass
+class BenchConfig:
+    files: int = 200
+    file_bytes: int = 4000
+    queries: int = 100
+    dim: int = 1536
+    embed_latency_ms: float = 0.0
+    touch_fraction: float = 0.05
+    seed: int = 0
+    store: str = "qdrant"   # REPOGUIDE_VECTOR_STORE: in-memory qdrant or local mmap files
+
+# metric -> True if bigger is better; used by compare()
+_DIRECTION = {
+    "files_per_s": True, "chunks_per_s": True,
+    "p50_ms": False, "p95_ms": False, "p99_ms": False, "embed_calls": False,
+}
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS; a process-lifetime high-water mark
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+def _pct(samples: list[float], q: float) -> float:
+    s = sorted(samples)
+    return s[min(len(s) - 1, max(0, round(q / 100 * len(s) + 0.5) - 1))]
+
+@contextmanager
+def _env(**values: str):
+    old = {k: os.environ.get(k) for k in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for k, v in old.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+def _index(repo: SynthRepo, srv: FakeEmbeddingServer) -> dict:
+    from repoguide_indexer.index_repo import IndexProgress, index_local_repo
+
+    calls0, texts0 = len(srv.calls), srv.embedded
+    progress = IndexProgress()
+    t0 = time.perf_counter()
+    chunks = index_local_repo(str(repo.root), progress=progress)
+    dt = time.perf_counter() - t0
+    return {
+        "seconds": round(dt, 3),
+        "files": progress.files_walked,
+        "files_changed": progress.files_changed,
+        "chunks": chunks,
+        "files_per_s": round(progress.files_walked / dt, 1),
+        "chunks_per_s": round(chunks / dt, 1),
+        "embed_calls": len(srv.calls) - calls0,
+        "embedded_texts": srv.embedded - texts0,
+        "embeddings_saved": progress.embeddings_saved,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+def _query(questions: list[str], srv: FakeEmbeddingServer) -> dict:
+    from fastapi.testclient import TestClient
+    from repoguide_api.main import app
+
+    http = TestClient(app)  # no lifespan: handlers share the clients set up by _env
+    calls0 = len(srv.calls)
+    lat, misses = [], 0
+    for q in questions:
+        t0 = time.perf_counter()
+        r = http.post("/explain", json={"question": q})
+        lat.append((time.perf_counter() - t0) * 1000)
+        misses += r.status_code != 200
+    return {
+        "n": len(questions),
+        "misses": misses,
+        "p50_ms": round(_pct(lat, 50), 2),
+        "p95_ms": round(_pct(lat, 95), 2),
+        "p99_ms": round(_pct(lat, 99), 2),
+        "embed_calls": len(srv.calls) - calls0,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+def _query_batch(questions: list[str], srv: FakeEmbeddingServer, size: int = 25) -> dict:
+    from fastapi.testclient import TestClient
+    from repoguide_api.main import app
+
+    http = TestClient(app)
+    calls0 = len(srv.calls)
+    lat, misses = [], 0
+    for i in range(0, len(questions), size):
+        t0 = time.perf_counter()
+        r = http.post("/explain/batch", json={"questions": questions[i : i + size]})
+        lat.append((time.perf_counter() - t0) * 1000)
+        misses += sum(a is None for a in r.json()["answers"]) if r.status_code == 200 else size
+    return {
+        "n": len(questions),
+        "batch_size": size,
+        "misses": misses,
+        "p50_ms": round(_pct(lat, 50), 2),
+        "p95_ms": round(_pct(lat, 95), 2),
+        "embed_calls": len(srv.calls) - calls0,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+def run(cfg: BenchConfig, workdir: Path | None = None) -> dict:
+    """Index a synthetic repo against a fake embedder and ``cfg.store``, then query it.
+
+    Scenarios: cold index, no-op re-index, incremental re-index after touching
+    ``touch_fraction`` of the files, identifier questions (BM25 only) and prose
+    questions (embedding + fusion) through /explain, and the prose questions
+    again in bursts of 25 through /explain/batch. Those run with the answer
+    cache off; ``query_prose_cached`` repeats the prose run with it on.
+    """
+    from repoguide_embeddings import client as emb
+    from repoguide_retriever.answer_cache import close_answer_cache, get_answer_cache
+    from repoguide_store import qdrant as store
+    from repoguide_store.backend import close_store
+
+    with tempfile.TemporaryDirectory(prefix="repoguide-bench-") as tmp:
+        base = Path(workdir or tmp)
+        repo = generate_repo(base / "repo", cfg.files, cfg.file_bytes, cfg.seed)
+        srv = FakeEmbeddingServer(dim=cfg.dim, delay=cfg.embed_latency_ms / 1000)
+        env = _env(
+            REPOGUIDE_STATE_DIR=str(base / "state"),
+            REPOGUIDE_EMBED_CACHE="off",
+            REPOGUIDE_ANSWER_CACHE="off",
+            QDRANT_URL=":memory:",
+            REPOGUIDE_VECTOR_STORE=cfg.store,
+            AZURE_OPENAI_ENDPOINT=srv.url,
+            AZURE_OPENAI_EMBED_DEPLOYMENT="bench",
+            AZURE_OPENAI_API_VERSION="2024-10-21",
+            AZURE_OPENAI_API_KEY="bench",
+        )
+        emb.close_client()
+        close_store()
+        close_answer_cache()
+        store.close_client()
+        try:
+            with env:
+                scenarios = {
+                    "index_cold": _index(repo, srv),
+                    "index_noop": _index(repo, srv),
+                }
+                touch_files(repo, cfg.touch_fraction, seed=cfg.seed + 1)
+                scenarios["index_incremental"] = _index(repo, srv)
+
+                n = cfg.queries
+                idents = [f"Where is {repo.identifiers[i * 7 % len(repo.identifiers)]} defined?" for i in range(n)]
+                prose = [f"How does the {repo.topics[i * 7 % len(repo.topics)].lower()} work?" for i in range(n)]
+                scenarios["query_identifier"] = _query(idents, srv)
+                scenarios["query_prose"] = _query(prose, srv)
+                scenarios["query_prose_batch"] = _query_batch(prose, srv)
+                with _env(REPOGUIDE_ANSWER_CACHE="memory"):
+                    close_answer_cache()
+                    cached = _query(prose, srv)
+                    cached["hit_rate"] = get_answer_cache().stats()["hit_rate"]
+                    scenarios["query_prose_cached"] = cached
+        finally:
+            emb.close_client()
+            close_store()
+            close_answer_cache()
+            store.close_client()
+            srv.close()
+    return {"config": asdict(cfg), "python": sys.version.split()[0], "scenarios": scenarios}
+
+def compare(result: dict, baseline: dict, tolerance: float = 0.2) -> list[str]:
+    """Metrics that got worse than ``baseline`` by more than ``tolerance`` (a fraction)."""
+    out = []
+    for name, metrics in result["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name, {})
+        for metric, bigger_better in _DIRECTION.items():
+            if metric not in metrics or not old.get(metric):
+                continue
+            new, ref = metrics[metric], old[metric]
+            worse = new < ref * (1 - tolerance) if bigger_better else new > ref * (1 + tolerance)
+            if worse:
+                out.append(f"{name}.{metric}: {ref} -> {new}")
+    return out
@@ -0,0 +1,87 @@
+# src/repoguide_bench/synth.py
+from __future__ import annotations
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+
+_NOUNS = (
+    "cache", "session", "token", "router", "payload", "config", "worker", "queue",
+    "invoice", "account", "tenant", "upload", "report", "schema", "metric", "webhook",
+)
+_VERBS = ("load", "parse", "check", "build", "sync", "render", "resolve", "flush", "retry", "validate")
+_WORDS = (
+    "the", "service", "reads", "settings", "from", "environment", "before", "each", "request",
+    "and", "falls", "back", "to", "defaults", "when", "a", "value", "is", "missing", "retries",
+    "are", "bounded", "by", "timeout", "so", "slow", "dependencies", "cannot", "stall", "callers",
+)
+
+@dataclass
+class SynthRepo:
+    root: Path
+    files: list[str] = field(default_factory=list)       # repo-relative paths
+    identifiers: list[str] = field(default_factory=list)  # defined function names
+    topics: list[str] = field(default_factory=list)       # markdown heading texts
+
+def _sentence(rng: random.Random) -> str:
+    words = rng.choices(_WORDS, k=rng.randint(8, 16))
+    return " ".join(words).capitalize() + "."
+
+def _py_file(rng: random.Random, target: int, idents: list[str]) -> str:
+    out = ['"""Generated module."""', "import os", ""]
+    size = 0
+    while size < target:
+        name = f"{rng.choice(_VERBS)}_{rng.choice(_NOUNS)}_{len(idents)}"
+        idents.append(name)
+        body = [
+            f"def {name}(value, retries=3):",
+            f'    """{_sentence(rng)}"""',
+            f"    limit = int(os.getenv('{name.upper()}', '{rng.randint(1, 99)}'))",
+            "    for attempt in range(retries):",
+            "        if value is not None and attempt < limit:",
+            f"            return {rng.choice(_NOUNS)}_handler(value, attempt)",
+            "    return None",
+            "",
+            "",
+        ]
+        block = "\n".join(body)
+        out.append(block)
+        size += len(block)
+    return "\n".join(out)
+
+def _md_file(rng: random.Random, target: int, topics: list[str]) -> str:
+    out, size = [], 0
+    while size < target:
+        topic = f"{rng.choice(_NOUNS).capitalize()} {rng.choice(_VERBS)} flow"
+        topics.append(topic)
+        para = " ".join(_sentence(rng) for _ in range(rng.randint(3, 6)))
+        block = f"## {topic}\n\n{para}\n"
+        out.append(block)
+        size += len(block)
+    return "\n".join(out)
+
+def generate_repo(root: Path, files: int = 200, file_bytes: int = 4000, seed: int = 0) -> SynthRepo:
+    """Write a deterministic mixed .py/.md tree of ``files`` files of ~``file_bytes`` each."""
+    rng = random.Random(seed)
+    repo = SynthRepo(root=Path(root))
+    for i in range(files):
+        pkg = f"pkg{i % 8}/mod{i % 5}"
+        if i % 3 == 2:
+            rel = f"docs/{pkg}/guide_{i}.md"
+            text = _md_file(rng, file_bytes, repo.topics)
+        else:
+            rel = f"src/{pkg}/module_{i}.py"
+            text = _py_file(rng, file_bytes, repo.identifiers)
+        p = repo.root / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text(text, encoding="utf-8")
+        repo.files.append(rel)
+    return repo
+
+def touch_files(repo: SynthRepo, fraction: float, seed: int = 1) -> list[str]:
+    """Append a line to a deterministic ``fraction`` of files (an incremental edit)."""
+    rng = random.Random(seed)
+    picked = rng.sample(repo.files, max(1, int(len(repo.files) * fraction)))
+    for rel in picked:
+        with open(repo.root / rel, "a", encoding="utf-8") as fh:
+            fh.write("\n# edited\n" if rel.endswith(".py") else "\nEdited for the benchmark.\n")
+    return picked
@@ -0,0 +1,35 @@
+# src/repoguide_config/env.py
+from __future__ import annotations
+import os
+from pathlib import Path
+
+_TRUE = ("1", "true", "yes", "on")
+_FALSE = ("0", "false", "no", "off")
+
+def state_dir() -> Path:
+    """REPOGUIDE_STATE_DIR, else ~/.cache/repoguide: manifests, caches and sidecar indexes."""
+    d = os.getenv("REPOGUIDE_STATE_DIR")
+    return Path(d) if d else Path.home() / ".cache" / "repoguide"
+
+def env_float(name: str, default: float, lo: float | None = None, hi: float | None = None) -> float:
+    """A number from the environment, clamped to [lo, hi]; unset or malformed means ``default``."""
+    try:
+        value = float(os.getenv(name, ""))
+    except ValueError:
+        return default
+    if value != value:  # nan
+        return default
+    if lo is not None:
+        value = max(lo, value)
+    if hi is not None:
+        value = min(hi, value)
+    return value
+
+def env_int(name: str, default: int, lo: int | None = 1, hi: int | None = None) -> int:
+    """Like env_float, truncated; counts and sizes default to a floor of 1."""
+    return int(env_float(name, default, lo, hi))
+
+def env_flag(name: str, default: bool = False) -> bool:
+    """1/true/yes/on or 0/false/no/off; anything else means ``default``."""
+    raw = os.getenv(name, "").strip().lower()
+    return True if raw in _TRUE else False if raw in _FALSE else default
@@ -0,0 +1,99 @@
+# src/repoguide_embeddings/batching.py
+from __future__ import annotations
+import threading
+from typing import Sequence
+
+from repoguide_config.env import env_float, env_int
+
+# cl100k averages ~4 bytes per token on English and ~3.5 on code; counting
+# one token per 3 bytes over-estimates, which is the safe side of a limit
+BYTES_PER_TOKEN = 3
+
+def estimate_tokens(text: str) -> int:
+    return len(text.encode("utf-8")) // BYTES_PER_TOKEN + 1
+
+class BatchSizer:
+    """How many texts go into one embeddings request.
+
+    Requests are packed up to ``max_tokens`` estimated tokens and ``limit``
+    texts. ``limit`` starts at ``start`` and adapts AIMD-style: it grows by a
+    quarter after a full request that came back within ``target_s`` and
+    halves after a slower or throttled one, never above ``max_items``. A
+    request the service rejects as too large halves ``max_tokens``; it grows
+    back the same way after fast requests that used at least half of it,
+    never above the configured ``budget``.
+    Shared by every caller of one client, since they share its rate limit.
+    """
+
+    def __init__(self, max_items: int = 256, max_tokens: int = 32_000, target_s: float = 2.0, start: int = 16):
+        self.max_items = max_items
+        self.budget = max_tokens
+        self.target_s = target_s
+        self._items = float(min(start, max_items))
+        self._tokens = float(max_tokens)
+        self._lock = threading.Lock()
+        self.throttled = 0
+        self.too_large = 0
+
+    @classmethod
+    def from_env(cls) -> "BatchSizer":
+        """REPOGUIDE_EMBED_BATCH (max texts per request, 256), REPOGUIDE_EMBED_BATCH_TOKENS
+        (32000) and REPOGUIDE_EMBED_TARGET_MS (latency to stay under, 2000)."""
+        return cls(
+            max_items=env_int("REPOGUIDE_EMBED_BATCH", 256),
+            max_tokens=env_int("REPOGUIDE_EMBED_BATCH_TOKENS", 32_000),
+            target_s=env_float("REPOGUIDE_EMBED_TARGET_MS", 2000, lo=1) / 1000,
+        )
+
+    @property
+    def limit(self) -> int:
+        return int(self._items)
+
+    @property
+    def max_tokens(self) -> int:
+        return int(self._tokens)
+
+    def observe(self, n: int, seconds: float, tokens: int = 0) -> None:
+        """A request of ``n`` texts and ``tokens`` estimated tokens succeeded in ``seconds``."""
+        with self._lock:
+            if seconds > self.target_s:
+                self._items = max(1.0, self._items / 2)
+                return
+            if n >= int(self._items):
+                self._items = min(float(self.max_items), self._items * 1.25 + 1)
+            # packing stops short of the limit, so half of it already counts as full
+            if tokens * 2 >= self._tokens:
+                self._tokens = min(float(self.budget), self._tokens * 1.25 + 1)
+
+    def throttle(self) -> None:
+        with self._lock:
+            self.throttled += 1
+            self._items = max(1.0, self._items / 2)
+
+    def rejected(self, tokens: int) -> None:
+        """A request of ``tokens`` estimated tokens was refused as too large."""
+        with self._lock:
+            self.too_large += 1
+            self._tokens = max(1.0, min(self._tokens, tokens / 2))
+
+    def pack(self, texts: Sequence[str]) -> list[tuple[int, int]]:
+        """[start, end) ranges of ``texts`` that each fit one request."""
+        limit, budget = self.limit, self.max_tokens
+        out, start, tokens = [], 0, 0
+        for i, t in enumerate(texts):
+            n = estimate_tokens(t)
+            if i > start and (i - start >= limit or tokens + n > budget):
+                out.append((start, i))
+                start, tokens = i, 0
+            tokens += n
+        if start < len(texts):
+            out.append((start, len(texts)))
+        return out
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "max_tokens": self.max_tokens,
+            "throttled": self.throttled,
+            "too_large": self.too_large,
+        }
@@ -0,0 +1,119 @@
+# src/repoguide_embeddings/cache.py
+from __future__ import annotations
+import hashlib, os, sqlite3, threading, time
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+from repoguide_config.env import env_int, state_dir
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    deployment TEXT NOT NULL,
+    key        BLOB NOT NULL,
+    vec        BLOB NOT NULL,
+    atime      REAL NOT NULL,
+    PRIMARY KEY (deployment, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS embeddings_atime ON embeddings(atime);
+"""
+
+def text_key(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()[:16]
+
+def default_cache_path() -> Path | None:
+    """REPOGUIDE_EMBED_CACHE=off disables the cache; unset means the state dir."""
+    raw = os.getenv("REPOGUIDE_EMBED_CACHE")
+    if raw and raw.lower() in ("0", "off", "false", "none"):
+        return None
+    return Path(raw) if raw else state_dir() / "embeddings.sqlite3"
+
+class EmbeddingCache:
+    """On-disk (deployment, text hash) -> float32 vector map with LRU eviction.
+
+    Vectors are stored as raw float32 blobs (4 bytes/dim). Once the blobs
+    exceed ``max_bytes`` the least recently used tenth is dropped.
+    """
+
+    def __init__(self, path: str | Path, *, max_bytes: int = 512 * 2**20):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._bytes = self._db.execute("SELECT COALESCE(SUM(LENGTH(vec)), 0) FROM embeddings").fetchone()[0]
+
+    @classmethod
+    def from_env(cls) -> "EmbeddingCache | None":
+        path = default_cache_path()
+        if path is None:
+            return None
+        return cls(path, max_bytes=env_int("REPOGUIDE_EMBED_CACHE_MB", 512) * 2**20)
+
+    def get_many(self, deployment: str, texts: Sequence[str]) -> list[np.ndarray | None]:
+        keys = [text_key(t) for t in texts]
+        found: dict[bytes, bytes] = {}
+        with self._lock:
+            # stay well under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                part = keys[i : i + 500]
+                q = f"SELECT key, vec FROM embeddings WHERE deployment=? AND key IN ({','.join('?' * len(part))})"
+                found.update(self._db.execute(q, (deployment, *part)).fetchall())
+            if found:
+                now = time.time()
+                self._db.executemany(
+                    "UPDATE embeddings SET atime=? WHERE deployment=? AND key=?",
+                    [(now, deployment, k) for k in found],
+                )
+            self.hits += sum(k in found for k in keys)
+            self.misses += sum(k not in found for k in keys)
+        return [np.frombuffer(found[k], dtype=np.float32) if k in found else None for k in keys]
+
+    def put_many(self, deployment: str, texts: Sequence[str], vectors) -> None:
+        now = time.time()
+        rows = [
+            (deployment, text_key(t), np.asarray(v, dtype=np.float32).tobytes(), now)
+            for t, v in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings(deployment, key, vec, atime) VALUES (?, ?, ?, ?)", rows
+            )
+            self._bytes += sum(len(r[2]) for r in rows)
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # recount first: other processes may share the file
+        total, n = self._db.execute("SELECT COALESCE(SUM(LENGTH(vec)), 0), COUNT(*) FROM embeddings").fetchone()
+        while total > self.max_bytes and n:
+            drop = max(1, n // 10)
+            self._db.execute(
+                "DELETE FROM embeddings WHERE (deployment, key) IN "
+                "(SELECT deployment, key FROM embeddings ORDER BY atime LIMIT ?)",
+                (drop,),
+            )
+            self.evictions += drop
+            total, n = self._db.execute("SELECT COALESCE(SUM(LENGTH(vec)), 0), COUNT(*) FROM embeddings").fetchone()
+        self._bytes = total
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "bytes": self._bytes,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,273 @@
+# src/repoguide_embeddings/client.py
+from __future__ import annotations
+import asyncio, base64, os, random, re, threading, time
+from concurrent.futures import Future
+from email.utils import parsedate_to_datetime
+from typing import Sequence
+
+import httpx
+import numpy as np
+
+from repoguide_config.env import env_int
+from repoguide_embeddings.batching import BatchSizer, estimate_tokens
+from repoguide_embeddings.cache import EmbeddingCache
+from repoguide_metrics.timing import span
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# how Azure OpenAI / OpenAI word a 400 for a request over the token or input limits
+_TOO_LARGE = re.compile(
+    r"maximum context length|too many (?:inputs|tokens)|max(?:imum)? (?:number of )?(?:inputs|tokens)"
+    r"|request too large|input is too long",
+    re.I,
+)
+
+def _decode(item) -> np.ndarray:
+    emb = item["embedding"]
+    if isinstance(emb, str):  # encoding_format=base64: little-endian float32
+        return np.frombuffer(base64.b64decode(emb), dtype="<f4")
+    return np.asarray(emb, dtype=np.float32)
+
+def fit_dim(vectors: np.ndarray, dim: int | None) -> np.ndarray:
+    """Keep the first ``dim`` components and re-normalize (text-embedding-3 vectors
+    stay meaningful when shortened this way)."""
+    if not dim or vectors.shape[1] <= dim:
+        return vectors
+    out = np.ascontiguousarray(vectors[:, :dim])
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    np.divide(out, norms, out=out, where=norms > 0)
+    return out
+
+def _retry_after(r: httpx.Response) -> float | None:
+    raw = r.headers.get("retry-after-ms")
+    if raw:
+        try:
+            return float(raw) / 1000.0
+        except ValueError:
+            pass
+    raw = r.headers.get("retry-after")
+    if not raw:
+        return None
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(raw).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def _too_large(r: httpx.Response) -> bool:
+    return r.status_code == 413 or (r.status_code == 400 and bool(_TOO_LARGE.search(r.text)))
+
+class EmbeddingClient:
+    """Azure OpenAI embeddings over one pooled ``httpx.AsyncClient``.
+
+    The async client lives on a private event loop thread so sync callers
+    (the indexer stages, FastAPI's threadpool handlers) can share the same
+    connection pool. At most ``concurrency`` requests are on the wire at
+    once; 429s and 5xx are retried honoring Retry-After, otherwise with
+    jittered exponential backoff. With a ``cache`` only texts it has not
+    seen for this deployment go over the network.
+
+    ``batching`` packs each call into requests that fit its token and item
+    limits and adapts those limits to latency and throttling; a request
+    refused as too large is split in half and retried.
+
+    Results are ``(n, dim)`` float32 arrays, never lists of Python floats.
+    ``dim`` truncates (and re-normalizes) vectors after the cache, so the
+    cache keeps full vectors and changing ``dim`` needs no re-embedding.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        deployment: str,
+        api_version: str,
+        api_key: str,
+        *,
+        concurrency: int = 4,
+        max_retries: int = 6,
+        timeout: float = 60.0,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        cache: EmbeddingCache | None = None,
+        dim: int | None = None,
+        encoding: str = "base64",
+        batching: BatchSizer | None = None,
+    ):
+        self.deployment = deployment
+        self.url = f"{endpoint.rstrip('/')}/openai/deployments/{deployment}/embeddings?api-version={api_version}"
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.cache = cache
+        self.dim = dim
+        self.encoding = encoding
+        self.batching = batching or BatchSizer()
+        self._headers = {"api-key": api_key, "Content-Type": "application/json"}
+        self._timeout = timeout
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._http: httpx.AsyncClient | None = None
+        self._sem: asyncio.Semaphore | None = None
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+
+    @classmethod
+    def from_env(cls) -> "EmbeddingClient":
+        return cls(
+            endpoint=os.environ["AZURE_OPENAI_ENDPOINT"],
+            deployment=os.environ["AZURE_OPENAI_EMBED_DEPLOYMENT"],
+            api_version=os.environ["AZURE_OPENAI_API_VERSION"],
+            api_key=os.environ["AZURE_OPENAI_API_KEY"],
+            concurrency=env_int("REPOGUIDE_EMBED_CONCURRENCY", 4),
+            cache=EmbeddingCache.from_env(),
+            dim=env_int("REPOGUIDE_EMBED_DIM", 0, lo=0) or None,
+            encoding=os.getenv("REPOGUIDE_EMBED_ENCODING", "base64"),
+            batching=BatchSizer.from_env(),
+        )
+
+    # --- async API ---
+
+    async def aembed(self, texts: Sequence[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        if self.cache is None:
+            return fit_dim(await self._packed(texts), self.dim)
+        found = self.cache.get_many(self.deployment, texts)
+        missing = [i for i, v in enumerate(found) if v is None]
+        if not missing:
+            return fit_dim(np.stack(found), self.dim)
+        fresh = await self._packed([texts[i] for i in missing])
+        self.cache.put_many(self.deployment, [texts[i] for i in missing], fresh)
+        out = np.empty((len(texts), fresh.shape[1]), dtype=np.float32)
+        out[missing] = fresh
+        for i, v in enumerate(found):
+            if v is not None:
+                out[i] = v
+        return fit_dim(out, self.dim)
+
+    async def _packed(self, texts: Sequence[str]) -> np.ndarray:
+        parts = self.batching.pack(texts)
+        if len(parts) == 1:
+            return await self._request(texts)
+        out = await asyncio.gather(*(self._request(texts[a:b]) for a, b in parts))
+        return np.concatenate(out)
+
+    async def _request(self, texts: Sequence[str]) -> np.ndarray:
+        http, sem = self._ensure_http()
+        attempt = 0
+        while True:
+            async with sem:
+                self.requests += 1
+                try:
+                    body = {"input": list(texts)}
+                    if self.encoding != "float":
+                        body["encoding_format"] = self.encoding
+                    t0 = time.perf_counter()
+                    with span("embed.request"):
+                        r = await http.post(self.url, json=body)
+                    elapsed = time.perf_counter() - t0
+                except httpx.TransportError:
+                    if attempt >= self.max_retries:
+                        raise
+                    r = None
+            if r is not None and r.status_code not in RETRY_STATUS:
+                tokens = sum(estimate_tokens(t) for t in texts)
+                if len(texts) > 1 and _too_large(r):
+                    self.batching.rejected(tokens)
+                    mid = len(texts) // 2
+                    halves = await asyncio.gather(self._request(texts[:mid]), self._request(texts[mid:]))
+                    return np.concatenate(halves)
+                r.raise_for_status()
+                data = sorted(r.json()["data"], key=lambda d: d.get("index", 0))
+                self.batching.observe(len(texts), elapsed, tokens)
+                return np.stack([_decode(d) for d in data])
+            if r is not None and r.status_code == 429:
+                self.batching.throttle()
+            if attempt >= self.max_retries:
+                r.raise_for_status()
+            # sleep outside the semaphore so throttled calls don't hold a slot
+            await asyncio.sleep(self._delay(attempt, r))
+            attempt += 1
+            self.retries += 1
+
+    def _delay(self, attempt: int, r: httpx.Response | None) -> float:
+        hint = _retry_after(r) if r is not None else None
+        if hint is not None:
+            return min(self.max_backoff, hint) + random.uniform(0, self.backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _ensure_http(self) -> tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        # called on the loop thread, so no locking needed here
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                headers=self._headers,
+                timeout=self._timeout,
+                limits=httpx.Limits(
+                    max_connections=self.concurrency,
+                    max_keepalive_connections=self.concurrency,
+                ),
+            )
+            self._sem = asyncio.Semaphore(self.concurrency)
+        return self._http, self._sem
+
+    # --- sync facade ---
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                t = threading.Thread(target=loop.run_forever, name="repoguide-embed", daemon=True)
+                t.start()
+                self._loop, self._thread = loop, t
+            return self._loop
+
+    def submit(self, texts: Sequence[str]) -> Future:
+        """Schedule one batch; returns a future resolving to its vectors."""
+        return asyncio.run_coroutine_threadsafe(self.aembed(texts), self._ensure_loop())
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return self.submit(texts).result()
+
+    def embed_batches(self, batches: Sequence[Sequence[str]]) -> list[np.ndarray]:
+        futs = [self.submit(b) for b in batches]
+        return [f.result() for f in futs]
+
+    def close(self) -> None:
+        with self._lock:
+            loop, t = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is not None:
+            if self._http is not None:
+                asyncio.run_coroutine_threadsafe(self._http.aclose(), loop).result()
+                self._http = self._sem = None
+            loop.call_soon_threadsafe(loop.stop)
+            t.join()
+            loop.close()
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+
+_client: EmbeddingClient | None = None
+_client_lock = threading.Lock()
+
+def get_client() -> EmbeddingClient:
+    """Process-wide client built from the AZURE_OPENAI_* env vars."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = EmbeddingClient.from_env()
+        return _client
+
+def close_client() -> None:
+    global _client
+    with _client_lock:
+        c, _client = _client, None
+    if c is not None:
+        c.close()
+
+def embed(texts: Sequence[str]) -> np.ndarray:
+    return get_client().embed(texts)
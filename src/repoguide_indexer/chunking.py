@@ -0,0 +1,151 @@
+# src/repoguide_indexer/chunking.py
+from __future__ import annotations
+import ast, re
+from dataclasses import dataclass
+
+MAX_CHARS = 1500
+
+_HEADING = re.compile(r"^#{1,6}\s")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_DEFS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+Span = tuple[int, int, bool]  # start line, end line, whole unit (packable)
+
+_LANGS = {
+    "py": "python", "md": "markdown", "markdown": "markdown", "rst": "rst", "txt": "text",
+    "js": "javascript", "jsx": "javascript", "ts": "typescript", "tsx": "typescript",
+    "go": "go", "rs": "rust", "java": "java", "rb": "ruby", "sh": "shell",
+    "yml": "yaml", "yaml": "yaml", "toml": "toml", "json": "json",
+}
+
+def language(rel: str) -> str:
+    """Coarse language label from the file extension (payload + scope filter)."""
+    suffix = rel.rsplit(".", 1)[-1].lower() if "." in rel.rsplit("/", 1)[-1] else ""
+    return _LANGS.get(suffix, suffix or "text")
+
+@dataclass
+class Chunk:
+    text: str
+    start_line: int  # 1-based, inclusive
+    end_line: int
+
+def chunk_file(rel: str, text: str, max_chars: int = MAX_CHARS) -> list[Chunk]:
+    """Split a file into chunks that follow its structure.
+
+    Python is cut on function/class boundaries (big classes per method),
+    Markdown on headings, everything else on blank-line paragraphs. Adjacent
+    small pieces are packed together up to ``max_chars``; nothing overlaps.
+    """
+    lines = text.splitlines(keepends=True)
+    if not lines:
+        return []
+    suffix = rel.rsplit(".", 1)[-1].lower() if "." in rel else ""
+    spans = None
+    if suffix == "py":
+        spans = _python_spans(text, lines, max_chars)
+    elif suffix in ("md", "markdown", "rst"):
+        spans = _markdown_spans(lines, max_chars)
+    if spans is None:
+        spans = _paragraph_spans(lines, max_chars)
+    return [c for c in _materialize(lines, _pack(lines, spans, max_chars), max_chars) if c.text.strip()]
+
+def _size(lines: list[str], s: int, e: int) -> int:
+    return sum(len(ln) for ln in lines[s - 1 : e])
+
+def _first_line(node: ast.stmt) -> int:
+    return min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+
+def _python_spans(text: str, lines: list[str], max_chars: int) -> list[Span] | None:
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return None
+    if not tree.body:
+        return None
+    return _stmt_spans(tree.body, 1, len(lines), lines, max_chars)
+
+def _stmt_spans(body: list[ast.stmt], first: int, last: int, lines: list[str], max_chars: int) -> list[Span]:
+    # Every line in [first, last] lands in exactly one span; comments and
+    # blank lines before a statement stay with that statement.
+    spans: list[Span] = []
+    start = first
+    for i, node in enumerate(body):
+        end = last if i == len(body) - 1 else max(start, _first_line(body[i + 1]) - 1)
+        if _size(lines, start, end) <= max_chars:
+            spans.append((start, end, True))
+        elif isinstance(node, _DEFS):
+            # too big for one chunk: split on its members (the signature is
+            # packed with the docstring / first member), and keep the pieces
+            # from being packed together with the neighbouring definitions
+            first_stmt = _first_line(node.body[0])
+            inner = [(start, first_stmt - 1, True)] if first_stmt > start else []
+            inner += _stmt_spans(node.body, first_stmt, end, lines, max_chars)
+            spans.extend((s, e, False) for s, e in _pack(lines, inner, max_chars))
+        else:
+            spans.extend(_line_spans(lines, start, end, max_chars))
+        start = end + 1
+    return spans
+
+def _markdown_spans(lines: list[str], max_chars: int) -> list[Span]:
+    cuts, fenced = [1], False
+    for i, ln in enumerate(lines, start=1):
+        if _FENCE.match(ln):
+            fenced = not fenced
+        elif not fenced and i > 1 and _HEADING.match(ln):
+            cuts.append(i)
+    return _split_oversized(lines, cuts, max_chars)
+
+def _paragraph_spans(lines: list[str], max_chars: int) -> list[Span]:
+    cuts = [1] + [i for i in range(2, len(lines) + 1) if not lines[i - 2].strip() and lines[i - 1].strip()]
+    return _split_oversized(lines, cuts, max_chars)
+
+def _split_oversized(lines: list[str], cuts: list[int], max_chars: int) -> list[Span]:
+    spans: list[Span] = []
+    for s, nxt in zip(cuts, cuts[1:] + [len(lines) + 1]):
+        e = nxt - 1
+        if _size(lines, s, e) <= max_chars:
+            spans.append((s, e, True))
+        else:
+            spans.extend(_line_spans(lines, s, e, max_chars))
+    return spans
+
+def _line_spans(lines: list[str], s: int, e: int, max_chars: int) -> list[tuple[int, int, bool]]:
+    # fragments of one oversized unit: never packed with their neighbours
+    spans, start, size = [], s, 0
+    for i in range(s, e + 1):
+        n = len(lines[i - 1])
+        if size and size + n > max_chars:
+            spans.append((start, i - 1, False))
+            start, size = i, 0
+        size += n
+    spans.append((start, e, False))
+    return spans
+
+def _pack(lines: list[str], spans: list[Span], max_chars: int) -> list[tuple[int, int]]:
+    # spans are contiguous, so merging neighbours is just widening the range
+    packed: list[tuple[int, int]] = []
+    size, open_ = 0, False
+    for s, e, whole in spans:
+        n = _size(lines, s, e)
+        if open_ and whole and size + n <= max_chars:
+            packed[-1] = (packed[-1][0], e)
+            size += n
+        else:
+            packed.append((s, e))
+            size, open_ = n, whole
+    return packed
+
+def _materialize(lines: list[str], spans: list[tuple[int, int]], max_chars: int):
+    for s, e in spans:
+        # citations should point at code, not the blank lines around it
+        while s < e and not lines[s - 1].strip():
+            s += 1
+        while e > s and not lines[e - 1].strip():
+            e -= 1
+        text = "".join(lines[s - 1 : e])
+        if len(text) <= max_chars or s != e:
+            yield Chunk(text=text, start_line=s, end_line=e)
+        else:
+            # one enormous line (minified/generated): cut it, same line range
+            for i in range(0, len(text), max_chars):
+                yield Chunk(text=text[i : i + max_chars], start_line=s, end_line=e)
@@ -0,0 +1,114 @@
+# src/repoguide_indexer/dedup.py
+from __future__ import annotations
+import os, re, sqlite3, threading, zlib
+
+import numpy as np
+
+from repoguide_config.env import env_float, state_dir
+
+# MinHash over token 5-shingles, LSH with 16 bands x 4 rows: pairs above
+# ~0.5 Jaccard usually share a bucket, and candidates are then checked
+# against REPOGUIDE_DEDUP_THRESHOLD on the full signature.
+NUM_PERM = 64
+BANDS = 16
+SHINGLE = 5
+MIN_SHINGLES = 8  # shorter chunks are only deduplicated when identical
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+# x -> a*x + b mod 2**32 with odd a is a permutation of the 32-bit shingle
+# hashes; uint32 arithmetic wraps, which is ~10x cheaper than a prime modulus
+_rng = np.random.default_rng(0x5EED)
+_A = _rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint64).astype(np.uint32) | np.uint32(1)
+_B = _rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint64).astype(np.uint32)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sigs (cluster TEXT PRIMARY KEY, sig BLOB NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS bands (
+    band    INTEGER NOT NULL,
+    bucket  INTEGER NOT NULL,
+    cluster TEXT NOT NULL,
+    PRIMARY KEY (band, bucket, cluster)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS bands_cluster ON bands(cluster);
+"""
+
+def near_enabled() -> bool:
+    """REPOGUIDE_DEDUP=exact turns off near-duplicate merging (identical chunks still merge)."""
+    return os.getenv("REPOGUIDE_DEDUP", "near").strip().lower() != "exact"
+
+def default_threshold() -> float:
+    """REPOGUIDE_DEDUP_THRESHOLD: estimated Jaccard similarity to merge at (default 0.9)."""
+    return env_float("REPOGUIDE_DEDUP_THRESHOLD", 0.9, lo=0.5, hi=1.0)
+
+def minhash(text: str) -> np.ndarray | None:
+    """uint32 MinHash signature of ``text``'s token shingles; None if too short.
+
+    Tokens ignore whitespace, so re-indented or re-wrapped copies still match.
+    """
+    toks = _TOKEN.findall(text)
+    n = len(toks) - SHINGLE + 1
+    if n < MIN_SHINGLES:
+        return None
+    sh = {zlib.crc32("\x1f".join(toks[i : i + SHINGLE]).encode("utf-8")) for i in range(n)}
+    x = np.fromiter(sh, dtype=np.uint32, count=len(sh))
+    return (np.outer(_A, x) + _B[:, None]).min(axis=1)
+
+def _buckets(sig: np.ndarray) -> list[tuple[int, int]]:
+    return [(b, zlib.crc32(band)) for b, band in enumerate(sig.reshape(BANDS, -1))]
+
+class NearDupIndex:
+    """Persistent LSH index over the representative chunk of each cluster.
+
+    One SQLite file per (repo, collection) next to the manifest; the indexer
+    adds clusters as it creates them and removes them once they are empty.
+    """
+
+    def __init__(self, key: str, collection: str, threshold: float | None = None):
+        d = state_dir() / "dedup"
+        d.mkdir(parents=True, exist_ok=True)
+        self.threshold = default_threshold() if threshold is None else threshold
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(d / f"{collection}-{key}.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def query(self, sig: np.ndarray) -> list[tuple[str, float]]:
+        """Clusters at or above the threshold, most similar first."""
+        keys = [k for bb in _buckets(sig) for k in bb]
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT DISTINCT s.cluster, s.sig FROM (VALUES {','.join(['(?, ?)'] * BANDS)}) AS q "
+                "JOIN bands b ON b.band = q.column1 AND b.bucket = q.column2 "
+                "JOIN sigs s ON s.cluster = b.cluster",
+                keys,
+            ).fetchall()
+        out = []
+        for cluster, blob in rows:
+            sim = float(np.mean(np.frombuffer(blob, dtype=np.uint32) == sig))
+            if sim >= self.threshold:
+                out.append((cluster, sim))
+        return sorted(out, key=lambda cs: (-cs[1], cs[0]))
+
+    def add(self, cluster: str, sig: np.ndarray) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO sigs VALUES (?, ?)", (cluster, sig.tobytes()))
+            self._db.executemany(
+                "INSERT OR IGNORE INTO bands VALUES (?, ?, ?)", [(b, k, cluster) for b, k in _buckets(sig)]
+            )
+
+    def remove(self, clusters: list[str]) -> None:
+        rows = [(c,) for c in clusters]
+        if rows:
+            with self._lock:
+                self._db.executemany("DELETE FROM sigs WHERE cluster=?", rows)
+                self._db.executemany("DELETE FROM bands WHERE cluster=?", rows)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM sigs")
+            self._db.execute("DELETE FROM bands")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.commit()
+            self._db.close()
@@ -1,82 +1,430 @@
 # src/repoguide_indexer/index_repo.py
 from __future__ import annotations
-import os, uuid
+import time
+from collections import deque
+from dataclasses import dataclass, field
 from pathlib import Path
-import httpx
-from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance, PointStruct
+from typing import Iterable
+import numpy as np
+
+from repoguide_config.env import env_int
+from repoguide_embeddings.batching import estimate_tokens
+from repoguide_embeddings.client import get_client as get_embedder
+from repoguide_indexer.chunking import chunk_file, language
+from repoguide_indexer.dedup import NearDupIndex, minhash, near_enabled
+from repoguide_indexer.manifest import (
+    FileEntry, Manifest, bump_generation, chunk_hash, cluster_id, file_hash, repo_name,
+)
+from repoguide_indexer.pipeline import Aborted, Cancelled, Pipe, Stages
+from repoguide_indexer.progress import IndexProgress
+from repoguide_indexer.routes import RouteWriter
+from repoguide_indexer.walker import FileRef, iter_files
+from repoguide_metrics import timing
+from repoguide_retriever.lexical import LexicalWriter
+from repoguide_store.backend import collection_for, get_store, get_text_store
+from repoguide_store.base import VectorStore
 
 COLLECTION = "repoguide_docs"  # reuse the same collection we seeded
 
-def _embed(texts: list[str]) -> list[list[float]]:
-    endpoint = os.environ["AZURE_OPENAI_ENDPOINT"].rstrip("/")
-    dep = os.environ["AZURE_OPENAI_EMBED_DEPLOYMENT"]
-    ver = os.environ["AZURE_OPENAI_API_VERSION"]
-    key = os.environ["AZURE_OPENAI_API_KEY"]
-    url = f"{endpoint}/openai/deployments/{dep}/embeddings?api-version={ver}"
-    r = httpx.post(
-        url,
-        headers={"api-key": key, "Content-Type": "application/json"},
-        json={"input": texts},
-        timeout=60.0,
-    )
-    r.raise_for_status()
-    return [d["embedding"] for d in r.json()["data"]]
-
-def _chunks(text: str, size: int = 800, overlap: int = 100):
-    i, n = 0, len(text)
-    while i < n:
-        chunk = text[i : i + size]
-        if chunk.strip():
-            yield chunk
-        i += max(1, size - overlap)
-
-def _iter_files(root: Path):
-    exts = {".md", ".py", ".txt"}
-    for p in root.rglob("*"):
-        if p.is_file() and p.suffix.lower() in exts:
-            yield p
-
-def index_local_repo(path: str) -> int:
+@dataclass
+class _FileJob:
+    rel: str
+    entry: FileEntry
+    texts: list[str] = field(default_factory=list)      # new clusters to embed (text lives in the TextStore)
+    payloads: list[dict] = field(default_factory=list)
+    ids: list[str] = field(default_factory=list)
+
+def _dirs(rel: str) -> list[str]:
+    parts = rel.split("/")[:-1]
+    return ["/".join(parts[: i + 1]) for i in range(len(parts))]
+
+Loc = tuple[str, int, int]  # (rel, start_line, end_line)
+
+def _payload(repo: str, cluster: str, locs: list[Loc]) -> dict:
+    """Point payload for a cluster.
+
+    Scoped searches filter on ``paths``, ``langs`` and ``dirs``, which cover
+    every copy; ``path``/``start_line`` name the first one, the default citation.
+    """
+    rel, start, end = locs[0]
+    paths = sorted({r for r, _, _ in locs})
+    return {
+        "source": f"{rel}:{start}-{end}",
+        "path": rel,
+        "start_line": start,
+        "end_line": end,
+        "chunk": cluster,
+        "repo": repo,
+        "lang": language(rel),
+        "paths": paths,
+        "langs": sorted({language(r) for r in paths}),
+        "dirs": sorted({d for r in paths for d in _dirs(r)}),
+        "locations": [f"{r}:{s}-{e}" for r, s, e in locs],
+    }
+
+class _Clusters:
+    """Walk-side view of which cluster each new chunk belongs to.
+
+    A chunk joins a cluster that some other file already holds, or one this
+    run created, when its text is identical to the cluster's or (with
+    ``near``) its MinHash estimate clears the threshold; otherwise it starts
+    a new cluster and gets embedded. A file never joins a cluster only its
+    own previous version held, so editing a chunk re-embeds it.
+    """
+
+    def __init__(self, owners: dict[str, set[str]], near: NearDupIndex | None, progress: IndexProgress):
+        self.owners = owners
+        self.near = near
+        self.progress = progress
+        self.created: set[str] = set()
+
+    def _joinable(self, cluster: str, rel: str) -> bool:
+        return cluster in self.created or any(r != rel for r in self.owners.get(cluster, ()))
+
+    def claim(self, rel: str, cluster: str) -> None:
+        self.owners.setdefault(cluster, set()).add(rel)
+
+    def assign(self, rel: str, h: str, text: str) -> tuple[str, bool]:
+        """(cluster, is_new) for a chunk with hash ``h``."""
+        if self._joinable(h, rel):
+            self.progress.embeddings_saved += 1
+            self.claim(rel, h)
+            return h, False
+        sig = minhash(text) if self.near is not None else None
+        if sig is not None:
+            for c, _ in self.near.query(sig):
+                if self._joinable(c, rel):
+                    self.progress.embeddings_saved += 1
+                    self.progress.near_duplicates += 1
+                    self.claim(rel, c)
+                    return c, False
+            self.near.add(h, sig)
+        self.created.add(h)
+        self.claim(rel, h)
+        return h, True
+
+def _diff_files(
+    root: Path, repo: str, manifest: Manifest, clusters: _Clusters, seen: set[str], out: Pipe,
+    progress: IndexProgress, routes: RouteWriter, only: list[str] | None = None,
+) -> None:
+    """Stage 1: walk + chunk + dedup, emitting one job per new or changed file.
+
+    Changed Python files also refresh their rows in the route table.
+    """
+    def unchanged(ref: FileRef) -> bool:
+        if routes.cold and ref.rel.endswith(".py"):
+            return False  # no route table yet: every Python file is scanned once
+        old = manifest.files.get(ref.rel)
+        return bool(old and old.sha and old.mtime_ns == ref.mtime_ns and old.size == ref.size)
+
+    files = iter_files(root, unchanged=unchanged, workers=env_int("REPOGUIDE_READ_WORKERS", 8), only=only)
+    for ref, data in timing.timed("index.read", files):
+        if progress.cancel.is_set():
+            # an error, not Cancelled: a walk that ends early must not read as deleted files
+            raise Aborted("index run cancelled")
+        rel = ref.rel
+        seen.add(rel)
+        progress.files_walked += 1
+        if data is None:
+            continue
+        sha = file_hash(data)
+        old = manifest.files.get(rel)
+        if not old or old.sha != sha or routes.cold:
+            routes.update(rel, data)
+        if old and old.sha == sha:
+            # touched but identical: remember the new stat so next run skips the read
+            if (old.size, old.mtime_ns) != (ref.size, ref.mtime_ns):
+                out.put(_FileJob(rel=rel, entry=FileEntry(
+                    sha=sha, chunks=old.chunks, spans=old.spans, clusters=old.clusters,
+                    size=ref.size, mtime_ns=ref.mtime_ns,
+                )))
+            continue
+
+        # chunks this file already had keep their cluster, wherever they moved
+        kept = dict(zip(old.chunks, old.clusters)) if old else {}
+        job = _FileJob(rel=rel, entry=FileEntry(sha=sha, size=ref.size, mtime_ns=ref.mtime_ns))
+        with timing.span("index.chunk"):
+            chunks = chunk_file(rel, data.decode("utf-8", errors="ignore"))
+        for ch in chunks:
+            h = chunk_hash(ch.text)
+            c = kept.get(h)
+            if c is not None:
+                clusters.claim(rel, c)
+            else:
+                c, new = clusters.assign(rel, h, ch.text)
+                if new:
+                    job.texts.append(ch.text)
+                    job.payloads.append(_payload(repo, c, [(rel, ch.start_line, ch.end_line)]))
+                    job.ids.append(cluster_id(manifest.key, c))
+            job.entry.chunks.append(h)
+            job.entry.spans.append([ch.start_line, ch.end_line])
+            job.entry.clusters.append(c)
+        progress.files_changed += 1
+        out.put(job)
+    out.close()
+
+def _embed_batches(jobs: Pipe, out: Pipe, progress: IndexProgress) -> None:
+    """Stage 2: pack chunks from consecutive files into embedding batches.
+
+    A batch closes at the client's current item limit or before its
+    estimated tokens would pass the token budget (see BatchSizer), so small
+    chunks share a request and large ones don't overflow one.
+
+    Up to the client's concurrency limit of batches are in flight at once;
+    results are emitted in submission order. Each message carries the ids,
+    texts, payloads and (n, dim) float32 vectors of one batch plus the files whose
+    last chunk is in that batch, so the sink knows when a file has fully landed.
+    """
+    client = get_embedder()
+    sizer = client.batching
+    inflight: deque = deque()
+    pending: list[tuple[str, str, dict]] = []
+    tokens = 0
+    done: list[_FileJob] = []
+
+    def drain(limit: int):
+        while len(inflight) > limit:
+            fut, items, files = inflight.popleft()
+            with timing.span("index.embed_wait"):
+                vectors = fut.result() if items else None
+            ids = [pid for _, pid, _ in items]
+            texts = [t for t, _, _ in items]
+            payloads = [pl for _, _, pl in items]
+            progress.chunks_embedded += len(ids)
+            out.put((ids, texts, payloads, vectors, files))
+
+    def flush():
+        nonlocal pending, done, tokens
+        fut = client.submit([t for t, _, _ in pending]) if pending else None
+        inflight.append((fut, pending, done))
+        pending, done, tokens = [], [], 0
+        drain(client.concurrency)
+
+    try:
+        try:
+            for job in jobs:
+                last = len(job.ids) - 1
+                if last < 0:
+                    done.append(job)
+                for i, (t, pl, pid) in enumerate(zip(job.texts, job.payloads, job.ids)):
+                    n = estimate_tokens(t)
+                    if pending and tokens + n > sizer.max_tokens:
+                        flush()
+                    pending.append((t, pid, pl))
+                    tokens += n
+                    if i == last:
+                        done.append(job)
+                    if len(pending) >= sizer.limit:
+                        flush()
+            if pending or done:
+                flush()
+        except Cancelled:
+            drain(0)  # the walker died: batches already being embedded still go to the sink
+            raise
+        drain(0)
+    finally:
+        for fut, _, _ in inflight:
+            if fut is not None:
+                fut.cancel()
+    out.close()
+
+def index_local_repo(
+    path: str,
+    *,
+    inflight: int | None = None,
+    store: VectorStore | None = None,
+    progress: IndexProgress | None = None,
+    paths: Iterable[str] | None = None,
+) -> int:
+    """Bring the collection in line with the repo on disk.
+
+    Files stream through walk -> chunk -> embed -> upsert over bounded
+    queues (``inflight`` items per hand-off, default REPOGUIDE_INDEX_INFLIGHT),
+    so memory stays flat and every upserted batch survives a crash. Identical
+    and near-identical chunks share one point whose payload lists all their
+    locations, so only chunks unlike anything indexed are embedded; clusters
+    left without locations are removed, and the BM25 side index and the
+    route table (see routes.py) follow the same edits. ``paths`` (root-relative files or directories) limits the
+    pass to what a file watcher saw change; anything under them that is gone
+    from disk is removed. Returns the number of chunks embedded.
+    """
     root = Path(path)
     if not root.exists():
         return 0
 
-    # collect chunks
-    payloads, texts = [], []
-    for f in _iter_files(root):
-        try:
-            content = f.read_text(encoding="utf-8", errors="ignore")
-        except Exception:
-            continue
-        rel = str(f.relative_to(root))
-        for idx, ch in enumerate(_chunks(content)):
-            texts.append(ch)
-            payloads.append({"source": f"{rel}:{idx}", "text": ch})
+    inflight = inflight or env_int("REPOGUIDE_INDEX_INFLIGHT", 8)
+    upsert_batch = env_int("REPOGUIDE_UPSERT_BATCH", 256)
+    only = None if paths is None else sorted({p.strip("/") for p in paths})
+    if only is not None and "" in only:
+        only = None  # the root itself changed
 
-    if not texts:
-        return 0
+    store = store or get_store()
+    chunk_texts = get_text_store()
+    progress = progress or IndexProgress()
+    repo = repo_name(root)
+    collection = collection_for(COLLECTION, repo)
+    manifest = Manifest.load(root, collection)
+    owner = f"{collection}:{manifest.key}"  # this repo's references in the shared text store
+    lexical = LexicalWriter(collection, repo)
+    routes = RouteWriter(collection, repo)
+    near = NearDupIndex(manifest.key, collection) if near_enabled() else None
+    if not store.collection_exists(collection):
+        # fresh or dropped behind our back: manifest, BM25 docs and LSH are
+        # meaningless, and a targeted pass would only restore part of the tree
+        only = None
+        manifest.files.clear()
+        lexical.clear()
+        routes.clear()
+        if near is not None:
+            near.clear()
+        chunk_texts.release(owner)
 
-    # embed in small batches
-    vectors, B = [], 16
-    for i in range(0, len(texts), B):
-        vectors.extend(_embed(texts[i : i + B]))
+    # cluster -> rel -> spans; the sink's record of where each point's chunk lives
+    members: dict[str, dict[str, list[tuple[int, int]]]] = {}
+    for rel, e in manifest.files.items():
+        for c, (s, t) in zip(e.clusters, e.spans):
+            members.setdefault(c, {}).setdefault(rel, []).append((s, t))
+    clusters = _Clusters({c: set(m) for c, m in members.items()}, near, progress)
 
-    dim = len(vectors[0])
-    client = QdrantClient(url=os.getenv("QDRANT_URL", "http://qdrant:6333"))
+    stages = Stages()
+    jobs, embedded = stages.pipe(inflight), stages.pipe(inflight)
+    seen: set[str] = set()
+    stages.spawn("walk", _diff_files, root, repo, manifest, clusters, seen, jobs, progress, routes, only)
+    stages.spawn("embed", _embed_batches, jobs, embedded, progress)
+
+    # Stage 3 (this thread): buffer points into larger upserts; a file's
+    # manifest entry is only committed once all of its points are stored.
+    count, last_save = 0, time.monotonic()
+    ids: list[str] = []
+    texts: list[str] = []
+    payloads: list[dict] = []
+    vectors: list[np.ndarray] = []  # float32 blocks; boxed into lists only per upsert
+    landed: list[_FileJob] = []
+    written: dict[str, list[Loc]] = {}  # clusters upserted before their file landed
+    emptied: set[str] = set()          # clusters that lost their last location this run
+    wrote = False                      # anything changed in the store or the BM25 index
+
+    def locs(c: str) -> list[Loc]:
+        return sorted((rel, s, t) for rel, spans in members.get(c, {}).items() for s, t in spans)
+
+    def move(rel: str, new: FileEntry | None, before: dict[str, list[Loc]]) -> None:
+        """Swap ``rel``'s locations in ``members`` from its manifest entry to ``new``."""
+        def touch(c: str) -> None:
+            if c not in before:
+                before[c] = written.pop(c) if c in written else locs(c)
+        old = manifest.files.get(rel)
+        for c in old.clusters if old else ():
+            touch(c)
+            members.get(c, {}).pop(rel, None)
+        for c, (s, t) in zip(new.clusters, new.spans) if new else ():
+            touch(c)
+            members.setdefault(c, {}).setdefault(rel, []).append((s, t))
+
+    def relocate(before: dict[str, list[Loc]]) -> bool:
+        """Rewrite payloads whose locations changed; note clusters that emptied."""
+        changed = []
+        for c, was in before.items():
+            now = locs(c)
+            if not now:
+                emptied.add(c)
+            elif now != was:
+                changed.append((cluster_id(manifest.key, c), _payload(repo, c, now)))
+        if changed:
+            store.set_payloads(collection, changed)
+            lexical.set_paths((pid, pl["paths"]) for pid, pl in changed)
+        return bool(changed)
+
+    def flush():
+        with timing.span("index.upsert"):
+            _flush()
+
+    def _flush():
+        nonlocal ids, texts, payloads, vectors, landed, last_save, wrote
+        before: dict[str, list[Loc]] = {}
+        for j in landed:
+            move(j.rel, j.entry, before)
+        if ids:
+            # text first: a point must never be searchable without its text
+            chunk_texts.put_many(owner, ((pl["chunk"], t) for pl, t in zip(payloads, texts)))
+            for i, pl in enumerate(payloads):
+                c = pl["chunk"]
+                now = locs(c)
+                if now:  # its file landed in this same flush
+                    payloads[i] = _payload(repo, c, now)
+                    before.pop(c, None)
+                else:
+                    written[c] = [(pl["path"], pl["start_line"], pl["end_line"])]
+            mat = np.concatenate(vectors)
+            store.ensure_collection(collection, mat.shape[1])
+            store.upsert(collection, ids, mat, payloads)
+            progress.points_upserted += len(ids)
+            lexical.add((pid, pl["paths"], t) for pid, pl, t in zip(ids, payloads, texts))
+        moved = relocate(before)
+        if ids or moved:
+            wrote = True
+            bump_generation(collection)  # cached answers may cite what just changed
+        for j in landed:
+            manifest.files[j.rel] = j.entry
+        if landed and time.monotonic() - last_save > 5.0:
+            manifest.save()
+            last_save = time.monotonic()
+        ids, texts, payloads, vectors, landed = [], [], [], [], []
+
+    def close():
+        manifest.save()
+        lexical.commit()
+        lexical.close()
+        routes.commit()
+        routes.close()
+        if wrote:
+            bump_generation(collection)  # again: BM25 results changed with the commit
+        if near is not None:
+            near.close()
 
-    # create collection if needed (idempotent)
     try:
-        client.create_collection(
-            collection_name=COLLECTION,
-            vectors_config=VectorParams(size=dim, distance=Distance.COSINE),
-        )
-    except Exception:
-        pass
-
-    points = [
-        PointStruct(id=uuid.uuid4().int % 10**12, vector=v, payload=pl)
-        for v, pl in zip(vectors, payloads)
+        try:
+            for batch_ids, batch_texts, batch_payloads, batch_vectors, done in embedded:
+                if batch_ids:
+                    ids.extend(batch_ids)
+                    texts.extend(batch_texts)
+                    payloads.extend(batch_payloads)
+                    vectors.append(batch_vectors)
+                landed.extend(done)
+                count += len(batch_ids)
+                if len(ids) >= upsert_batch:
+                    flush()
+        except Cancelled:
+            pass  # an earlier stage failed (join() re-raises it); still store what reached us
+        flush()
+    except BaseException as e:
+        stages.fail(e)
+    try:
+        stages.join()
+    except BaseException:
+        # keep whatever fully landed, even if the run died
+        close()
+        raise
+
+    removed = [
+        rel for rel in manifest.files
+        if rel not in seen and (only is None or any(rel == p or rel.startswith(p + "/") for p in only))
     ]
-    client.upsert(collection_name=COLLECTION, points=points)
-    return len(points)
+    before: dict[str, list[Loc]] = {}
+    for rel in removed:
+        move(rel, None, before)
+        del manifest.files[rel]
+    routes.remove(removed)
+    if relocate(before):
+        wrote = True
+    # deletes wait for the end: the walker may have joined an emptied cluster later in the run
+    dead = sorted(c for c in emptied if not members.get(c))
+    stale = [cluster_id(manifest.key, c) for c in dead]
+    wrote = wrote or bool(stale)
+    store.delete(collection, stale)
+    lexical.delete(stale)
+    if near is not None:
+        near.remove(dead)
+    chunk_texts.release(owner, dead)  # after the points: nothing searchable loses its text
+    with timing.span("index.commit"):
+        close()
+    return count
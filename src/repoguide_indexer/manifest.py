@@ -0,0 +1,96 @@
+# src/repoguide_indexer/manifest.py
+from __future__ import annotations
+import hashlib, json, os, re, uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from repoguide_config.env import state_dir
+
+# fixed namespace so the same (repo, cluster) always maps to the same point id
+_POINT_NS = uuid.UUID("5b0c7a3e-2f0b-4c4e-9d59-6a1f3c2e8b11")
+
+def _generation_path(collection: str) -> Path:
+    return state_dir() / "generations" / collection
+
+def bump_generation(collection: str) -> None:
+    """Record that ``collection`` changed, so answers cached against it go stale."""
+    p = _generation_path(collection)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    token = uuid.uuid4().hex
+    tmp = p.with_name(f".{p.name}.{token}")
+    tmp.write_text(token, encoding="ascii")
+    os.replace(tmp, p)
+
+def generation(collection: str) -> str:
+    """Opaque token that changes on every indexer write to ``collection``."""
+    p = _generation_path(collection)
+    try:
+        return f"{p}:{p.read_text(encoding='ascii')}"
+    except OSError:
+        return f"{p}:"
+
+def repo_key(root: Path) -> str:
+    return hashlib.sha1(str(root.resolve()).encode("utf-8")).hexdigest()[:16]
+
+def repo_name(root: Path) -> str:
+    """Short, filesystem- and collection-safe repo label used for scoping."""
+    return re.sub(r"[^A-Za-z0-9._-]", "_", root.resolve().name) or "root"
+
+def file_hash(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def cluster_id(key: str, cluster: str) -> str:
+    # one point per cluster of identical / near-identical chunks, keyed by
+    # the hash of the chunk whose text was embedded
+    return str(uuid.uuid5(_POINT_NS, f"{key}\0{cluster}"))
+
+@dataclass
+class FileEntry:
+    sha: str
+    chunks: list[str] = field(default_factory=list)  # chunk hashes, in file order
+    spans: list[list[int]] = field(default_factory=list)  # [start_line, end_line] per chunk
+    clusters: list[str] = field(default_factory=list)  # cluster (point) per chunk
+    size: int = 0        # stat at hash time; a match lets the walker skip the read
+    mtime_ns: int = 0
+
+@dataclass
+class Manifest:
+    """What we last wrote to the vector store for one repo + collection."""
+    key: str
+    collection: str
+    files: dict[str, FileEntry] = field(default_factory=dict)
+
+    @staticmethod
+    def path_for(key: str, collection: str) -> Path:
+        return state_dir() / "manifests" / f"{collection}-{key}.json"
+
+    @classmethod
+    def load(cls, root: Path, collection: str) -> "Manifest":
+        key = repo_key(root)
+        p = cls.path_for(key, collection)
+        try:
+            raw = json.loads(p.read_text(encoding="utf-8"))
+            files = {rel: FileEntry(**e) for rel, e in raw["files"].items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            return cls(key=key, collection=collection)
+        return cls(key=key, collection=collection, files=files)
+
+    def save(self) -> None:
+        p = self.path_for(self.key, self.collection)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        raw = {
+            "files": {
+                rel: {
+                    "sha": e.sha, "chunks": e.chunks, "spans": e.spans, "clusters": e.clusters,
+                    "size": e.size, "mtime_ns": e.mtime_ns,
+                }
+                for rel, e in sorted(self.files.items())
+            },
+        }
+        # write-then-rename so a crash never leaves a truncated manifest behind
+        tmp = p.with_suffix(".tmp")
+        tmp.write_text(json.dumps(raw, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, p)
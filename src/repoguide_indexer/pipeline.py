@@ -0,0 +1,88 @@
+# src/repoguide_indexer/pipeline.py
+from __future__ import annotations
+import queue, threading
+from typing import Any, Callable, Iterator
+
+_END = object()
+
+class Cancelled(Exception):
+    pass
+
+class Aborted(Exception):
+    """The run was cancelled from outside (IndexProgress.cancel); fails it like an error."""
+
+class Pipe:
+    """Bounded hand-off between two pipeline stages.
+
+    ``put`` blocks while the pipe is full, which is what gives us
+    backpressure: a slow embedder stalls the walker instead of letting
+    chunks pile up in memory.
+
+    Once a stage fails, the others stop only where they would otherwise
+    wait: ``put`` on a full pipe and iteration over an empty one raise
+    Cancelled. Items already queued are still delivered, so work finished
+    before the failure reaches the sink and gets written.
+    """
+
+    def __init__(self, maxsize: int, stop: threading.Event):
+        self._q: queue.Queue = queue.Queue(maxsize=max(1, maxsize))
+        self._stop = stop
+
+    def put(self, item: Any) -> None:
+        while True:
+            try:
+                self._q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if self._stop.is_set():
+                    raise Cancelled() from None
+
+    def close(self) -> None:
+        self.put(_END)
+
+    def __iter__(self) -> Iterator[Any]:
+        while True:
+            try:
+                item = self._q.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    raise Cancelled() from None
+                continue
+            if item is _END:
+                return
+            yield item
+
+class Stages:
+    """Runs pipeline stages on worker threads and surfaces the first failure."""
+
+    def __init__(self) -> None:
+        self.stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._error: BaseException | None = None
+
+    def pipe(self, maxsize: int) -> Pipe:
+        return Pipe(maxsize, self.stop)
+
+    def spawn(self, name: str, fn: Callable[..., None], *args: Any) -> None:
+        def run():
+            try:
+                fn(*args)
+            except Cancelled:
+                pass
+            except BaseException as e:  # noqa: BLE001 - re-raised in join()
+                self.fail(e)
+
+        t = threading.Thread(target=run, name=f"repoguide-{name}", daemon=True)
+        self._threads.append(t)
+        t.start()
+
+    def fail(self, e: BaseException) -> None:
+        if self._error is None:
+            self._error = e
+        self.stop.set()
+
+    def join(self) -> None:
+        for t in self._threads:
+            t.join()
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,29 @@
+# src/repoguide_indexer/progress.py
+from __future__ import annotations
+import threading, time
+from dataclasses import dataclass, field
+
+@dataclass
+class IndexProgress:
+    """Live counters for one run; each field has a single writer stage."""
+    files_walked: int = 0
+    files_changed: int = 0
+    chunks_embedded: int = 0
+    embeddings_saved: int = 0   # new chunks that joined an existing cluster instead
+    near_duplicates: int = 0    # ...of which matched by MinHash rather than exact hash
+    points_upserted: int = 0
+    started: float = field(default_factory=time.monotonic)
+    cancel: threading.Event = field(default_factory=threading.Event, repr=False)  # set to stop the run early
+
+    def snapshot(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        return {
+            "files_walked": self.files_walked,
+            "files_changed": self.files_changed,
+            "chunks_embedded": self.chunks_embedded,
+            "embeddings_saved": self.embeddings_saved,
+            "near_duplicates": self.near_duplicates,
+            "points_upserted": self.points_upserted,
+            "elapsed_s": round(elapsed, 3),
+            "chunks_per_s": round(self.chunks_embedded / elapsed, 2) if elapsed > 0 else 0.0,
+        }
@@ -0,0 +1,332 @@
+# src/repoguide_indexer/routes.py
+from __future__ import annotations
+import ast, json, os, re, sqlite3, threading
+from pathlib import Path
+from typing import Iterable
+from urllib.parse import urlsplit
+
+from repoguide_config.env import state_dir
+
+HTTP_METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS", "TRACE")
+_VERBS = frozenset(m.lower() for m in HTTP_METHODS)
+# FastAPI {item_id} / {p:path}, Flask <item_id> / <int:item_id>, f-string holes
+_PARAM = re.compile(r"\{[^{}]*\}|<[^<>]*>")
+
+def normalize_path(path: str) -> str:
+    """Route path with parameters as ``{}``, no host, query or trailing slash."""
+    if path.startswith("{}/"):  # f"{BASE_URL}/items"
+        path = path[2:]
+    if "://" in path:
+        path = urlsplit(path).path
+    path = _PARAM.sub("{}", path.split("?", 1)[0].split("#", 1)[0])
+    path = "/" + "/".join(s for s in path.split("/") if s)
+    return path
+
+def route_key(method: str, path: str) -> str:
+    return f"{method.upper()} {normalize_path(path)}"
+
+# --- scanning ---
+
+def is_test_file(rel: str) -> bool:
+    parts = rel.split("/")
+    name = parts[-1]
+    return name.startswith("test_") or name.endswith("_test.py") or any(p in ("tests", "test") for p in parts[:-1])
+
+def _str(node: ast.AST | None) -> str | None:
+    """Literal string value; f-string holes and a non-literal right operand become ``{}``."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.JoinedStr):
+        return "".join(
+            v.value if isinstance(v, ast.Constant) and isinstance(v.value, str) else "{}" for v in node.values
+        )
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        left = _str(node.left)
+        if left is not None:
+            return left + (_str(node.right) or "{}")
+    return None
+
+def _prefixes(tree: ast.Module) -> dict[str, str]:
+    """``router = APIRouter(prefix="/v1")`` / ``bp = Blueprint(..., url_prefix="/v1")``."""
+    out = {}
+    for stmt in tree.body:
+        if isinstance(stmt, ast.Assign) and isinstance(stmt.value, ast.Call):
+            for kw in stmt.value.keywords:
+                prefix = _str(kw.value) if kw.arg in ("prefix", "url_prefix") else None
+                if prefix:
+                    for t in stmt.targets:
+                        if isinstance(t, ast.Name):
+                            out[t.id] = prefix
+    return out
+
+def _decorated(dec: ast.expr, prefixes: dict[str, str]) -> list[tuple[str, str]]:
+    """(method, path) pairs a route decorator registers, if ``dec`` is one."""
+    if not (isinstance(dec, ast.Call) and isinstance(dec.func, ast.Attribute)):
+        return []
+    attr = dec.func.attr
+    if attr in _VERBS:
+        methods = [attr.upper()]
+    elif attr in ("route", "api_route"):  # Flask / FastAPI, GET unless methods=[...]
+        methods = ["GET"]
+        for kw in dec.keywords:
+            if kw.arg == "methods" and isinstance(kw.value, (ast.List, ast.Tuple, ast.Set)):
+                methods = [m.upper() for m in map(_str, kw.value.elts) if m]
+    else:
+        return []
+    arg = dec.args[0] if dec.args else next((kw.value for kw in dec.keywords if kw.arg in ("path", "rule")), None)
+    path = _str(arg)
+    if path is None:
+        return []
+    owner = dec.func.value
+    path = (prefixes.get(owner.id, "") if isinstance(owner, ast.Name) else "") + path
+    # mock.patch("pkg.mod.attr") and friends are not routes
+    if not path.startswith("/"):
+        return []
+    return [(m, path) for m in methods if m in HTTP_METHODS]
+
+def _calls(fn: ast.AST) -> list[tuple[str, str]]:
+    """(method, path) for test-client style calls: client.get("/x"), client.request("POST", "/x")."""
+    out = []
+    for node in ast.walk(fn):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)):
+            continue
+        attr, args = node.func.attr, node.args
+        if attr in _VERBS and args:
+            method, path = attr.upper(), _str(args[0])
+        elif attr == "request" and len(args) >= 2:
+            method, path = (_str(args[0]) or "").upper(), _str(args[1])
+        else:
+            continue
+        if method in HTTP_METHODS and path and (path.startswith(("/", "{}/")) or "://" in path):
+            out.append((method, path))
+    return out
+
+Row = tuple[str, str, str, int, int]  # (kind, method, path, start_line, end_line)
+
+def scan(rel: str, source: str) -> list[Row]:
+    """Routes a module registers, or for test files, the routes its tests call."""
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+    test = is_test_file(rel)
+    prefixes = {} if test else _prefixes(tree)
+    rows: list[Row] = []
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        start = min([node.lineno, *(d.lineno for d in node.decorator_list)])
+        end = node.end_lineno or node.lineno
+        if test:
+            if node.name.startswith("test"):
+                rows.extend(("test", m, normalize_path(p), start, end) for m, p in dict.fromkeys(_calls(node)))
+        else:
+            for dec in node.decorator_list:
+                rows.extend(("route", m, normalize_path(p), start, end) for m, p in _decorated(dec, prefixes))
+    return rows
+
+# --- index-time side ---
+
+_FORMAT = 2
+# rows of one method and segment count; a lookup never leaves its bucket
+_SLASHES = "length(path) - length(replace(path, '/', ''))"
+
+def _dir(collection: str, repo: str = "") -> Path:
+    d = state_dir() / "routes" / collection
+    return d / repo if repo else d
+
+def _bucket(method: str, path: str) -> str:
+    return f"{method}.{path.count('/')}"
+
+_partitions: dict[str, tuple[int, list[str]]] = {}
+
+def partitions(collection: str) -> list[str]:
+    """Repos with a route directory in ``collection``; re-listed only when the directory changes."""
+    d = _dir(collection)
+    try:
+        mtime = d.stat().st_mtime_ns
+        cached = _partitions.get(str(d))
+        if cached and cached[0] == mtime:
+            return cached[1]
+        names = sorted(e.name for e in os.scandir(d) if e.is_dir())
+    except OSError:
+        return []
+    _partitions[str(d)] = (mtime, names)
+    return names
+
+def _compiled(d: Path) -> bool:
+    try:
+        return json.loads((d / "routes.json").read_text(encoding="utf-8")).get("format") == _FORMAT
+    except (OSError, ValueError, AttributeError):
+        return False
+
+class RouteWriter:
+    """Per-(collection, repo) route rows that the indexer keeps in sync.
+
+    Rows are replaced per file as the walker reads changed ``.py`` files;
+    ``commit()`` recompiles only the buckets (method and segment count) those
+    files touched, each a small ``GET.2.json`` mapping ``"GET /items/{}"`` to
+    the handlers and the tests that call it. Until routes.json marks the
+    directory compiled the table is ``cold`` and the indexer reads every
+    Python file once.
+    """
+
+    def __init__(self, collection: str, repo: str = ""):
+        self.collection = collection
+        self.repo = repo
+        d = _dir(collection, repo)
+        d.mkdir(parents=True, exist_ok=True)
+        self.cold = not _compiled(d)
+        self._db = sqlite3.connect(str(d / "routes.sqlite3"), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS rows (file TEXT NOT NULL, kind TEXT NOT NULL, method TEXT NOT NULL, "
+            "path TEXT NOT NULL, start INTEGER NOT NULL, end INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS rows_file ON rows(file)")
+        self._db.execute(f"CREATE INDEX IF NOT EXISTS rows_bucket ON rows(method, {_SLASHES})")
+        self._lock = threading.Lock()
+        self._touched: set[str] = set()
+
+    def _drop(self, rels: list[str]) -> None:
+        for rel in rels:
+            self._touched.update(
+                _bucket(m, p) for m, p in self._db.execute("SELECT method, path FROM rows WHERE file=?", (rel,))
+            )
+        self._db.executemany("DELETE FROM rows WHERE file=?", [(r,) for r in rels])
+
+    def update(self, rel: str, data: bytes) -> None:
+        """Replace ``rel``'s rows with a fresh scan (non-Python files are ignored)."""
+        if not rel.endswith(".py"):
+            return
+        rows = scan(rel, data.decode("utf-8", errors="ignore"))
+        with self._lock:
+            self._drop([rel])
+            self._db.executemany("INSERT INTO rows VALUES (?, ?, ?, ?, ?, ?)", [(rel, *r) for r in rows])
+            self._touched.update(_bucket(m, p) for _, m, p, _, _ in rows)
+
+    def remove(self, rels: Iterable[str]) -> None:
+        rels = [r for r in rels if r.endswith(".py")]
+        if rels:
+            with self._lock:
+                self._drop(rels)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._touched.update(_bucket(m, p) for m, p in self._db.execute("SELECT method, path FROM rows"))
+            self._db.execute("DELETE FROM rows")
+
+    def commit(self) -> None:
+        with self._lock:
+            self._db.commit()
+            d = _dir(self.collection, self.repo)
+            if self.cold:
+                # a full build also drops buckets left by an earlier table
+                self._touched.update(_bucket(m, p) for m, p in self._db.execute("SELECT method, path FROM rows"))
+                self._touched.update(f.name[:-5] for f in d.glob("*.*.json"))
+            for bucket in sorted(self._touched):
+                _compile(self._db, d, bucket)
+            if self.cold:
+                (d / "routes.json").write_text(json.dumps({"format": _FORMAT}), encoding="utf-8")
+            self._touched.clear()
+            self.cold = False
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+def _matches(template: list[str], path: list[str]) -> bool:
+    return len(template) == len(path) and all(t == p or t == "{}" for t, p in zip(template, path))
+
+def _compile(db: sqlite3.Connection, d: Path, bucket: str) -> None:
+    # <bucket>.json: route key -> handlers, and -> tests calling it (a test that
+    # calls /items/42 is filed under GET /items/{}); calls that match no
+    # handler keep their own key, e.g. routes mounted with include_router(prefix=)
+    method, slashes = bucket.rsplit(".", 1)
+    routes: dict[str, list] = {}
+    calls: list[tuple[str, list]] = []
+    for file, kind, path, start, end in db.execute(
+        f"SELECT file, kind, path, start, end FROM rows WHERE method=? AND {_SLASHES}=? ORDER BY file, start",
+        (method, int(slashes)),
+    ):
+        if kind == "route":
+            routes.setdefault(f"{method} {path}", []).append([file, start, end])
+        else:
+            calls.append((path, [file, start, end]))
+    out = d / f"{bucket}.json"
+    if not routes and not calls:
+        out.unlink(missing_ok=True)
+        return
+    templates = [(k.split(" ", 1)[1].split("/"), k) for k in routes if "{}" in k]
+    tests: dict[str, list] = {}
+    for path, cite in calls:
+        key = f"{method} {path}"
+        if key not in routes:
+            segs = path.split("/")
+            key = next((k for t, k in templates if _matches(t, segs)), key)
+        if cite not in tests.setdefault(key, []):
+            tests[key].append(cite)
+    tmp = d / f"{bucket}.json.tmp"
+    tmp.write_text(json.dumps({"routes": routes, "tests": tests}, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, out)
+
+# --- query-time side ---
+
+Span = tuple[str, int, int]  # (file, start_line, end_line)
+
+class RouteTable:
+    """One compiled bucket: every route key of a method and segment count."""
+
+    def __init__(self, raw: dict):
+        self.routes: dict[str, list[list]] = raw.get("routes", {})
+        self.tests: dict[str, list[list]] = raw.get("tests", {})
+        # parameterized keys, for concrete lookups like /items/42
+        self._templates = [(k.split(" ", 1)[1].split("/"), k) for k in (*self.routes, *self.tests) if "{}" in k]
+
+    def lookup(self, key: str) -> tuple[list[Span], list[Span]]:
+        """(handlers, tests) for a normalized route key, template or concrete."""
+        if key not in self.routes and key not in self.tests:
+            segs = key.split(" ", 1)[1].split("/")
+            key = next((k for t, k in self._templates if _matches(t, segs)), key)
+        return (
+            [tuple(c) for c in self.routes.get(key, ())],
+            [tuple(c) for c in self.tests.get(key, ())],
+        )
+
+_loaded: dict[str, tuple[int, RouteTable]] = {}
+_load_lock = threading.Lock()
+
+def load(collection: str, repo: str, bucket: str) -> RouteTable | None:
+    """A compiled bucket; re-read only when its file changes."""
+    p = _dir(collection, repo) / f"{bucket}.json"
+    try:
+        mtime = p.stat().st_mtime_ns
+    except OSError:
+        return None
+    with _load_lock:
+        cached = _loaded.get(str(p))
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            table = RouteTable(json.loads(p.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            return None
+        _loaded[str(p)] = (mtime, table)
+        return table
+
+def lookup(
+    method: str, path: str, collections: Iterable[str], repo: str | None = None
+) -> tuple[list[tuple[str, Span]], list[tuple[str, Span]]]:
+    """(repo, span) handlers and tests for a route across the given collections."""
+    key = route_key(method, path)
+    bucket = _bucket(*key.split(" ", 1))
+    handlers: list[tuple[str, Span]] = []
+    tests: list[tuple[str, Span]] = []
+    for c in collections:
+        for r in [repo] if repo else partitions(c):
+            table = load(c, r, bucket)
+            if table is not None:
+                h, t = table.lookup(key)
+                handlers.extend((r, s) for s in h)
+                tests.extend((r, s) for s in t)
+    return handlers, tests
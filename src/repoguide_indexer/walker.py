@@ -0,0 +1,261 @@
+# src/repoguide_indexer/walker.py
+from __future__ import annotations
+import os, re, stat
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, NamedTuple
+
+DEFAULT_EXTS = frozenset({".md", ".py", ".txt"})
+# never worth descending into, .gitignore or not
+DEFAULT_EXCLUDES = (
+    ".git/", ".hg/", ".svn/", "node_modules/", ".venv/", "venv/", "__pycache__/",
+    ".mypy_cache/", ".pytest_cache/", ".ruff_cache/", ".tox/", ".nox/", ".next/",
+    "dist/", "build/", "target/", "*.egg-info/", ".idea/", ".vscode/",
+)
+MAX_FILE_BYTES = 1 << 20
+SNIFF_BYTES = 8192
+
+def _glob_to_regex(pat: str) -> str:
+    out, i, n = [], 0, len(pat)
+    while i < n:
+        c = pat[i]
+        if pat.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pat.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif c == "*":
+            out.append("[^/]*")
+            i += 1
+        elif c == "?":
+            out.append("[^/]")
+            i += 1
+        elif c == "[":
+            j = pat.find("]", i + 1)
+            if j == -1:
+                out.append(re.escape(c))
+                i += 1
+            else:
+                body = pat[i + 1 : j].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = j + 1
+        else:
+            if c == "\\" and i + 1 < n:
+                i += 1
+                c = pat[i]
+            out.append(re.escape(c))
+            i += 1
+    return "".join(out)
+
+class FileRef(NamedTuple):
+    rel: str
+    path: str
+    size: int
+    mtime_ns: int
+
+@dataclass(frozen=True)
+class _Rule:
+    base: str           # directory the pattern is relative to ("" = root)
+    regex: re.Pattern
+    negate: bool
+    dir_only: bool
+
+def parse_ignore(lines: Iterable[str], base: str = "") -> list[_Rule]:
+    """gitignore syntax: !negation, trailing / for dirs, leading or inner / anchors, **."""
+    rules = []
+    for raw in lines:
+        line = raw.rstrip("\n").rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith("\\"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        anchored = "/" in line
+        line = line.lstrip("/")
+        body = _glob_to_regex(line)
+        regex = re.compile(f"^{body}$" if anchored else f"^(?:.*/)?{body}$")
+        rules.append(_Rule(base=base, regex=regex, negate=negate, dir_only=dir_only))
+    return rules
+
+def _ignored(rules: list[_Rule], rel: str, is_dir: bool) -> bool:
+    hit = False
+    for r in rules:
+        if r.dir_only and not is_dir:
+            continue
+        if r.base:
+            if not rel.startswith(r.base + "/"):
+                continue
+            sub = rel[len(r.base) + 1 :]
+        else:
+            sub = rel
+        if r.regex.match(sub):
+            hit = not r.negate
+    return hit
+
+def _env_excludes() -> list[str]:
+    raw = os.getenv("REPOGUIDE_EXCLUDE", "")
+    return [p.strip() for p in raw.split(",") if p.strip()]
+
+def _read_ignore(dpath: str, drel: str, rules: list[_Rule]) -> list[_Rule]:
+    try:
+        with open(os.path.join(dpath, ".gitignore"), encoding="utf-8", errors="ignore") as fh:
+            return rules + parse_ignore(fh, drel)
+    except OSError:
+        return rules
+
+def walk(
+    root: Path,
+    *,
+    exts: Iterable[str] | None = DEFAULT_EXTS,
+    excludes: Iterable[str] | None = None,
+    max_bytes: int | None = MAX_FILE_BYTES,
+    only: Iterable[str] | None = None,
+) -> Iterator[FileRef]:
+    """Yield candidate files with the stat info scandir already gave us.
+
+    Uses os.scandir and prunes excluded / ignored directories before
+    descending, honoring nested .gitignore files. Files above ``max_bytes``
+    are dropped on their stat alone. ``exts=None`` / ``max_bytes=None``
+    disable the extension and size filters. ``only`` restricts the walk to
+    those root-relative files and directories (missing ones are skipped),
+    with the same ignore rules a full walk would apply to them.
+    """
+    exts = {e.lower() for e in exts} if exts is not None else None
+    base_rules = parse_ignore([*DEFAULT_EXCLUDES, *_env_excludes(), *(excludes or [])])
+    if only is None:
+        yield from _scan([(str(root), "", base_rules)], exts, max_bytes)
+        return
+
+    # rules in effect inside each directory, built from the root down
+    dir_rules: dict[str, list[_Rule] | None] = {"": _read_ignore(str(root), "", base_rules)}
+
+    def rules_for(drel: str) -> list[_Rule] | None:
+        """None if ``drel`` or one of its parents is ignored."""
+        if drel not in dir_rules:
+            parent, _, _ = drel.rpartition("/")
+            up = rules_for(parent)
+            if up is None or _ignored(up, drel, True):
+                dir_rules[drel] = None
+            else:
+                dir_rules[drel] = _read_ignore(os.path.join(root, drel), drel, up)
+        return dir_rules[drel]
+
+    done: set[str] = set()
+    for rel in sorted({r.strip("/") for r in only}):
+        if not rel or any(rel.startswith(d + "/") for d in done):
+            continue
+        path = os.path.join(root, rel)
+        try:
+            st = os.stat(path, follow_symlinks=False)
+        except OSError:
+            continue
+        parent, _, name = rel.rpartition("/")
+        rules = rules_for(parent)
+        if rules is None:
+            continue
+        if stat.S_ISDIR(st.st_mode):
+            inner = rules_for(rel)
+            if inner is not None:
+                done.add(rel)
+                yield from _scan([(path, rel, inner)], exts, max_bytes, gitignore_read=True)
+        elif (
+            stat.S_ISREG(st.st_mode)
+            and (exts is None or os.path.splitext(name)[1].lower() in exts)
+            and (max_bytes is None or st.st_size <= max_bytes)
+            and not _ignored(rules, rel, False)
+        ):
+            yield FileRef(rel, path, st.st_size, st.st_mtime_ns)
+
+def _scan(
+    stack: list[tuple[str, str, list[_Rule]]],
+    exts: set[str] | None,
+    max_bytes: int | None,
+    gitignore_read: bool = False,
+) -> Iterator[FileRef]:
+    top = gitignore_read  # the first directory's own .gitignore is already in its rules
+    while stack:
+        dpath, drel, rules = stack.pop()
+        try:
+            with os.scandir(dpath) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        if not top and any(e.name == ".gitignore" for e in entries):
+            rules = _read_ignore(dpath, drel, rules)
+        top = False
+        subdirs = []
+        for e in entries:
+            rel = f"{drel}/{e.name}" if drel else e.name
+            try:
+                is_dir = e.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir:
+                if not _ignored(rules, rel, True):
+                    subdirs.append((e.path, rel, rules))
+                continue
+            if exts is not None and os.path.splitext(e.name)[1].lower() not in exts:
+                continue
+            try:
+                if not e.is_file():
+                    continue
+                st = e.stat()
+            except OSError:
+                continue
+            if (max_bytes is None or st.st_size <= max_bytes) and not _ignored(rules, rel, False):
+                yield FileRef(rel, e.path, st.st_size, st.st_mtime_ns)
+        # reversed so the stack pops directories in name order
+        stack.extend(reversed(subdirs))
+
+def read_text_file(path: str) -> bytes | None:
+    """File contents, or None for unreadable or binary (NUL in the first bytes)."""
+    try:
+        with open(path, "rb") as fh:
+            head = fh.read(SNIFF_BYTES)
+            if b"\0" in head:
+                return None
+            return head + fh.read()
+    except OSError:
+        return None
+
+def iter_files(
+    root: Path,
+    *,
+    workers: int = 8,
+    unchanged: Callable[[FileRef], bool] | None = None,
+    **walk_kw,
+) -> Iterator[tuple[FileRef, bytes | None]]:
+    """walk() + reads on a thread pool, in walk order, at most 2*workers ahead.
+
+    Files for which ``unchanged(ref)`` is true are not read at all and come
+    back with ``None`` data; binary and unreadable files are dropped.
+    """
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="repoguide-read") as pool:
+        window: deque = deque()
+
+        def ready(limit: int):
+            while len(window) > limit:
+                ref, fut = window.popleft()
+                if fut is None:
+                    yield ref, None
+                else:
+                    data = fut.result()
+                    if data is not None:
+                        yield ref, data
+
+        for ref in walk(root, **walk_kw):
+            skip = unchanged is not None and unchanged(ref)
+            window.append((ref, None if skip else pool.submit(read_text_file, ref.path)))
+            yield from ready(2 * workers)
+        yield from ready(0)
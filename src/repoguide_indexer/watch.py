@@ -0,0 +1,157 @@
+# src/repoguide_indexer/watch.py
+from __future__ import annotations
+import logging, os, queue, threading, time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator
+
+from repoguide_config.env import env_int
+from repoguide_indexer.index_repo import IndexProgress, index_local_repo
+from repoguide_indexer.walker import DEFAULT_EXTS, walk
+
+try:  # inotify / FSEvents / ReadDirectoryChangesW via the Rust notify crate
+    import watchfiles
+except ImportError:  # pragma: no cover - depends on the environment
+    watchfiles = None
+
+log = logging.getLogger("repoguide.watch")
+
+@dataclass
+class WatchPass:
+    """One re-index triggered by a burst of changes (``paths=None``: full pass)."""
+    paths: list[str] | None
+    embedded: int
+    seconds: float
+    progress: dict
+    error: str | None = None
+
+def _rel(root: Path, path: str) -> str | None:
+    try:
+        return Path(path).resolve().relative_to(root).as_posix()
+    except (OSError, ValueError):
+        return None
+
+def _native(root: Path, quiet_ms: int, max_ms: int, stop: threading.Event) -> Iterator[set[str]]:
+    """Start OS notifications on a background thread; returns once they are being recorded."""
+    events: queue.Queue[set[str] | None] = queue.Queue()
+    ready = threading.Event()
+
+    def pump() -> None:
+        # watchfiles yields once nothing has changed for ``step`` ms, or after
+        # ``debounce`` ms of continuous changes; its default filter skips .git,
+        # __pycache__, node_modules and editor swap files. The (empty) timeout
+        # yields tell us the watcher is live.
+        try:
+            for batch in watchfiles.watch(
+                root, step=quiet_ms, debounce=max_ms, stop_event=stop, raise_interrupt=False,
+                rust_timeout=max(quiet_ms, 50), yield_on_timeout=True,
+            ):
+                ready.set()
+                rels = {r for r in (_rel(root, p) for _, p in batch) if r is not None}
+                if rels:
+                    events.put(rels)
+        finally:
+            ready.set()
+            events.put(None)
+
+    threading.Thread(target=pump, name="repoguide-watch", daemon=True).start()
+    ready.wait()
+    return _batches(events)
+
+def _batches(events: queue.Queue[set[str] | None]) -> Iterator[set[str]]:
+    """Queued changes; batches that arrived during a pass are merged into one."""
+    while (rels := events.get()) is not None:
+        while True:
+            try:
+                more = events.get_nowait()
+            except queue.Empty:
+                break
+            if more is None:
+                events.put(None)
+                break
+            rels |= more
+        yield rels
+
+def _snapshot(root: Path) -> dict[str, tuple[int, int]]:
+    # .gitignore files too: an edit to one has to trigger a full pass
+    return {
+        f.rel: (f.size, f.mtime_ns) for f in walk(root, exts=None)
+        if f.rel.rsplit("/", 1)[-1] == ".gitignore" or os.path.splitext(f.rel)[1].lower() in DEFAULT_EXTS
+    }
+
+def _poll(
+    root: Path, snap: dict[str, tuple[int, int]], quiet_ms: int, max_ms: int, interval_ms: int,
+    stop: threading.Event,
+) -> Iterator[set[str]]:
+    """Fallback: diff stat snapshots of the tree every ``interval_ms``."""
+    while not stop.wait(interval_ms / 1000):
+        cur = _snapshot(root)
+        changed = {r for r in snap.keys() | cur.keys() if snap.get(r) != cur.get(r)}
+        if not changed:
+            continue
+        # debounce: keep sampling until a quiet period or the cap
+        deadline = time.monotonic() + max_ms / 1000
+        while time.monotonic() < deadline and not stop.wait(quiet_ms / 1000):
+            nxt = _snapshot(root)
+            more = {r for r in cur.keys() | nxt.keys() if cur.get(r) != nxt.get(r)}
+            cur = nxt
+            if not more:
+                break
+            changed |= more
+        snap = cur
+        yield changed
+
+def watch_repo(
+    path: str,
+    *,
+    quiet_ms: int | None = None,
+    max_ms: int | None = None,
+    poll: bool = False,
+    stop: threading.Event | None = None,
+    on_pass: Callable[[WatchPass], None] | None = None,
+) -> None:
+    """Index ``path`` once, then re-index just the files that change until ``stop`` is set.
+
+    Bursts of edits (a checkout, a save-all) are coalesced: a pass starts
+    after ``quiet_ms`` without new changes (REPOGUIDE_WATCH_QUIET_MS, 200)
+    or ``max_ms`` into a continuous burst (REPOGUIDE_WATCH_MAX_MS, 2000).
+    Uses OS file notifications when watchfiles is installed, else (or with
+    ``poll``) stat polling every REPOGUIDE_WATCH_POLL_MS (1000). A pass that
+    fails, e.g. while the embedding API is down, is retried with the next
+    batch of changes.
+    """
+    root = Path(path).resolve()
+    stop = stop or threading.Event()
+    quiet_ms = quiet_ms or env_int("REPOGUIDE_WATCH_QUIET_MS", 200, lo=10)
+    max_ms = max_ms or env_int("REPOGUIDE_WATCH_MAX_MS", 2000, lo=10)
+    report = on_pass or (lambda p: None)
+    retry: set[str] | None = set()
+
+    def run(paths: set[str] | None) -> None:
+        nonlocal retry
+        progress = IndexProgress()
+        t0 = time.perf_counter()
+        # an edited .gitignore can change what any file's status is: full pass
+        full = paths is None or any(r.rsplit("/", 1)[-1] == ".gitignore" for r in paths)
+        only = None if full else sorted(paths)
+        try:
+            n, err = index_local_repo(str(root), paths=only, progress=progress), None
+        except Exception as e:  # keep watching; these paths go into the next pass
+            log.warning("re-index of %s failed: %s", root, e)
+            n, err = 0, f"{type(e).__name__}: {e}"
+            retry = None if only is None else set(only)
+        else:
+            retry = set()
+        report(WatchPass(only, n, round(time.perf_counter() - t0, 3), progress.snapshot(), err))
+
+    if poll or watchfiles is None:
+        snap = _snapshot(root)  # before the first pass, so edits made during it are seen
+        run(None)
+        changes = _poll(root, snap, quiet_ms, max_ms, env_int("REPOGUIDE_WATCH_POLL_MS", 1000, lo=10), stop)
+    else:
+        changes = _native(root, quiet_ms, max_ms, stop)  # recording before the first pass, like the snapshot
+        run(None)
+    for rels in changes:
+        run(None if retry is None else rels | retry)
+        if stop.is_set():
+            break
@@ -0,0 +1,172 @@
+# src/repoguide_metrics/timing.py
+from __future__ import annotations
+import math, threading, time
+from bisect import bisect_left
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Iterable, Iterator, TypeVar
+
+from repoguide_config.env import env_flag
+
+T = TypeVar("T")
+
+# REPOGUIDE_METRICS=0 turns every span into a shared no-op context manager
+ENABLED = env_flag("REPOGUIDE_METRICS", default=True)
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf)
+
+_HELP = {
+    "repoguide_stage_seconds": "Time spent in one pipeline stage.",
+    "repoguide_request_seconds": "HTTP request latency by endpoint.",
+    "repoguide_answer_cache_total": "Answer cache lookups by result (hit or miss).",
+}
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+_hists: dict[tuple[str, tuple[tuple[str, str], ...]], Histogram] = {}
+_counters: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+_lock = threading.Lock()
+# per-request list of (stage, seconds); set by TimingMiddleware, read into Server-Timing
+_request: ContextVar[list | None] = ContextVar("repoguide_request_timings", default=None)
+
+def observe(metric: str, seconds: float, **labels: str) -> None:
+    key = (metric, tuple(sorted(labels.items())))
+    i = bisect_left(BUCKETS, seconds)
+    with _lock:
+        h = _hists.get(key)
+        if h is None:
+            h = _hists[key] = Histogram()
+        h.counts[i] += 1
+        h.sum += seconds
+        h.count += 1
+
+def count(metric: str, n: float = 1, **labels: str) -> None:
+    """Bump a monotonically increasing counter."""
+    key = (metric, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + n
+
+def record(stage: str, seconds: float) -> None:
+    """Record a measured stage duration (histogram + current request, if any)."""
+    observe("repoguide_stage_seconds", seconds, stage=stage)
+    timings = _request.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+class _Span:
+    __slots__ = ("stage", "t0")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.stage, time.perf_counter() - self.t0)
+        return False
+
+_NOOP = nullcontext()
+
+def span(stage: str):
+    """``with span("explain.search"): ...`` times the block under ``stage``."""
+    return _Span(stage) if ENABLED else _NOOP
+
+def timed(stage: str, it: Iterable[T]) -> Iterator[T]:
+    """Wrap an iterator, recording the time spent waiting for each item."""
+    if not ENABLED:
+        return iter(it)
+    return _timed(stage, iter(it))
+
+def _timed(stage: str, it: Iterator[T]) -> Iterator[T]:
+    while True:
+        t0 = time.perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            return
+        record(stage, time.perf_counter() - t0)
+        yield item
+
+def server_timing(timings: list[tuple[str, float]]) -> str:
+    # repeated stages (e.g. several reads) are summed into one entry
+    total: dict[str, float] = {}
+    for stage, seconds in timings:
+        total[stage] = total.get(stage, 0.0) + seconds
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in total.items())
+
+def render() -> str:
+    """All counters and histograms in the Prometheus text exposition format."""
+    with _lock:
+        snap = sorted((k, list(h.counts), h.sum, h.count) for k, h in _hists.items())
+        counters = sorted(_counters.items())
+    lines, seen = [], set()
+    for (metric, labels), value in counters:
+        if metric not in seen:
+            seen.add(metric)
+            lines.append(f"# HELP {metric} {_HELP.get(metric, metric)}")
+            lines.append(f"# TYPE {metric} counter")
+        base = ",".join(f'{k}="{v}"' for k, v in labels)
+        lines.append(f"{metric}{{{base}}} {value}")
+    for (metric, labels), counts, total, count in snap:
+        if metric not in seen:
+            seen.add(metric)
+            lines.append(f"# HELP {metric} {_HELP.get(metric, metric)}")
+            lines.append(f"# TYPE {metric} histogram")
+        base = ",".join(f'{k}="{v}"' for k, v in labels)
+        sep = "," if base else ""
+        cumulative = 0
+        for le, n in zip(BUCKETS, counts):
+            cumulative += n
+            le_s = "+Inf" if le == math.inf else repr(le)
+            lines.append(f'{metric}_bucket{{{base}{sep}le="{le_s}"}} {cumulative}')
+        lines.append(f"{metric}_sum{{{base}}} {total}")
+        lines.append(f"{metric}_count{{{base}}} {count}")
+    return "\n".join(lines) + "\n"
+
+def reset() -> None:
+    with _lock:
+        _hists.clear()
+        _counters.clear()
+
+class TimingMiddleware:
+    """ASGI middleware: request histogram plus a Server-Timing header of the stages hit."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ENABLED:
+            await self.app(scope, receive, send)
+            return
+        timings: list = []
+        token = _request.set(timings)
+        t0 = time.perf_counter()
+        status = 500
+
+        async def send_timed(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timings.append(("total", time.perf_counter() - t0))
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(timings).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            _request.reset(token)
+            endpoint = scope.get("endpoint")  # set by the router once a route matched
+            observe(
+                "repoguide_request_seconds", time.perf_counter() - t0,
+                endpoint=getattr(endpoint, "__name__", "unmatched"), method=scope["method"], status=str(status),
+            )
@@ -0,0 +1,169 @@
+# src/repoguide_retriever/answer_cache.py
+from __future__ import annotations
+import hashlib, os, sqlite3, threading, time
+from collections import OrderedDict
+from pathlib import Path
+
+from repoguide_config.env import env_float, env_int, state_dir
+from repoguide_metrics import timing
+from repoguide_schemas.models import Answer
+from repoguide_store.base import Scope
+
+MISS = object()
+
+def normalize(question: str) -> str:
+    """Whitespace and trailing punctuation don't change what is being asked."""
+    return " ".join(question.split()).rstrip("?!. ")
+
+class AnswerCache:
+    """LRU of explain answers (including "no answer") with a TTL.
+
+    Keys carry the index generation of every collection searched, so an
+    indexer write makes older entries unreachable instead of stale. With
+    ``shared_path`` entries also go to a SQLite file that other API workers
+    on the host read on a local miss.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, shared_path: str | Path | None = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lru: OrderedDict[tuple, tuple[float, Answer | None]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._puts = 0
+        if shared_path is not None:
+            Path(shared_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(shared_path), check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS answers (key BLOB PRIMARY KEY, expires REAL NOT NULL, "
+                "answer TEXT) WITHOUT ROWID"
+            )
+
+    @classmethod
+    def from_env(cls) -> "AnswerCache | None":
+        """REPOGUIDE_ANSWER_CACHE=memory (default), shared (SQLite in the state dir)
+        or off; size and lifetime from REPOGUIDE_ANSWER_CACHE_SIZE / _TTL_S."""
+        mode = os.getenv("REPOGUIDE_ANSWER_CACHE", "memory").strip().lower()
+        if mode in ("0", "off", "false", "none"):
+            return None
+        shared = state_dir() / "answers.sqlite3" if mode == "shared" else None
+        return cls(
+            max_entries=env_int("REPOGUIDE_ANSWER_CACHE_SIZE", 1024),
+            ttl=env_float("REPOGUIDE_ANSWER_CACHE_TTL_S", 3600.0, lo=0.0),
+            shared_path=shared,
+        )
+
+    @staticmethod
+    def key(question: str, scope: Scope, generations: tuple[str, ...]) -> tuple:
+        return (normalize(question), scope, generations)
+
+    def get(self, key: tuple):
+        """The cached answer (possibly None), or MISS."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None and entry[0] > now:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                timing.count("repoguide_answer_cache_total", result="hit")
+                return entry[1]
+        if self._db is not None:
+            found = self._shared_get(key)
+            if found is not MISS:
+                with self._lock:
+                    self._remember(key, found, now)
+                    self.hits += 1
+                timing.count("repoguide_answer_cache_total", result="hit")
+                return found
+        with self._lock:
+            self.misses += 1
+        timing.count("repoguide_answer_cache_total", result="miss")
+        return MISS
+
+    def put(self, key: tuple, answer: Answer | None) -> None:
+        with self._lock:
+            self._remember(key, answer, time.monotonic())
+        if self._db is not None:
+            self._shared_put(key, answer)
+
+    def _remember(self, key: tuple, answer: Answer | None, now: float) -> None:
+        self._lru[key] = (now + self.ttl, answer)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    @staticmethod
+    def _digest(key: tuple) -> bytes:
+        return hashlib.sha256(repr(key).encode("utf-8")).digest()[:16]
+
+    def _shared_get(self, key: tuple):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT answer FROM answers WHERE key=? AND expires>?", (self._digest(key), time.time())
+            ).fetchone()
+        if row is None:
+            return MISS
+        return Answer.model_validate_json(row[0]) if row[0] is not None else None
+
+    def _shared_put(self, key: tuple, answer: Answer | None) -> None:
+        body = answer.model_dump_json() if answer is not None else None
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?)", (self._digest(key), now + self.ttl, body)
+            )
+            self._puts += 1
+            if self._puts % 128 == 0:
+                # expired rows first, then the soonest-expiring beyond the size limit
+                self._db.execute("DELETE FROM answers WHERE expires<=?", (now,))
+                self._db.execute(
+                    "DELETE FROM answers WHERE key IN (SELECT key FROM answers ORDER BY expires DESC "
+                    "LIMIT -1 OFFSET ?)", (self.max_entries,),
+                )
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "entries": len(self._lru),
+                "shared": self._db is not None,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM answers")
+
+    def close(self) -> None:
+        with self._lock:
+            self._lru.clear()
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+_cache: AnswerCache | None = None
+_configured = False
+_lock = threading.Lock()
+
+def get_answer_cache() -> AnswerCache | None:
+    """Process-wide answer cache, or None when REPOGUIDE_ANSWER_CACHE=off."""
+    global _cache, _configured
+    with _lock:
+        if not _configured:
+            _cache, _configured = AnswerCache.from_env(), True
+        return _cache
+
+def close_answer_cache() -> None:
+    global _cache, _configured
+    with _lock:
+        c, _cache, _configured = _cache, None, False
+    if c is not None:
+        c.close()
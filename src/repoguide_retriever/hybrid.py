@@ -1,48 +1,137 @@
 # src/repoguide_retriever/hybrid.py
-import os, httpx
-from qdrant_client import QdrantClient
+import heapq
+
+from repoguide_embeddings.client import embed
+from repoguide_indexer.chunking import language
+from repoguide_indexer.manifest import generation
+from repoguide_metrics.timing import span
+from repoguide_retriever import lexical
+from repoguide_retriever.answer_cache import MISS, get_answer_cache
 from repoguide_schemas.models import Answer, Citation
+from repoguide_store.backend import collections_for, get_store, get_text_store
+from repoguide_store.base import Scope, VectorStore
 
 COLLECTION = "repoguide_docs"
+TOP_K = 3
+CANDIDATES = 10  # per retriever, before fusion
+
+def explain_from_qdrant(
+    question: str, scope: str | None = None, store: VectorStore | None = None
+) -> Answer | None:
+    return explain_batch([question], scope, store)[0]
+
+def explain_batch(
+    questions: list[str], scope: str | None = None, store: VectorStore | None = None
+) -> list[Answer | None]:
+    """Answer many questions with one embedding request, one batched vector
+    search per collection and one payload fetch per collection; answers come
+    back in input order. ``scope`` is parsed by ``Scope.parse`` and applied as
+    a payload filter in both retrievers. Repeats are served from the answer
+    cache until the indexer next writes to one of the collections."""
+    sc = Scope.parse(scope)
+    cols = collections_for(COLLECTION, sc.repo)
+    cache = get_answer_cache()
+    if cache is None:
+        return _explain(questions, sc, cols, store or get_store())
+    # read generations before searching: a write that lands mid-search
+    # leaves this result under the old key
+    gens = tuple(generation(c) for c in cols)
+    keys = [cache.key(q, sc, gens) for q in questions]
+    out = [cache.get(k) for k in keys]
+    todo = [i for i, a in enumerate(out) if a is MISS]
+    if todo:
+        fresh = _explain([questions[i] for i in todo], sc, cols, store or get_store())
+        for i, ans in zip(todo, fresh):
+            out[i] = ans
+            cache.put(keys[i], ans)
+    return out
+
+def _explain(questions: list[str], sc: Scope, cols: list[str], store: VectorStore) -> list[Answer | None]:
+    if len(cols) > 1:
+        cols = [c for c in cols if store.collection_exists(c)]
+    ranked: list[list[str]] = [[] for _ in questions]
+    payloads: dict[str, dict] = {}
+    home: dict[str, str] = {}  # point id -> collection it came from
+    prose: list[tuple[int, list]] = []  # (question index, lexical hits)
+
+    def lexical_search(query, limit):
+        hits = []
+        for c in cols:
+            for h in lexical.search(c, query, limit=limit, scope=sc):
+                home[h.pid] = c
+                hits.append(h)
+        return hits if len(cols) == 1 else heapq.nlargest(limit, hits, key=lambda h: h.score)
+
+    # Identifier questions ("where is check_auth defined") are answered by
+    # the BM25 index alone: no embedding round trip.
+    with span("explain.lexical"):
+        for i, q in enumerate(questions):
+            idents = lexical.identifiers(q)
+            lex = lexical_search(idents, TOP_K) if idents else []
+            if lex:
+                ranked[i] = [h.pid for h in lex]
+            else:
+                prose.append((i, lexical_search(q, CANDIDATES)))
+
+    if prose and cols:
+        # Embed the questions and search the vector store
+        texts = list(dict.fromkeys(questions[i] for i, _ in prose))  # repeats are common in bursts
+        with span("explain.embed"):
+            qvecs = embed(texts)
+        with span("explain.search"):
+            per_col = []
+            for c in cols:
+                found = store.search_batch(c, qvecs, limit=CANDIDATES, scope=sc or None)
+                for hits in found:
+                    home.update((h.id, c) for h in hits)
+                per_col.append(found)
+            merged = [heapq.nlargest(CANDIDATES, (h for found in per_col for h in found[t]), key=lambda h: h.score)
+                      for t in range(len(texts))] if len(cols) > 1 else per_col[0]
+            results = dict(zip(texts, merged))
+        for i, lex in prose:
+            hits = results[questions[i]]
+            if not lex:
+                hits = hits[:TOP_K]
+            payloads.update((h.id, h.payload) for h in hits)
+            ranked[i] = lexical.rrf([h.id for h in hits], [h.pid for h in lex])[:TOP_K]
+
+    # Payloads hold only metadata and a chunk hash; text is read for the
+    # final hits alone.
+    missing = list(dict.fromkeys(pid for ids in ranked for pid in ids if pid not in payloads))
+    final = {pid for ids in ranked for pid in ids}
+    texts: dict[str, str] = {}
+    if final:
+        with span("explain.hydrate"):
+            if missing:
+                for c in cols:
+                    payloads.update(store.retrieve(c, [pid for pid in missing if home.get(pid) == c]))
+            hashes = [payloads[pid]["chunk"] for pid in final if "chunk" in payloads.get(pid, {})]
+            if hashes:
+                texts = get_text_store().get_many(hashes)
+    return [_answer([pid for pid in ids if pid in payloads], payloads, texts, sc) for ids in ranked]
+
+def _cite(payload: dict, sc: Scope) -> tuple[str, int, int]:
+    """The first copy of a (possibly deduplicated) chunk that lies inside ``sc``."""
+    if sc.path or sc.lang:
+        for loc in payload.get("locations", ()):
+            rel, _, span = loc.rpartition(":")
+            if sc.match_path(rel) and (not sc.lang or language(rel) == sc.lang):
+                start, _, end = span.partition("-")
+                return rel, int(start), int(end)
+    return payload.get("path", "unknown"), payload.get("start_line", 1), payload.get("end_line", 1)
 
-def _embed(texts: list[str]) -> list[list[float]]:
-    endpoint = os.environ["AZURE_OPENAI_ENDPOINT"].rstrip("/")
-    dep = os.environ["AZURE_OPENAI_EMBED_DEPLOYMENT"]
-    ver = os.environ["AZURE_OPENAI_API_VERSION"]
-    key = os.environ["AZURE_OPENAI_API_KEY"]
-    url = f"{endpoint}/openai/deployments/{dep}/embeddings?api-version={ver}"
-    r = httpx.post(
-        url,
-        headers={"api-key": key, "Content-Type": "application/json"},
-        json={"input": texts},
-        timeout=60.0,
-    )
-    r.raise_for_status()
-    return [d["embedding"] for d in r.json()["data"]]
-
-def explain_from_qdrant(question: str, scope: str | None = None) -> Answer | None:
-    # Embed the question
-    qvec = _embed([question])[0]
-
-    # Search Qdrant
-    client = QdrantClient(url=os.getenv("QDRANT_URL", "http://qdrant:6333"))
-    hits = client.search(
-        collection_name=COLLECTION,
-        query_vector=qvec,
-        limit=3,
-    )
-    if not hits:
+def _answer(ids: list[str], payloads: dict, texts: dict[str, str], sc: Scope) -> Answer | None:
+    if not ids:
         return None
 
     # Build a grounded answer with simple bullets + citations
     bullets, citations = [], []
-    for h in hits:
-        text = h.payload.get("text", "")
-        source = h.payload.get("source", "unknown")
+    for pid in ids:
+        payload = payloads[pid] or {}
+        text = texts.get(payload.get("chunk", ""), "")
+        file, start, end = _cite(payload, sc)
         bullets.append(text)
-        citations.append(
-            Citation(source="qdrant", file=source, start_line=1, end_line=1, url="")
-        )
+        citations.append(Citation(source="qdrant", file=file, url="", start_line=start, end_line=end))
 
-    summary = f"Grounded explanation based on {len(hits)} snippet(s)."
+    summary = f"Grounded explanation based on {len(ids)} snippet(s)."
     return Answer(summary=summary, bullets=bullets, citations=citations)
@@ -0,0 +1,453 @@
+# src/repoguide_retriever/lexical.py
+from __future__ import annotations
+import heapq, json, math, mmap, os, re, sqlite3, threading
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Sequence
+
+from repoguide_config.env import state_dir
+from repoguide_indexer.chunking import language
+from repoguide_store.base import Scope
+
+# BM25 (Okapi) parameters
+K1, B = 1.2, 0.75
+
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_CAMEL = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+_IDENT = re.compile(r"\b(?:[A-Za-z]+_\w+|[a-z]+[A-Z]\w*|[A-Z][a-z]+[A-Z]\w*)\b|\b\w+(?=\(\))|\b\w+\.\w+(?:\.\w+)*\b")
+_STOP = frozenset(
+    "a an and are as at be by do does for from how i if in into is it of on or the "
+    "to what when where which who why with this that there can we you".split()
+)
+
+def tokenize(text: str) -> list[str]:
+    """Code-aware tokens: whole identifiers plus their snake/camel parts.
+
+    ``check_auth`` -> check_auth, check, auth; ``HTTPServerError`` ->
+    httpservererror, http, server, error.
+    """
+    out: list[str] = []
+    for w in _WORD.findall(text):
+        lw = w.lower()
+        if len(lw) < 2 or lw in _STOP:
+            continue
+        out.append(lw)
+        parts = [p.lower() for seg in w.split("_") for p in _CAMEL.findall(seg)]
+        if len(parts) > 1:
+            out.extend(p for p in parts if len(p) > 1 and p not in _STOP)
+    return out
+
+def identifiers(text: str) -> list[str]:
+    """Identifier-looking words in a question (snake_case, camelCase, foo(), a.b)."""
+    out = []
+    for m in _IDENT.findall(text):
+        out.extend(w.lower() for w in m.split(".") if len(w) > 1)
+    return out
+
+def _dir(collection: str, repo: str = "") -> Path:
+    d = state_dir() / "lexical" / collection
+    return d / repo if repo else d
+
+def partitions(collection: str) -> list[str]:
+    """Repos with a published index in ``collection``."""
+    try:
+        return sorted(e.name for e in os.scandir(_dir(collection)) if (Path(e.path) / "segments.json").exists())
+    except OSError:
+        return []
+
+def _read_meta(d: Path) -> dict | None:
+    try:
+        return json.loads((d / "segments.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+# --- segment files ---
+#
+# A segment is one immutable, memory-mapped file of native uint32s:
+#   header   magic, n_docs, n_terms, n_postings, doc blob bytes, term blob bytes
+#   lengths  [n_docs]         token count per doc
+#   doc_off  [n_docs + 1]     offsets of "pid\0path\0path..." in the doc blob
+#   term_off [n_terms + 1]    offsets of the (byte-sorted) terms in the term blob
+#   term_pos [2 * n_terms]    (first posting, df) per term
+#   postings [2 * n_postings] (doc, tf) runs, one per term
+# followed by the two UTF-8 blobs, padded to a multiple of 4 bytes.
+
+_MAGIC = 0x314C4752  # "RGL1"
+_HEADER = 6
+
+def _write_segment(path: Path, docs: list[tuple[str, str, int, str]]) -> int:
+    """Write docs ((pid, paths, length, terms json)) to ``path``; returns their total length."""
+    lengths, doc_off, blob = array("I"), array("I", [0]), bytearray()
+    postings: dict[str, list[int]] = {}
+    for i, (pid, paths, length, terms) in enumerate(docs):
+        lengths.append(length)
+        blob += f"{pid}\0{paths}".encode("utf-8")
+        doc_off.append(len(blob))
+        for t, tf in json.loads(terms).items():
+            postings.setdefault(t, []).extend((i, tf))
+    term_off, term_blob, term_pos, post = array("I", [0]), bytearray(), array("I"), array("I")
+    for word, t in sorted((t.encode("utf-8"), t) for t in postings):
+        term_blob += word
+        term_off.append(len(term_blob))
+        run = postings[t]
+        term_pos.extend((len(post) // 2, len(run) // 2))
+        post.extend(run)
+    header = array("I", [_MAGIC, len(docs), len(term_pos) // 2, len(post) // 2, len(blob), len(term_blob)])
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as fh:
+        for part in (header, lengths, doc_off, term_off, term_pos, post):
+            fh.write(part.tobytes())
+        fh.write(blob)
+        fh.write(term_blob)
+        fh.write(b"\0" * (-(len(blob) + len(term_blob)) % 4))
+    os.replace(tmp, path)
+    return sum(lengths)
+
+class _Segment:
+    def __init__(self, path: Path):
+        with open(path, "rb") as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        u = memoryview(self._mm).cast("I")
+        magic, n, t, p, doc_bytes, _ = u[:_HEADER]
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a lexical segment")
+        i = _HEADER
+        self.lengths = u[i : i + n]
+        i += n
+        self._doc_off = u[i : i + n + 1]
+        i += n + 1
+        self._term_off = u[i : i + t + 1]
+        i += t + 1
+        self._term_pos = u[i : i + 2 * t]
+        i += 2 * t
+        self.postings = u[i : i + 2 * p]
+        i += 2 * p
+        self._docs_at = 4 * i
+        self._terms_at = self._docs_at + doc_bytes
+        self.n_terms = t
+
+    def term(self, word: bytes) -> tuple[int, int] | None:
+        """(first posting, df) of ``word``, by binary search over the sorted terms."""
+        lo, hi = 0, self.n_terms
+        mm, off, base = self._mm, self._term_off, self._terms_at
+        while lo < hi:
+            mid = (lo + hi) // 2
+            w = mm[base + off[mid] : base + off[mid + 1]]
+            if w < word:
+                lo = mid + 1
+            elif w > word:
+                hi = mid
+            else:
+                return self._term_pos[2 * mid], self._term_pos[2 * mid + 1]
+        return None
+
+    def doc(self, i: int) -> tuple[str, tuple[str, ...]]:
+        """(pid, paths) of doc ``i``."""
+        a, b = self._docs_at + self._doc_off[i], self._docs_at + self._doc_off[i + 1]
+        pid, *paths = self._mm[a:b].decode("utf-8").split("\0")
+        return pid, tuple(paths)
+
+# --- index-time side ---
+
+MERGE_FACTOR = 4  # merge the two newest segments while the older is at most this much larger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (pid TEXT PRIMARY KEY, paths TEXT NOT NULL, length INTEGER NOT NULL, terms TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS placed (pid TEXT PRIMARY KEY, seg INTEGER NOT NULL, ord INTEGER NOT NULL) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS placed_seg ON placed(seg);
+CREATE TABLE IF NOT EXISTS dead (seg INTEGER NOT NULL, ord INTEGER NOT NULL, PRIMARY KEY (seg, ord)) WITHOUT ROWID;
+"""
+
+class LexicalWriter:
+    """Per-(collection, repo) document table that the indexer keeps in sync.
+
+    Term frequencies live in SQLite so incremental runs only touch changed
+    chunks. ``commit()`` writes just those chunks into a new immutable
+    segment and tombstones their older copies, then merges the newest
+    segments while they are of similar size, so each commit costs about the
+    size of the change and the segment count stays logarithmic. Each repo is
+    its own partition, so a scoped search reads only its index.
+    """
+
+    def __init__(self, collection: str, repo: str = ""):
+        self.collection = collection
+        self.repo = repo
+        self._d = _dir(collection, repo)
+        self._d.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self._d / "docs.sqlite3"), check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        meta = _read_meta(self._d)
+        placed = {s for (s,) in self._db.execute("SELECT DISTINCT seg FROM placed")}
+        if meta is None or placed != {s["id"] for s in meta["segments"]}:
+            # nothing published (or the pre-segment format), or a commit died
+            # between its files and the database: start over from the documents
+            used = [int(f.name.split("-")[1].split(".")[0]) for f in self._d.glob("seg-*.bin")]
+            meta = {"segments": [], "next_id": max(used, default=0) + 1}
+            self._db.execute("DELETE FROM placed")
+            self._db.execute("DELETE FROM dead")
+            self._drop = True
+        else:
+            self._drop = False
+        self._meta = meta
+        self.dirty = self._drop
+
+    def _tombstone(self, rows: list[tuple[str]]) -> None:
+        self._db.executemany("INSERT OR IGNORE INTO dead SELECT seg, ord FROM placed WHERE pid=?", rows)
+        self._db.executemany("DELETE FROM placed WHERE pid=?", rows)
+
+    def add(self, docs: Iterable[tuple[str, Sequence[str], str]]) -> None:
+        """docs: (point id, path of every copy, text)."""
+        rows = []
+        for pid, paths, text in docs:
+            toks = tokenize(text)
+            rows.append((pid, "\0".join(paths), len(toks), json.dumps(Counter(toks), separators=(",", ":"))))
+        if rows:
+            with self._lock:
+                self._tombstone([(r[0],) for r in rows])
+                self._db.executemany("INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?)", rows)
+                self.dirty = True
+
+    def set_paths(self, moved: Iterable[tuple[str, Sequence[str]]]) -> None:
+        rows = [("\0".join(paths), pid) for pid, paths in moved]
+        if rows:
+            with self._lock:
+                # the paths are stored in the segment: re-add the doc with them
+                self._tombstone([(pid,) for _, pid in rows])
+                self._db.executemany("UPDATE docs SET paths=? WHERE pid=?", rows)
+                self.dirty = True
+
+    def delete(self, pids: Iterable[str]) -> None:
+        rows = [(p,) for p in pids]
+        if rows:
+            with self._lock:
+                self._tombstone(rows)
+                self._db.executemany("DELETE FROM docs WHERE pid=?", rows)
+                self.dirty = True
+
+    def clear(self) -> None:
+        with self._lock:
+            for table in ("docs", "placed", "dead"):
+                self._db.execute(f"DELETE FROM {table}")
+            self._drop = self.dirty = True
+
+    def commit(self, force: bool = False) -> None:
+        """Publish pending changes; ``force`` also merges everything into one segment."""
+        with self._lock:
+            if self.dirty or force:
+                self._publish(force)
+                self.dirty = self._drop = False
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+    def _build(self, docs: list[tuple[str, str, int, str]]) -> dict:
+        seg = self._meta["next_id"]
+        self._meta["next_id"] = seg + 1
+        name = f"seg-{seg}.bin"
+        length = _write_segment(self._d / name, docs)
+        self._db.executemany(
+            "INSERT OR REPLACE INTO placed VALUES (?, ?, ?)", [(pid, seg, i) for i, (pid, *_) in enumerate(docs)]
+        )
+        return {"id": seg, "file": name, "docs": len(docs), "length": length, "dead": 0, "del": None}
+
+    def _merge(self, group: list[dict]) -> dict | None:
+        ids = [s["id"] for s in group]
+        marks = ",".join("?" * len(ids))
+        docs = self._db.execute(
+            "SELECT d.pid, d.paths, d.length, d.terms FROM docs d JOIN placed p ON p.pid = d.pid "
+            f"WHERE p.seg IN ({marks}) ORDER BY p.seg, p.ord", ids,
+        ).fetchall()
+        self._db.execute(f"DELETE FROM dead WHERE seg IN ({marks})", ids)
+        return self._build(docs) if docs else None
+
+    def _publish(self, force: bool) -> None:
+        segs: list[dict] = [] if self._drop else [dict(s) for s in self._meta["segments"]]
+        fresh = self._db.execute(
+            "SELECT d.pid, d.paths, d.length, d.terms FROM docs d LEFT JOIN placed p ON p.pid = d.pid "
+            "WHERE p.pid IS NULL"
+        ).fetchall()
+        dead = dict(self._db.execute("SELECT seg, COUNT(*) FROM dead GROUP BY seg").fetchall())
+        for s in segs:
+            s["live"] = s["docs"] - dead.get(s["id"], 0)
+        for s in [s for s in segs if s["live"] == 0]:  # fully deleted: drop it
+            self._merge([s])
+            segs.remove(s)
+        if fresh:
+            s = self._build(fresh)
+            s["live"] = s["docs"]
+            segs.append(s)
+
+        def replace(lo: int, hi: int) -> None:
+            merged = self._merge(segs[lo:hi])
+            if merged is not None:
+                merged["live"] = merged["docs"]
+            segs[lo:hi] = [merged] if merged is not None else []
+
+        if force and segs:
+            replace(0, len(segs))
+        while len(segs) >= 2 and segs[-2]["live"] <= MERGE_FACTOR * segs[-1]["live"]:
+            replace(len(segs) - 2, len(segs))
+        for i in reversed(range(len(segs))):
+            if segs[i]["live"] * 2 < segs[i]["docs"]:  # mostly tombstones: rewrite it
+                replace(i, i + 1)
+
+        # tombstone lists of segments that gained deletions
+        for s in segs:
+            n = self._db.execute("SELECT COUNT(*) FROM dead WHERE seg=?", (s["id"],)).fetchone()[0]
+            if n != s["dead"]:
+                ords = array("I", (o for (o,) in self._db.execute("SELECT ord FROM dead WHERE seg=? ORDER BY ord", (s["id"],))))
+                s["dead"], s["del"] = n, f"seg-{s['id']}-{n}.del"
+                tmp = self._d / f"{s['del']}.tmp"
+                tmp.write_bytes(ords.tobytes())
+                os.replace(tmp, self._d / s["del"])
+            s.pop("live", None)
+
+        total = sum(s["docs"] for s in segs)
+        self._meta = {
+            "segments": segs,
+            "next_id": self._meta["next_id"],
+            # BM25 statistics count tombstoned docs until their segment is rewritten
+            "n_docs": total,
+            "avgdl": sum(s["length"] for s in segs) / total if total else 0.0,
+        }
+        tmp = self._d / "segments.json.tmp"
+        tmp.write_text(json.dumps(self._meta, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self._d / "segments.json")
+        # readers that still hold an older mmap keep working after the unlink
+        keep = {"docs.sqlite3", "segments.json"} | {s["file"] for s in segs} | {s["del"] for s in segs if s["del"]}
+        for f in self._d.iterdir():
+            if f.name not in keep and not f.name.startswith("docs.sqlite3"):
+                try:
+                    f.unlink()
+                except OSError:
+                    pass
+
+# --- query-time side ---
+
+@dataclass
+class LexicalHit:
+    pid: str
+    paths: tuple[str, ...]  # every copy of the chunk
+    score: float
+
+class LexicalIndex:
+    """BM25 over one partition's segments, each with its deleted docs."""
+
+    def __init__(self, meta: dict, segments: list[tuple[_Segment, frozenset[int]]]):
+        self.n_docs: int = meta.get("n_docs", 0)
+        self.avgdl: float = meta.get("avgdl") or 1.0
+        self.segments = segments
+
+    def search(
+        self, query: str | list[str], limit: int = 10, keep: Callable[[tuple[str, ...]], bool] | None = None
+    ) -> list[LexicalHit]:
+        """Top BM25 hits; ``keep(paths)`` drops documents before ranking."""
+        terms = tokenize(query) if isinstance(query, str) else query
+        if not terms or not self.segments:
+            return []
+        scores: dict[tuple[int, int], float] = {}
+        N, avgdl = self.n_docs, self.avgdl
+        for t in set(terms):
+            word = t.encode("utf-8")
+            found = [(s, e) for s, (seg, _) in enumerate(self.segments) if (e := seg.term(word))]
+            if not found:
+                continue
+            df = sum(n for _, (_, n) in found)
+            idf = math.log(1.0 + (N - df + 0.5) / (df + 0.5))
+            for s, (off, n) in found:
+                seg, dead = self.segments[s]
+                post, lengths = seg.postings, seg.lengths
+                for j in range(2 * off, 2 * (off + n), 2):
+                    i, tf = post[j], post[j + 1]
+                    if i in dead:
+                        continue
+                    norm = K1 * (1.0 - B + B * lengths[i] / avgdl)
+                    scores[s, i] = scores.get((s, i), 0.0) + idf * tf * (K1 + 1.0) / (tf + norm)
+        docs: dict[tuple[int, int], tuple[str, tuple[str, ...]]] = {}
+        items = scores.items()
+        if keep is not None:
+            docs = {k: self.segments[k[0]][0].doc(k[1]) for k in scores}
+            items = [(k, v) for k, v in items if keep(docs[k][1])]
+        best = heapq.nlargest(limit, items, key=lambda kv: kv[1])
+        out = []
+        for k, score in best:
+            pid, paths = docs.get(k) or self.segments[k[0]][0].doc(k[1])
+            out.append(LexicalHit(pid=pid, paths=paths, score=score))
+        return out
+
+_loaded: dict[str, tuple[int, LexicalIndex]] = {}
+_segments: dict[str, _Segment] = {}  # path -> mapped segment, shared across reloads
+_load_lock = threading.Lock()
+
+def _open(d: Path, meta: dict) -> LexicalIndex:
+    segs = []
+    for s in meta["segments"]:
+        path = str(d / s["file"])
+        seg = _segments.get(path) or _Segment(d / s["file"])
+        _segments[path] = seg
+        dead = frozenset(array("I", (d / s["del"]).read_bytes())) if s["del"] else frozenset()
+        segs.append((seg, dead))
+    live = {str(d / s["file"]) for s in meta["segments"]}
+    for path in [p for p in _segments if Path(p).parent == d and p not in live]:
+        del _segments[path]
+    return LexicalIndex(meta, segs)
+
+def load(collection: str, repo: str = "") -> LexicalIndex | None:
+    """Map the published segments; reloads only when segments.json changes."""
+    d = _dir(collection, repo)
+    for _ in range(2):  # a commit may unlink a file between reading the list and opening it
+        try:
+            mtime = (d / "segments.json").stat().st_mtime_ns
+        except OSError:
+            return None
+        with _load_lock:
+            cached = _loaded.get(str(d))
+            if cached and cached[0] == mtime:
+                return cached[1]
+            meta = _read_meta(d)
+            if meta is None:
+                return None
+            try:
+                idx = _open(d, meta)
+            except (OSError, ValueError, KeyError):
+                continue
+            _loaded[str(d)] = (mtime, idx)
+            return idx
+    return None
+
+def _keep(scope: Scope | None) -> Callable[[tuple[str, ...]], bool] | None:
+    if not scope or not (scope.path or scope.lang):
+        return None
+    def keep(paths: tuple[str, ...]) -> bool:
+        # a deduplicated chunk is in scope when any of its copies is
+        return any(scope.match_path(p) and (not scope.lang or language(p) == scope.lang) for p in paths)
+    return keep
+
+def search(
+    collection: str, query: str | list[str], limit: int = 10, scope: Scope | None = None
+) -> list[LexicalHit]:
+    """BM25 over the scoped repo's partition, or every partition in ``collection``."""
+    repos = [scope.repo] if scope and scope.repo else partitions(collection) or [""]
+    keep = _keep(scope)
+    hits: list[LexicalHit] = []
+    for repo in repos:
+        idx = load(collection, repo)
+        if idx:
+            hits.extend(idx.search(query, limit, keep))
+    if len(repos) > 1:
+        hits = heapq.nlargest(limit, hits, key=lambda h: h.score)
+    return hits
+
+def rrf(*rankings: list[str], k: int = 60) -> list[str]:
+    """Reciprocal rank fusion over ranked id lists."""
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, pid in enumerate(ranking):
+            scores[pid] = scores.get(pid, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda pid: -scores[pid])
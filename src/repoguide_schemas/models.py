@@ -13,6 +13,10 @@ class PreflightReport(BaseModel):
     checks: List[PreflightCheck]
     summary: str
 
+class BulkPreflightReport(BaseModel):
+    reports: List[PreflightReport]
+    summary: str
+
 
 class Citation(BaseModel):
     source: str
@@ -26,6 +30,9 @@ class Answer(BaseModel):
     bullets: List[str]
     citations: List[Citation]
 
+class BatchAnswer(BaseModel):
+    answers: List[Optional[Answer]]   # input order; null = NEEDS_MORE_CONTEXT
+
 class APIInfo(BaseModel):
     route: str
     method: str
@@ -62,4 +69,24 @@ class OnboardReport(BaseModel):
     chunks_indexed: int
     preflight: PreflightReport
     links: dict
-    next_steps: list[OnboardAction]
\ No newline at end of file
+    next_steps: list[OnboardAction]
+    index_job: Optional[str] = None     # background indexing job, poll /jobs/{id}
+
+class JobProgress(BaseModel):
+    files_walked: int = 0
+    files_changed: int = 0
+    chunks_embedded: int = 0
+    embeddings_saved: int = 0   # chunks that joined an existing identical / near-identical cluster
+    near_duplicates: int = 0
+    points_upserted: int = 0
+    elapsed_s: float = 0.0
+    chunks_per_s: float = 0.0
+
+class JobStatus(BaseModel):
+    id: str
+    kind: str
+    path: str
+    state: Literal["queued", "running", "done", "failed"]
+    progress: JobProgress
+    result: Optional[dict] = None
+    error: Optional[str] = None
\ No newline at end of file
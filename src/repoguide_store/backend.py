@@ -0,0 +1,62 @@
+# src/repoguide_store/backend.py
+from __future__ import annotations
+import os, threading
+
+from repoguide_store.base import VectorStore
+from repoguide_store.text import TextStore, default_text_path
+
+def make_store() -> VectorStore:
+    """REPOGUIDE_VECTOR_STORE=qdrant (default) or local (mmap files under
+    REPOGUIDE_VECTOR_DIR, no server needed)."""
+    kind = os.getenv("REPOGUIDE_VECTOR_STORE", "qdrant").strip().lower()
+    if kind == "local":
+        from repoguide_store.local import LocalStore
+        return LocalStore()
+    if kind == "qdrant":
+        from repoguide_store.qdrant import QdrantStore
+        return QdrantStore()
+    raise ValueError(f"unknown REPOGUIDE_VECTOR_STORE {kind!r} (expected 'qdrant' or 'local')")
+
+def dedicated_repos() -> list[str]:
+    """REPOGUIDE_DEDICATED_REPOS: comma-separated repo names that get their own collection."""
+    return [r.strip() for r in os.getenv("REPOGUIDE_DEDICATED_REPOS", "").split(",") if r.strip()]
+
+def collection_for(base: str, repo: str) -> str:
+    """Large tenants live in ``<base>__<repo>``; everyone else shares ``base``."""
+    return f"{base}__{repo}" if repo in dedicated_repos() else base
+
+def collections_for(base: str, repo: str | None) -> list[str]:
+    """Collections a search has to visit: one for a scoped repo, else all of them."""
+    if repo:
+        return [collection_for(base, repo)]
+    return [base, *(f"{base}__{r}" for r in dedicated_repos())]
+
+_store: VectorStore | None = None
+_texts: TextStore | None = None
+_lock = threading.Lock()
+
+def get_store() -> VectorStore:
+    """Process-wide vector store shared by the indexer, retriever and API."""
+    global _store
+    with _lock:
+        if _store is None:
+            _store = make_store()
+        return _store
+
+def get_text_store() -> TextStore:
+    """Process-wide chunk text store; lives and dies with the vector store."""
+    global _texts
+    with _lock:
+        if _texts is None:
+            _texts = TextStore(default_text_path())
+        return _texts
+
+def close_store() -> None:
+    global _store, _texts
+    with _lock:
+        s, _store = _store, None
+        t, _texts = _texts, None
+    if s is not None:
+        s.close()
+    if t is not None:
+        t.close()
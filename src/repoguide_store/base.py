@@ -0,0 +1,69 @@
+# src/repoguide_store/base.py
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, NamedTuple, Protocol, Sequence
+
+if TYPE_CHECKING:  # annotations only; keeps numpy out of API startup
+    import numpy as np
+
+class Hit(NamedTuple):
+    id: str
+    score: float
+    payload: dict
+
+@dataclass(frozen=True)
+class Scope:
+    """Which chunks a search may return; unset fields match everything."""
+    repo: str | None = None
+    path: str | None = None   # a file, or a directory and everything below it
+    lang: str | None = None
+
+    @classmethod
+    def parse(cls, text: str | None) -> "Scope":
+        """``"myrepo"`` or ``"repo:myrepo path:src/api lang:python"`` (space or comma separated)."""
+        fields: dict[str, str] = {}
+        for term in (text or "").replace(",", " ").split():
+            key, sep, value = term.partition(":")
+            if not sep:
+                key, value = "repo", term
+            if key in ("repo", "path", "lang") and value:
+                fields[key] = value.strip("/") if key == "path" else value
+        return cls(**fields)
+
+    def __bool__(self) -> bool:
+        return bool(self.repo or self.path or self.lang)
+
+    def match_path(self, path: str) -> bool:
+        p = self.path
+        return not p or path == p or path.startswith(p + "/")
+
+class VectorStore(Protocol):
+    """What the indexer and retriever need from a vector database.
+
+    Point ids are strings (uuid5, see repoguide_indexer.manifest.cluster_id);
+    vectors are float32 arrays; similarity is cosine. A ``scope`` filters on
+    the ``repo``, ``langs``, ``paths`` and ``dirs`` payload fields; the list
+    fields cover every copy of a deduplicated chunk.
+    """
+
+    def collection_exists(self, name: str) -> bool: ...
+
+    def ensure_collection(self, name: str, dim: int) -> None: ...
+
+    def count(self, name: str) -> int: ...
+
+    def upsert(self, name: str, ids: Sequence[str], vectors: np.ndarray, payloads: Sequence[dict]) -> None: ...
+
+    def set_payloads(self, name: str, items: Sequence[tuple[str, dict]]) -> None: ...
+
+    def delete(self, name: str, ids: Sequence[str]) -> None: ...
+
+    def search(self, name: str, vector: np.ndarray, limit: int, scope: Scope | None = None) -> list[Hit]: ...
+
+    def search_batch(
+        self, name: str, vectors: np.ndarray, limit: int, scope: Scope | None = None
+    ) -> list[list[Hit]]: ...
+
+    def retrieve(self, name: str, ids: Sequence[str]) -> dict[str, dict]: ...
+
+    def close(self) -> None: ...
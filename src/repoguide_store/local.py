@@ -0,0 +1,341 @@
+# src/repoguide_store/local.py
+from __future__ import annotations
+import json, os, sqlite3, threading, uuid
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+from repoguide_config.env import state_dir
+from repoguide_store.base import Hit, Scope
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS points (
+    row     INTEGER PRIMARY KEY,      -- row in the vectors file
+    pid     TEXT NOT NULL,
+    payload TEXT,
+    alive   INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS points_pid ON points(pid);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+# rewrite the vectors file once this many rows (and a quarter of all rows) are dead
+COMPACT_MIN_DEAD = 1024
+
+def default_dir() -> Path:
+    d = os.getenv("REPOGUIDE_VECTOR_DIR")
+    return Path(d) if d else state_dir() / "vectors"
+
+def _normalize(m: np.ndarray) -> np.ndarray:
+    m = np.array(m, dtype=np.float32, ndmin=2)  # copy: callers keep their arrays
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    np.divide(m, norms, out=m, where=norms > 0)
+    return m
+
+class _Collection:
+    """One collection: a raw row-major float32 matrix plus a SQLite sidecar.
+
+    Rows are L2-normalized on insert, so cosine search is one mat-vec
+    product over the memory-mapped file. Deletes only mark rows dead;
+    the file is rewritten once enough of it is dead. Every committed write
+    bumps ``generation`` so readers in other processes remap.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        root.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(root / "points.sqlite3"), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._gen = None
+        self.dim: int | None = None
+        self._file = ""
+        self._pids: list[str] = []
+        self._alive = np.zeros(0, dtype=bool)
+        self._rows: dict[str, int] = {}       # live pid -> row
+        self._mat: np.ndarray | None = None
+        self._masks: dict[tuple, np.ndarray] = {}   # (generation, scope) -> row mask
+
+    def _meta(self, key: str) -> str | None:
+        row = self._db.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value) -> None:
+        self._db.execute("INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _refresh(self) -> None:
+        gen = self._meta("generation")
+        if gen == self._gen:
+            return
+        dim = self._meta("dim")
+        self.dim = int(dim) if dim else None
+        self._file = self._meta("file") or ""
+        rows = self._db.execute("SELECT pid, alive FROM points ORDER BY row").fetchall()
+        self._pids = [pid for pid, _ in rows]
+        self._alive = np.fromiter((a for _, a in rows), dtype=bool, count=len(rows))
+        self._rows = {pid: i for i, (pid, a) in enumerate(rows) if a}
+        self._gen = gen
+        self._remap()
+
+    def _scope_mask(self, scope: Scope) -> np.ndarray:
+        """Rows matching ``scope``; callers hold the lock and have refreshed."""
+        key = (self._gen, scope)
+        mask = self._masks.get(key)
+        if mask is not None:
+            return mask
+        where, args = ["alive=1"], []
+        if scope.repo:
+            where.append("json_extract(payload, '$.repo')=?")
+            args.append(scope.repo)
+        if scope.lang:
+            where.append("EXISTS (SELECT 1 FROM json_each(payload, '$.langs') WHERE value=?)")
+            args.append(scope.lang)
+        if scope.path:
+            where.append(
+                "(EXISTS (SELECT 1 FROM json_each(payload, '$.paths') WHERE value=?) OR EXISTS "
+                "(SELECT 1 FROM json_each(payload, '$.dirs') WHERE value=?))"
+            )
+            args += [scope.path, scope.path]
+        rows = [r for (r,) in self._db.execute(f"SELECT row FROM points WHERE {' AND '.join(where)}", args)]
+        mask = np.zeros(len(self._pids), dtype=bool)
+        mask[rows] = True
+        if len(self._masks) >= 64:
+            self._masks.clear()
+        self._masks[key] = mask
+        return mask
+
+    def _remap(self) -> None:
+        n = len(self._pids)
+        if n and self.dim:
+            self._mat = np.memmap(self.root / self._file, dtype=np.float32, mode="r", shape=(n, self.dim))
+        else:
+            self._mat = None
+
+    def _bump(self) -> None:
+        # inside the write transaction, so this reads the committed value
+        gen = str(int(self._meta("generation") or 0) + 1)
+        self._set_meta("generation", gen)
+        self._gen = gen
+
+    def ensure(self, dim: int) -> None:
+        with self._lock:
+            self._refresh()
+            if self.dim is None:
+                self._db.execute("BEGIN IMMEDIATE")
+                self._set_meta("dim", dim)
+                self._set_meta("file", "vectors-0.f32")
+                self._bump()
+                self._db.execute("COMMIT")
+                self.dim, self._file = dim, "vectors-0.f32"
+                (self.root / self._file).touch()
+            elif self.dim != dim:
+                raise ValueError(f"collection {self.root.name} has dim {self.dim}, got {dim}")
+
+    @property
+    def exists(self) -> bool:
+        with self._lock:
+            self._refresh()
+            return self.dim is not None
+
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._rows)
+
+    def upsert(self, ids: Sequence[str], vectors: np.ndarray, payloads: Sequence[dict]) -> None:
+        mat = _normalize(vectors)
+        # last write wins inside one batch too
+        last = {pid: i for i, pid in enumerate(ids)}
+        keep = sorted(last.values())
+        ids, mat, payloads = [ids[i] for i in keep], mat[keep], [payloads[i] for i in keep]
+        with self._lock:
+            self._refresh()
+            if mat.shape[1] != self.dim:
+                raise ValueError(f"collection {self.root.name} has dim {self.dim}, got {mat.shape[1]}")
+            n = len(self._pids)
+            dead = [self._rows[pid] for pid in ids if pid in self._rows]
+            path = self.root / self._file
+            with open(path, "r+b") as fh:
+                fh.truncate(n * self.dim * 4)  # drop bytes from a write that never committed
+                fh.seek(0, os.SEEK_END)
+                fh.write(mat.tobytes())
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.executemany("UPDATE points SET alive=0, payload=NULL WHERE row=?", [(r,) for r in dead])
+            self._db.executemany(
+                "INSERT INTO points(row, pid, payload) VALUES (?, ?, ?)",
+                [(n + i, pid, json.dumps(pl)) for i, (pid, pl) in enumerate(zip(ids, payloads))],
+            )
+            self._bump()
+            self._db.execute("COMMIT")
+            self._pids.extend(ids)
+            self._alive = np.concatenate([self._alive, np.ones(len(ids), dtype=bool)])
+            self._alive[dead] = False
+            self._rows.update((pid, n + i) for i, pid in enumerate(ids))
+            self._remap()
+            self._maybe_compact()
+
+    def set_payloads(self, items: Sequence[tuple[str, dict]]) -> None:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.executemany(
+                "UPDATE points SET payload=? WHERE pid=? AND alive=1", [(json.dumps(pl), pid) for pid, pl in items]
+            )
+            self._bump()  # scope masks depend on payloads
+            self._db.execute("COMMIT")
+
+    def delete(self, ids: Sequence[str]) -> None:
+        with self._lock:
+            self._refresh()
+            dead = [self._rows.pop(pid) for pid in ids if pid in self._rows]
+            if not dead:
+                return
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.executemany("UPDATE points SET alive=0, payload=NULL WHERE row=?", [(r,) for r in dead])
+            self._bump()
+            self._db.execute("COMMIT")
+            alive = self._alive.copy()  # searches may hold the old mask
+            alive[dead] = False
+            self._alive = alive
+            self._maybe_compact()
+
+    def _maybe_compact(self) -> None:
+        n = len(self._pids)
+        n_dead = n - len(self._rows)
+        if n_dead < COMPACT_MIN_DEAD or n_dead * 4 < n:
+            return
+        keep = np.flatnonzero(self._alive)
+        name = f"vectors-{uuid.uuid4().hex[:8]}.f32"
+        with open(self.root / name, "wb") as fh:
+            for i in range(0, len(keep), 4096):
+                fh.write(np.ascontiguousarray(self._mat[keep[i : i + 4096]]).tobytes())
+        old = self._file
+        # rows only ever move down, so renumbering in ascending order never collides
+        self._db.execute("BEGIN IMMEDIATE")
+        self._db.execute("DELETE FROM points WHERE alive=0")
+        self._db.executemany("UPDATE points SET row=? WHERE row=?", [(new, int(r)) for new, r in enumerate(keep) if new != r])
+        self._set_meta("file", name)
+        self._bump()
+        self._db.execute("COMMIT")
+        self._file = name
+        self._pids = [self._pids[r] for r in keep]
+        self._alive = np.ones(len(keep), dtype=bool)
+        self._rows = {pid: i for i, pid in enumerate(self._pids)}
+        self._remap()
+        try:
+            os.unlink(self.root / old)  # readers that still map it keep their pages
+        except OSError:
+            pass
+
+    def search(self, vector: np.ndarray, limit: int, scope: Scope | None = None) -> list[Hit]:
+        return self.search_batch(vector, limit, scope)[0]
+
+    def search_batch(self, vectors: np.ndarray, limit: int, scope: Scope | None = None) -> list[list[Hit]]:
+        qs = _normalize(vectors)
+        with self._lock:
+            self._refresh()
+            mat, alive, pids = self._mat, self._alive, self._pids
+            if scope:
+                alive = self._scope_mask(scope)
+        k = min(limit, int(alive.sum()))
+        if mat is None or k <= 0:
+            return [[] for _ in qs]
+        # one pass over the (possibly paged-out) matrix for the whole batch
+        scores = mat @ qs.T
+        scores[~alive] = -np.inf
+        tops = []
+        for j in range(scores.shape[1]):
+            col = scores[:, j]
+            top = np.argpartition(-col, k - 1)[:k]
+            tops.append(top[np.argsort(-col[top], kind="stable")])
+        found = self.retrieve(list({pids[r] for top in tops for r in top}))
+        return [
+            [Hit(pids[r], float(scores[r, j]), found[pids[r]]) for r in top if pids[r] in found]
+            for j, top in enumerate(tops)
+        ]
+
+    def retrieve(self, ids: Sequence[str]) -> dict[str, dict]:
+        out: dict[str, dict] = {}
+        ids = list(ids)
+        with self._lock:
+            for i in range(0, len(ids), 500):
+                part = ids[i : i + 500]
+                q = f"SELECT pid, payload FROM points WHERE alive=1 AND pid IN ({','.join('?' * len(part))})"
+                out.update((pid, json.loads(pl) if pl else {}) for pid, pl in self._db.execute(q, part).fetchall())
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            self._mat = None
+            self._db.close()
+
+class LocalStore:
+    """VectorStore on the local filesystem: brute-force cosine top-k over
+    memory-mapped float32 matrices, one directory per collection.
+
+    Meant for laptops, CI and single-node installs; for up to ~100k chunks
+    a scan is faster than a network round trip. One writer process at a
+    time; any number of readers.
+    """
+
+    def __init__(self, root: str | Path | None = None):
+        self.root = Path(root) if root else default_dir()
+        self._cols: dict[str, _Collection] = {}
+        self._lock = threading.Lock()
+
+    def _col(self, name: str, create: bool = False) -> _Collection | None:
+        with self._lock:
+            col = self._cols.get(name)
+            if col is None:
+                if not create and not (self.root / name / "points.sqlite3").exists():
+                    return None
+                col = self._cols[name] = _Collection(self.root / name)
+            return col
+
+    def collection_exists(self, name: str) -> bool:
+        col = self._col(name)
+        return col is not None and col.exists
+
+    def ensure_collection(self, name: str, dim: int) -> None:
+        self._col(name, create=True).ensure(dim)
+
+    def count(self, name: str) -> int:
+        col = self._col(name)
+        return col.count() if col else 0
+
+    def upsert(self, name: str, ids: Sequence[str], vectors: np.ndarray, payloads: Sequence[dict]) -> None:
+        col = self._col(name, create=True)
+        col.ensure(np.shape(vectors)[1])
+        col.upsert(ids, vectors, payloads)
+
+    def set_payloads(self, name: str, items: Sequence[tuple[str, dict]]) -> None:
+        col = self._col(name)
+        if col and items:
+            col.set_payloads(items)
+
+    def delete(self, name: str, ids: Sequence[str]) -> None:
+        col = self._col(name)
+        if col and ids:
+            col.delete(ids)
+
+    def search(self, name: str, vector: np.ndarray, limit: int, scope: Scope | None = None) -> list[Hit]:
+        col = self._col(name)
+        return col.search(vector, limit, scope) if col else []
+
+    def search_batch(
+        self, name: str, vectors: np.ndarray, limit: int, scope: Scope | None = None
+    ) -> list[list[Hit]]:
+        col = self._col(name)
+        return col.search_batch(vectors, limit, scope) if col else [[] for _ in range(len(vectors))]
+
+    def retrieve(self, name: str, ids: Sequence[str]) -> dict[str, dict]:
+        col = self._col(name)
+        return col.retrieve(ids) if col and ids else {}
+
+    def close(self) -> None:
+        with self._lock:
+            cols, self._cols = list(self._cols.values()), {}
+        for col in cols:
+            col.close()
@@ -0,0 +1,195 @@
+# src/repoguide_store/qdrant.py
+from __future__ import annotations
+import os, threading
+from typing import Sequence
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    Batch, BinaryQuantization, BinaryQuantizationConfig, Distance, FieldCondition, Filter, FilterSelector,
+    IsEmptyCondition, MatchValue, OverwritePayloadOperation, PayloadField, PayloadSchemaType, PointIdsList,
+    QuantizationSearchParams, SearchRequest, ScalarQuantization, ScalarQuantizationConfig,
+    ScalarType, SearchParams, SetPayload, VectorParams,
+)
+
+from repoguide_config.env import env_flag, env_float, env_int
+from repoguide_store.base import Hit, Scope
+
+# keyword-indexed so scoped searches filter inside HNSW instead of post-filtering;
+# the list fields hold every copy of a deduplicated chunk
+PAYLOAD_INDEXES = ("repo", "paths", "dirs", "langs")
+
+def make_client() -> QdrantClient:
+    """Build a client from QDRANT_URL / QDRANT_PREFER_GRPC / QDRANT_GRPC_PORT.
+
+    QDRANT_URL=":memory:" gives an in-process store (tests, offline runs).
+    """
+    url = os.getenv("QDRANT_URL", "http://qdrant:6333")
+    if url == ":memory:":
+        return QdrantClient(":memory:")
+    return QdrantClient(
+        url=url,
+        prefer_grpc=env_flag("QDRANT_PREFER_GRPC"),
+        grpc_port=env_int("QDRANT_GRPC_PORT", 6334),
+        timeout=env_int("QDRANT_TIMEOUT", 30),
+    )
+
+def vector_params(dim: int) -> VectorParams:
+    """REPOGUIDE_QDRANT_ON_DISK=1 keeps original vectors on disk (mmap)."""
+    return VectorParams(size=dim, distance=Distance.COSINE, on_disk=True if env_flag("REPOGUIDE_QDRANT_ON_DISK") else None)
+
+def quantization_config() -> ScalarQuantization | BinaryQuantization | None:
+    """REPOGUIDE_QDRANT_QUANTIZATION=scalar (int8, 4x smaller) or binary (32x).
+
+    Quantized vectors stay in RAM unless REPOGUIDE_QDRANT_QUANT_ON_DISK=1.
+    Only applied when a collection is created.
+    """
+    mode = os.getenv("REPOGUIDE_QDRANT_QUANTIZATION", "").strip().lower()
+    always_ram = not env_flag("REPOGUIDE_QDRANT_QUANT_ON_DISK")
+    if mode == "scalar":
+        return ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=always_ram))
+    if mode == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=always_ram))
+    return None
+
+def search_params() -> SearchParams | None:
+    """Rescore quantized hits against the originals, oversampling candidates first."""
+    if quantization_config() is None:
+        return None
+    oversampling = env_float("REPOGUIDE_QDRANT_OVERSAMPLING", 2.0, lo=1.0)
+    return SearchParams(quantization=QuantizationSearchParams(rescore=True, oversampling=oversampling))
+
+def scope_filter(scope: Scope | None) -> Filter | None:
+    if not scope:
+        return None
+    must: list = []
+    if scope.repo:
+        must.append(FieldCondition(key="repo", match=MatchValue(value=scope.repo)))
+    if scope.lang:
+        must.append(FieldCondition(key="langs", match=MatchValue(value=scope.lang)))
+    if scope.path:
+        # a file itself, or any chunk whose ancestor directories include it
+        must.append(Filter(should=[
+            FieldCondition(key="paths", match=MatchValue(value=scope.path)),
+            FieldCondition(key="dirs", match=MatchValue(value=scope.path)),
+        ]))
+    return Filter(must=must)
+
+_client: QdrantClient | None = None
+_lock = threading.Lock()
+
+def get_client() -> QdrantClient:
+    """Process-wide client; its connection pool is reused by every caller."""
+    global _client
+    with _lock:
+        if _client is None:
+            _client = make_client()
+        return _client
+
+def close_client() -> None:
+    global _client
+    with _lock:
+        c, _client = _client, None
+    if c is not None:
+        c.close()
+
+class QdrantStore:
+    """VectorStore over the shared QdrantClient (resolved per call, so it
+    follows close_client()/get_client() cycles)."""
+
+    def __init__(self, client: QdrantClient | None = None):
+        self._client = client
+        self._ensured: set[str] = set()
+
+    @property
+    def client(self) -> QdrantClient:
+        return self._client or get_client()
+
+    def collection_exists(self, name: str) -> bool:
+        return self.client.collection_exists(name)
+
+    def ensure_collection(self, name: str, dim: int) -> None:
+        """Create ``name`` if needed and bring an existing one up to date; checked once per process."""
+        if name in self._ensured:
+            return
+        if not self.client.collection_exists(name):
+            try:
+                self.client.create_collection(
+                    collection_name=name,
+                    vectors_config=vector_params(dim),
+                    quantization_config=quantization_config(),
+                )
+            except Exception:
+                # lost a creation race to another writer
+                if not self.client.collection_exists(name):
+                    raise
+        indexed = self.client.get_collection(name).payload_schema or {}
+        missing = [f for f in PAYLOAD_INDEXES if f not in indexed]
+        if missing:
+            # a collection from before payload indexes may still hold the
+            # original random-id points that carry their own text; no manifest
+            # tracks them and the first pass over their repo re-embeds it
+            self.client.delete(
+                collection_name=name,
+                points_selector=FilterSelector(filter=Filter(must=[IsEmptyCondition(is_empty=PayloadField(key="chunk"))])),
+            )
+        for field in missing:
+            self.client.create_payload_index(name, field, field_schema=PayloadSchemaType.KEYWORD)
+        self._ensured.add(name)
+
+    def count(self, name: str) -> int:
+        if not self.client.collection_exists(name):
+            return 0
+        return self.client.count(name).count
+
+    def upsert(self, name: str, ids: Sequence[str], vectors: np.ndarray, payloads: Sequence[dict]) -> None:
+        self.client.upsert(
+            collection_name=name,
+            points=Batch(ids=list(ids), vectors=np.asarray(vectors, dtype=np.float32).tolist(), payloads=list(payloads)),
+        )
+
+    def set_payloads(self, name: str, items: Sequence[tuple[str, dict]]) -> None:
+        if items:
+            self.client.batch_update_points(
+                collection_name=name,
+                update_operations=[
+                    OverwritePayloadOperation(overwrite_payload=SetPayload(payload=pl, points=[pid]))
+                    for pid, pl in items
+                ],
+            )
+
+    def delete(self, name: str, ids: Sequence[str]) -> None:
+        if ids and self.client.collection_exists(name):
+            self.client.delete(collection_name=name, points_selector=PointIdsList(points=list(ids)))
+
+    def search(self, name: str, vector: np.ndarray, limit: int, scope: Scope | None = None) -> list[Hit]:
+        hits = self.client.search(
+            collection_name=name, query_vector=vector, limit=limit,
+            query_filter=scope_filter(scope), search_params=search_params(),
+        )
+        return [Hit(str(h.id), h.score, h.payload or {}) for h in hits]
+
+    def search_batch(
+        self, name: str, vectors: np.ndarray, limit: int, scope: Scope | None = None
+    ) -> list[list[Hit]]:
+        params, flt = search_params(), scope_filter(scope)
+        results = self.client.search_batch(
+            collection_name=name,
+            requests=[
+                SearchRequest(vector=v.tolist(), limit=limit, filter=flt, with_payload=True, params=params)
+                for v in np.asarray(vectors, dtype=np.float32)
+            ],
+        )
+        return [[Hit(str(h.id), h.score, h.payload or {}) for h in hits] for hits in results]
+
+    def retrieve(self, name: str, ids: Sequence[str]) -> dict[str, dict]:
+        if not ids:
+            return {}
+        recs = self.client.retrieve(collection_name=name, ids=list(ids), with_payload=True)
+        return {str(r.id): r.payload or {} for r in recs}
+
+    def close(self) -> None:
+        if self._client is None:
+            close_client()
+        else:
+            self._client.close()
@@ -0,0 +1,128 @@
+# src/repoguide_store/text.py
+from __future__ import annotations
+import os, sqlite3, threading, zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, Sequence
+
+try:  # optional: ~2x faster and a little smaller than zlib on source text
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+from repoguide_config.env import state_dir
+
+ZLIB, ZSTD = 0, 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    hash  TEXT PRIMARY KEY,
+    codec INTEGER NOT NULL,
+    data  BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS refs (
+    hash  TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    PRIMARY KEY (hash, owner)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS refs_owner ON refs(owner);
+"""
+
+def default_text_path() -> Path:
+    """REPOGUIDE_TEXT_STORE, else chunks.sqlite3 in the state dir."""
+    raw = os.getenv("REPOGUIDE_TEXT_STORE")
+    return Path(raw) if raw else state_dir() / "chunks.sqlite3"
+
+class TextStore:
+    """Compressed chunk text addressed by chunk hash (manifest.chunk_hash).
+
+    Vector payloads only carry the hash; text is fetched for the final hits.
+    Identical chunks from any repo or branch share one row, referenced once
+    per owner (one indexed repo in one collection). A row is deleted when its
+    last owner releases it; adding and releasing are each one transaction,
+    so concurrent indexers never drop text another one still references.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA auto_vacuum=INCREMENTAL")  # only takes effect on a new file
+        self._db.executescript(_SCHEMA)
+        self._zc = zstandard.ZstdCompressor(level=3) if zstandard else None
+        self._zd = zstandard.ZstdDecompressor() if zstandard else None
+
+    def _pack(self, text: str) -> tuple[int, bytes]:
+        raw = text.encode("utf-8")
+        if self._zc is not None:
+            return ZSTD, self._zc.compress(raw)
+        return ZLIB, zlib.compress(raw, 6)
+
+    def _unpack(self, codec: int, data: bytes) -> str:
+        if codec == ZSTD:
+            if self._zd is None:
+                raise RuntimeError(f"{self.path} holds zstd blobs; pip install zstandard")
+            raw = self._zd.decompress(data)
+        else:
+            raw = zlib.decompress(data)
+        return raw.decode("utf-8")
+
+    @contextmanager
+    def _write(self) -> Iterator[None]:
+        """One write transaction; rolled back on any error so the shared connection stays usable."""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def put_many(self, owner: str, items: Iterable[tuple[str, str]]) -> None:
+        """items: (chunk hash, text) referenced by ``owner``; text already stored is not rewritten."""
+        rows = [(h, *self._pack(t)) for h, t in dict(items).items()]
+        if rows:
+            with self._lock, self._write():
+                self._db.executemany("INSERT OR IGNORE INTO chunks(hash, codec, data) VALUES (?, ?, ?)", rows)
+                self._db.executemany("INSERT OR IGNORE INTO refs VALUES (?, ?)", [(h, owner) for h, _, _ in rows])
+
+    def release(self, owner: str, hashes: Iterable[str] | None = None) -> int:
+        """Drop ``owner``'s references (all of them if ``hashes`` is None) and
+        delete text nobody references any more; returns the rows deleted."""
+        with self._lock:
+            with self._write():
+                if hashes is None:
+                    keys = [h for (h,) in self._db.execute("SELECT hash FROM refs WHERE owner=?", (owner,))]
+                else:
+                    keys = list(dict.fromkeys(hashes))
+                self._db.executemany("DELETE FROM refs WHERE hash=? AND owner=?", [(h, owner) for h in keys])
+                cur = self._db.executemany(
+                    "DELETE FROM chunks WHERE hash=? AND NOT EXISTS (SELECT 1 FROM refs WHERE refs.hash=chunks.hash)",
+                    [(h,) for h in keys],
+                )
+            deleted = max(0, cur.rowcount)
+            if deleted:
+                self._db.execute("PRAGMA incremental_vacuum")
+        return deleted
+
+    def get_many(self, hashes: Sequence[str]) -> dict[str, str]:
+        keys = list(dict.fromkeys(hashes))
+        found: list[tuple[str, int, bytes]] = []
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                part = keys[i : i + 500]
+                q = f"SELECT hash, codec, data FROM chunks WHERE hash IN ({','.join('?' * len(part))})"
+                found.extend(self._db.execute(q, part).fetchall())
+        return {h: self._unpack(codec, data) for h, codec, data in found}
+
+    def stats(self) -> dict:
+        with self._lock:
+            n, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM chunks").fetchone()
+        return {"chunks": n, "bytes": size, "codec": "zstd" if self._zc else "zlib"}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -1,12 +1,20 @@
 # src/repoguide_tools/changedigest.py
 from __future__ import annotations
-import os, subprocess, time
+import heapq, subprocess, threading
+from collections import Counter, OrderedDict
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
-from collections import Counter, defaultdict
 
+from repoguide_indexer.walker import walk
 from repoguide_schemas.models import ChangeDigestReport, CommitSummary, FileChange
 
+# top_files is computed over at most this many commits of the window
+SCAN_LIMIT = 5000
+_CACHE_SIZE = 128
+
+_cache: OrderedDict[tuple, ChangeDigestReport] = OrderedDict()
+_cache_lock = threading.Lock()
+
 def _since_iso(days: int) -> str:
     return (datetime.now(timezone.utc) - timedelta(days=days)).date().isoformat()
 
@@ -16,6 +24,70 @@ def _run_git(path: Path, args: list[str]) -> subprocess.CompletedProcess:
         stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
     )
 
+def _head_sha(p: Path) -> str | None:
+    """Resolve HEAD from .git files directly (no subprocess on the hot path)."""
+    git = p / ".git"
+    try:
+        if git.is_dir():
+            head = (git / "HEAD").read_text().strip()
+            if not head.startswith("ref: "):
+                return head
+            ref = head[5:]
+            loose = git / ref
+            if loose.is_file():
+                return loose.read_text().strip()
+            packed = git / "packed-refs"
+            if packed.is_file():
+                for ln in packed.read_text().splitlines():
+                    if ln.endswith(" " + ref):
+                        return ln.split(" ", 1)[0]
+    except OSError:
+        pass
+    # worktrees / submodules (.git is a file), unborn branches, ...
+    proc = _run_git(p, ["rev-parse", "HEAD"])
+    return proc.stdout.strip() if proc.returncode == 0 else None
+
+def _stream_git_log(p: Path, since: str, commit_limit: int, scan_limit: int):
+    """Parse `git log` as it streams; returns (commits, files_counter, scanned, truncated)."""
+    args = [
+        "git", "-C", str(p), "log", f"--since={since}", f"--max-count={scan_limit + 1}",
+        "--date=short", "--pretty=format:%h\t%ad\t%s", "--name-only",
+    ]
+    proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1 << 16)
+    commits: list[CommitSummary] = []
+    files_counter: Counter[str] = Counter()
+    scanned, truncated = 0, False
+    cur, keep = None, False
+    try:
+        for ln in proc.stdout:
+            ln = ln.rstrip("\n")
+            if not ln.strip():
+                continue
+            if "\t" in ln and len(ln.split("\t", 2)) == 3:
+                # commit header
+                if scanned == scan_limit:
+                    truncated = True
+                    break
+                scanned += 1
+                h, d, s = ln.split("\t", 2)
+                cur = CommitSummary(hash=h, date=d, subject=s, files=[])
+                keep = len(commits) < commit_limit
+                if keep:
+                    commits.append(cur)
+            elif cur is not None:
+                # file line
+                name = ln.strip()
+                if keep:
+                    cur.files.append(name)
+                files_counter[name] += 1
+    finally:
+        if proc.poll() is None:
+            proc.kill()  # we have enough; don't wait for git to finish
+        proc.stdout.close()
+        rc = proc.wait()
+    ok = truncated or rc == 0
+    return (commits, files_counter, scanned, truncated) if ok else None
+
 def change_digest(path: str, days: int = 30, commit_limit: int = 20) -> ChangeDigestReport:
     p = Path(path)
     since = _since_iso(days)
@@ -27,62 +99,42 @@ def change_digest(path: str, days: int = 30, commit_limit: int = 20) -> ChangeDi
 
     # --- Try git mode ---
     if (p / ".git").exists():
-        log_args = [
-            "log", f"--since={since}",
-            "--date=short", "--pretty=format:%h\t%ad\t%s", "--name-only"
-        ]
-        proc = _run_git(p, log_args)
-        if proc.returncode == 0:
-            lines = proc.stdout.splitlines()
-            commits: list[CommitSummary] = []
-            files_counter: Counter[str] = Counter()
-
-            cur = None
-            for ln in lines:
-                if not ln.strip():
-                    continue
-                if "\t" in ln and len(ln.split("\t", 2)) == 3:
-                    # commit header
-                    h, d, s = ln.split("\t", 2)
-                    if cur:
-                        commits.append(cur)
-                    cur = CommitSummary(hash=h, date=d, subject=s, files=[])
-                else:
-                    # file line
-                    if cur:
-                        cur.files.append(ln.strip())
-                        files_counter[ln.strip()] += 1
-            if cur:
-                commits.append(cur)
-
-            # Limit commit list
-            commits = commits[:commit_limit]
+        head = _head_sha(p)
+        key = (str(p.resolve()), head, since, commit_limit)
+        if head:
+            with _cache_lock:
+                hit = _cache.get(key)
+                if hit is not None:
+                    _cache.move_to_end(key)
+                    return hit.model_copy(deep=True)
+        parsed = _stream_git_log(p, since, commit_limit, max(SCAN_LIMIT, commit_limit))
+        if parsed is not None:
+            commits, files_counter, scanned, truncated = parsed
             top_files = [
                 FileChange(file=f, count=c) for f, c in files_counter.most_common(10)
             ]
-            return ChangeDigestReport(
-                path=str(p), since=since, commit_count=len(lines) > 0 and len(commits) or 0,
-                top_files=top_files, commits=commits, note=None
+            report = ChangeDigestReport(
+                path=str(p), since=since, commit_count=len(commits),
+                top_files=top_files, commits=commits,
+                note=f"Top files based on the latest {scanned} commits" if truncated else None,
             )
+            if head:
+                with _cache_lock:
+                    _cache[key] = report.model_copy(deep=True)
+                    while len(_cache) > _CACHE_SIZE:
+                        _cache.popitem(last=False)
+            return report
         # if git fails unexpectedly, we fall through to mtime mode
 
     # --- Fallback: mtime mode (works for non-git folders) ---
-    cutoff = datetime.fromisoformat(since)
-    changed: list[FileChange] = []
-    for fp in p.rglob("*"):
-        if not fp.is_file():
-            continue
-        try:
-            ts = fp.stat().st_mtime
-        except Exception:
-            continue
-        dt = datetime.fromtimestamp(ts)
-        if dt.date() >= cutoff.date():
-            changed.append(FileChange(file=str(fp.relative_to(p)), modified_at=dt.isoformat()))
-
+    cutoff_ns = int(datetime.fromisoformat(since).timestamp() * 1e9)
+    recent = (f for f in walk(p, exts=None, max_bytes=None) if f.mtime_ns >= cutoff_ns)
     # pick 10 most recently modified
-    changed.sort(key=lambda x: x.modified_at or "", reverse=True)
-    top_files = changed[:10]
+    newest = heapq.nlargest(10, recent, key=lambda f: f.mtime_ns)
+    top_files = [
+        FileChange(file=f.rel, modified_at=datetime.fromtimestamp(f.mtime_ns / 1e9).isoformat())
+        for f in newest
+    ]
     return ChangeDigestReport(
         path=str(p), since=since, commit_count=0, top_files=top_files, commits=[],
         note="Not a git repo, using file modification time fallback"
@@ -4,7 +4,6 @@ import os
 
 from repoguide_schemas.models import OnboardReport, OnboardAction, PreflightReport
 from repoguide_tools.preflight import run_preflight
-from repoguide_indexer.index_repo import index_local_repo
 
 def _next_steps_from_preflight(pf: PreflightReport) -> list[OnboardAction]:
     steps: list[OnboardAction] = []
@@ -18,7 +17,10 @@ def _next_steps_from_preflight(pf: PreflightReport) -> list[OnboardAction]:
 
 def run_onboard(path: str, do_index: bool = False) -> OnboardReport:
     pf = run_preflight(path)
-    chunks = index_local_repo(path) if do_index else 0
+    chunks = 0
+    if do_index:
+        from repoguide_indexer.index_repo import index_local_repo
+        chunks = index_local_repo(path)
 
     api_port = os.getenv("API_PORT", "8000")
     links = {
@@ -1,8 +1,13 @@
 # src/repoguide_tools/preflight.py
 from __future__ import annotations
-import os, json, re
+import os, json, re, threading
+import multiprocessing as mp
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import Callable, List, Sequence
 import sys
 
 try:
@@ -10,7 +15,7 @@ try:
 except ModuleNotFoundError:
     import tomli as tomllib  # fallback if running locally on older py
 
-from repoguide_schemas.models import PreflightCheck, PreflightReport
+from repoguide_schemas.models import PreflightCheck, PreflightReport, BulkPreflightReport
 
 def _read_json(p: Path):
     try:
@@ -34,24 +39,36 @@ def _find_requires_python(toml: dict) -> str | None:
     v = py.get("python")
     return v if isinstance(v, str) else None
 
-def run_preflight(path: str) -> PreflightReport:
-    root = Path(path)
-    checks: List[PreflightCheck] = []
-    if not root.exists():
-        return PreflightReport(path=str(root), checks=[PreflightCheck(
-            name="Path exists", status="error",
-            found="missing", expected=str(root),
-            fix="Double-check the path; mount or clone the repo."
-        )], summary="Repo path missing")
-
-    # README
-    readme = next((p for p in [root/"README.md", root/"readme.md"] if p.exists()), None)
+# --- check registry ---
+
+@dataclass(frozen=True)
+class Check:
+    name: str
+    reads: tuple[str, ...]               # files (relative to the repo) the result depends on
+    fn: Callable[[Path], PreflightCheck]
+
+CHECKS: list[Check] = []
+
+def check(name: str, reads: Sequence[str]):
+    """Register a preflight check; results are cached on the stat of ``reads``."""
+    def deco(fn: Callable[[Path], PreflightCheck]):
+        CHECKS.append(Check(name=name, reads=tuple(reads), fn=fn))
+        return fn
+    return deco
+
+def _readme(root: Path) -> Path | None:
+    return next((p for p in [root/"README.md", root/"readme.md"] if p.exists()), None)
+
+@check("README", reads=["README.md", "readme.md"])
+def _check_readme(root: Path) -> PreflightCheck:
+    readme = _readme(root)
     if readme:
-        checks.append(PreflightCheck(name="README", status="ok", found=str(readme)))
-    else:
-        checks.append(PreflightCheck(name="README", status="warn", expected="README.md",
-                                     fix="Add a README with setup and run instructions."))
+        return PreflightCheck(name="README", status="ok", found=str(readme))
+    return PreflightCheck(name="README", status="warn", expected="README.md",
+                          fix="Add a README with setup and run instructions.")
 
+@check("pyproject", reads=["pyproject.toml"])
+def _check_pyproject(root: Path) -> PreflightCheck:
     # pyproject.toml / requires-python
     pyproj = root / "pyproject.toml"
     if pyproj.exists():
@@ -59,12 +76,13 @@ def run_preflight(path: str) -> PreflightReport:
         req = _find_requires_python(toml)
         status = "ok" if req else "warn"
         fix = None if req else "Add project.requires-python in pyproject.toml (e.g., '>=3.11')"
-        checks.append(PreflightCheck(name="Python version (pyproject)", status=status,
-                                     found=req or "unspecified", expected=">=3.11", fix=fix))
-    else:
-        checks.append(PreflightCheck(name="pyproject.toml", status="warn",
-                                     expected="pyproject.toml", fix="Consider using pyproject.toml for Python deps and version."))
+        return PreflightCheck(name="Python version (pyproject)", status=status,
+                              found=req or "unspecified", expected=">=3.11", fix=fix)
+    return PreflightCheck(name="pyproject.toml", status="warn",
+                          expected="pyproject.toml", fix="Consider using pyproject.toml for Python deps and version.")
 
+@check("package.json", reads=["package.json"])
+def _check_package_json(root: Path) -> PreflightCheck:
     # package.json / engines.node
     pkg = root / "package.json"
     if pkg.exists():
@@ -72,48 +90,204 @@ def run_preflight(path: str) -> PreflightReport:
         eng = (j.get("engines") or {}).get("node")
         status = "ok" if eng else "warn"
         fix = None if eng else "Add engines.node to package.json (e.g., '>=20')"
-        checks.append(PreflightCheck(name="Node version (package.json)", status=status,
-                                     found=eng or "unspecified", expected=">=20", fix=fix))
-    else:
-        checks.append(PreflightCheck(name="package.json", status="warn",
-                                     expected="package.json", fix="Add package.json if there is a frontend or scripts."))
+        return PreflightCheck(name="Node version (package.json)", status=status,
+                              found=eng or "unspecified", expected=">=20", fix=fix)
+    return PreflightCheck(name="package.json", status="warn",
+                          expected="package.json", fix="Add package.json if there is a frontend or scripts.")
 
-    # docker-compose.yml
+@check("Docker Compose", reads=["docker-compose.yml"])
+def _check_compose(root: Path) -> PreflightCheck:
     dc = root / "docker-compose.yml"
-    checks.append(
-        PreflightCheck(
-            name="Docker Compose",
-            status="ok" if dc.exists() else "warn",
-            found=str(dc) if dc.exists() else "missing",
-            expected="docker-compose.yml",
-            fix=None if dc.exists() else "Add docker-compose.yml for one-command dev."
-        )
+    return PreflightCheck(
+        name="Docker Compose",
+        status="ok" if dc.exists() else "warn",
+        found=str(dc) if dc.exists() else "missing",
+        expected="docker-compose.yml",
+        fix=None if dc.exists() else "Add docker-compose.yml for one-command dev."
     )
 
-    # .env.example
+@check(".env.example", reads=[".env.example"])
+def _check_env_example(root: Path) -> PreflightCheck:
     envex = root / ".env.example"
-    checks.append(
-        PreflightCheck(
-            name=".env.example",
-            status="ok" if envex.exists() else "warn",
-            found=str(envex) if envex.exists() else "missing",
-            expected=".env.example",
-            fix=None if envex.exists() else "Create .env.example listing required env vars (no secrets)."
-        )
+    return PreflightCheck(
+        name=".env.example",
+        status="ok" if envex.exists() else "warn",
+        found=str(envex) if envex.exists() else "missing",
+        expected=".env.example",
+        fix=None if envex.exists() else "Create .env.example listing required env vars (no secrets)."
     )
 
+@check("Tests instruction", reads=["README.md", "readme.md"])
+def _check_tests_hint(root: Path) -> PreflightCheck:
     # Tests hint (README mentions pytest)
+    readme = _readme(root)
     readme_text = readme.read_text(encoding="utf-8", errors="ignore") if readme else ""
     if "pytest" in readme_text:
-        checks.append(PreflightCheck(name="Tests instruction", status="ok", found="pytest mentioned"))
-    else:
-        checks.append(PreflightCheck(name="Tests instruction", status="warn",
-                                     expected="README shows how to run tests",
-                                     fix="Document how to run tests (e.g., `pytest -q`)."))
+        return PreflightCheck(name="Tests instruction", status="ok", found="pytest mentioned")
+    return PreflightCheck(name="Tests instruction", status="warn",
+                          expected="README shows how to run tests",
+                          fix="Document how to run tests (e.g., `pytest -q`).")
+
+# --- engine ---
+
+_CACHE_SIZE = 4096
+_cache: OrderedDict[tuple, PreflightCheck] = OrderedDict()
+_cache_lock = threading.Lock()
+_pool: ThreadPoolExecutor | None = None
+_procs: ProcessPoolExecutor | None = None
+_procs_lock = threading.Lock()
+_WORKERS = os.cpu_count() or 1
+_CRASHED = "Preflight check crashed; see API logs."
+
+def _fingerprint(root: Path, reads: tuple[str, ...]) -> tuple:
+    out = []
+    for rel in reads:
+        try:
+            st = os.stat(root / rel)
+            out.append((st.st_size, st.st_mtime_ns, st.st_ino))
+        except OSError:
+            out.append(None)
+    return tuple(out)
+
+def _key(root: Path, c: Check) -> tuple:
+    return (str(root.resolve()), c.name, _fingerprint(root, c.reads))
+
+def _cached(key: tuple) -> PreflightCheck | None:
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None:
+            _cache.move_to_end(key)
+        return hit
+
+def _remember(key: tuple, result: PreflightCheck) -> PreflightCheck:
+    if result.fix != _CRASHED:  # a crash is retried next time
+        with _cache_lock:
+            _cache[key] = result
+            while len(_cache) > _CACHE_SIZE:
+                _cache.popitem(last=False)
+    return result
+
+def _call(root: Path, c: Check) -> PreflightCheck:
+    try:
+        return c.fn(root)
+    except Exception as e:  # a broken plugin must not sink the whole report
+        return PreflightCheck(name=c.name, status="error", found=f"{type(e).__name__}: {e}", fix=_CRASHED)
 
+def _call_many(path: str, checks: list[Check]) -> list[PreflightCheck]:
+    """Worker side of bulk mode: run ``checks`` uncached (the parent owns the cache)."""
+    return [_call(Path(path), c) for c in checks]
+
+def _run_check(root: Path, c: Check) -> PreflightCheck:
+    key = _key(root, c)
+    return _cached(key) or _remember(key, _call(root, c))
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=min(8, max(1, len(CHECKS))), thread_name_prefix="repoguide-preflight")
+    return _pool
+
+def _processes() -> ProcessPoolExecutor:
+    """Bulk-mode workers, started once and reused: spawning costs more than most checks."""
+    global _procs
+    with _procs_lock:
+        if _procs is None:
+            # spawn, not fork: the API process is full of threads (pools, event loops)
+            _procs = ProcessPoolExecutor(max_workers=_WORKERS, mp_context=mp.get_context("spawn"))
+        return _procs
+
+def close_preflight() -> None:
+    global _pool, _procs
+    with _procs_lock:
+        procs, _procs = _procs, None
+    pool, _pool = _pool, None
+    for ex in (procs, pool):
+        if ex is not None:
+            ex.shutdown(wait=True, cancel_futures=True)
+
+def _missing(root: Path) -> PreflightReport:
+    return PreflightReport(path=str(root), checks=[PreflightCheck(
+        name="Path exists", status="error",
+        found="missing", expected=str(root),
+        fix="Double-check the path; mount or clone the repo."
+    )], summary="Repo path missing")
+
+def run_preflight(path: str) -> PreflightReport:
+    root = Path(path)
+    if not root.exists():
+        return _missing(root)
+
+    # registered checks run concurrently; order in the report is registration order
+    checks: List[PreflightCheck] = list(_executor().map(lambda c: _run_check(root, c), CHECKS))
+    return _report(root, checks)
+
+def _report(root: Path, checks: List[PreflightCheck]) -> PreflightReport:
     # Summary
     errors = sum(1 for c in checks if c.status == "error")
     warns = sum(1 for c in checks if c.status == "warn")
     summary = f"{errors} error(s), {warns} warning(s)"
 
     return PreflightReport(path=str(root), checks=checks, summary=summary)
+
+# --- bulk mode ---
+
+PROJECT_MARKERS = ("pyproject.toml", "package.json", "setup.py", "requirements.txt", "docker-compose.yml")
+_SKIP_DIRS = {".git", "node_modules", ".venv", "venv", "__pycache__", "dist", "build", ".tox", ".next"}
+
+def find_project_roots(path: str, max_depth: int = 4) -> list[str]:
+    """Directories under ``path`` that look like a project (pruned scandir walk)."""
+    roots: list[str] = []
+    stack = [(str(Path(path)), 0)]
+    while stack:
+        d, depth = stack.pop()
+        try:
+            with os.scandir(d) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        names = {e.name for e in entries}
+        if any(m in names for m in PROJECT_MARKERS):
+            roots.append(d)
+        if depth < max_depth:
+            stack.extend(
+                (e.path, depth + 1) for e in reversed(entries)
+                if e.is_dir(follow_symlinks=False) and e.name not in _SKIP_DIRS and not e.name.startswith(".")
+            )
+    return roots
+
+def run_preflight_bulk(paths: Sequence[str]) -> BulkPreflightReport:
+    """Preflight many repos at once. Cached results are answered here; only
+    the checks whose files changed go to the long-lived process pool."""
+    roots = [Path(p) for p in dict.fromkeys(paths)]
+    rows: list[list[PreflightCheck | None] | None] = []
+    todo: list[tuple[Path, list[PreflightCheck | None], list[tuple], list[int]]] = []
+    for root in roots:
+        if not root.exists():
+            rows.append(None)
+            continue
+        keys = [_key(root, c) for c in CHECKS]
+        row = [_cached(k) for k in keys]
+        rows.append(row)
+        miss = [j for j, r in enumerate(row) if r is None]
+        if miss:
+            todo.append((root, row, keys, miss))
+    results: list[list[PreflightCheck]] = []
+    if len(todo) == 1:  # not worth a round trip to the workers
+        root, _, _, miss = todo[0]
+        results = [list(_executor().map(lambda j: _call(root, CHECKS[j]), miss))]
+    elif todo:
+        args = [(str(root), [CHECKS[j] for j in miss]) for root, _, _, miss in todo]
+        try:
+            results = list(_processes().map(_call_many, *zip(*args), chunksize=max(1, len(args) // (4 * _WORKERS))))
+        except BrokenProcessPool:
+            close_preflight()  # the next bulk run starts a fresh pool
+            results = [_call_many(*a) for a in args]
+    for (_, row, keys, miss), done in zip(todo, results):
+        for j, result in zip(miss, done):
+            row[j] = _remember(keys[j], result)
+    reports = [_missing(root) if row is None else _report(root, row) for root, row in zip(roots, rows)]
+    errors = sum(1 for r in reports for c in r.checks if c.status == "error")
+    warns = sum(1 for r in reports for c in r.checks if c.status == "warn")
+    return BulkPreflightReport(
+        reports=reports, summary=f"{len(reports)} repo(s): {errors} error(s), {warns} warning(s)",
+    )
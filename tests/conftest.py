@@ -0,0 +1,43 @@
+import pytest
+
+from repoguide_bench.fake_embed import FakeEmbeddingServer, fake_vector  # noqa: F401 (re-exported for tests)
+from repoguide_embeddings import client as emb
+from repoguide_store import qdrant as store
+from repoguide_store.backend import close_store, get_store
+
+@pytest.fixture
+def fake_embeddings(tmp_path, monkeypatch):
+    srv = FakeEmbeddingServer()
+    monkeypatch.setenv("REPOGUIDE_STATE_DIR", str(tmp_path / "state"))
+    monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", srv.url)
+    monkeypatch.setenv("AZURE_OPENAI_EMBED_DEPLOYMENT", "fake")
+    monkeypatch.setenv("AZURE_OPENAI_API_VERSION", "2024-10-21")
+    monkeypatch.setenv("AZURE_OPENAI_API_KEY", "test")
+    emb.close_client()
+    yield srv
+    emb.close_client()
+    srv.close()
+
+@pytest.fixture
+def qdrant(tmp_path, monkeypatch):
+    """In-process Qdrant behind the shared client accessor."""
+    monkeypatch.setenv("REPOGUIDE_STATE_DIR", str(tmp_path / "state"))
+    monkeypatch.setenv("QDRANT_URL", ":memory:")
+    monkeypatch.setenv("REPOGUIDE_VECTOR_STORE", "qdrant")
+    close_store()
+    store.close_client()
+    yield store.get_client()
+    close_store()
+    store.close_client()
+
+@pytest.fixture(params=["qdrant", "local"])
+def vector_store(request, tmp_path, monkeypatch):
+    """The shared VectorStore, once per backend."""
+    monkeypatch.setenv("REPOGUIDE_STATE_DIR", str(tmp_path / "state"))
+    monkeypatch.setenv("QDRANT_URL", ":memory:")
+    monkeypatch.setenv("REPOGUIDE_VECTOR_STORE", request.param)
+    close_store()
+    store.close_client()
+    yield get_store()
+    close_store()
+    store.close_client()
@@ -0,0 +1,22 @@
+from repoguide_bench.run import BenchConfig, compare, run
+from repoguide_bench.synth import generate_repo
+
+def test_synthetic_repo_is_deterministic(tmp_path):
+    a = generate_repo(tmp_path / "a", files=6, file_bytes=500, seed=3)
+    b = generate_repo(tmp_path / "b", files=6, file_bytes=500, seed=3)
+    assert a.files == b.files and a.identifiers == b.identifiers
+    assert all((a.root / f).read_text() == (b.root / f).read_text() for f in a.files)
+
+def test_bench_runs_offline_and_flags_regressions():
+    result = run(BenchConfig(files=12, file_bytes=800, queries=5, dim=8))
+    s = result["scenarios"]
+    assert s["index_cold"]["files_changed"] == 12
+    assert s["index_cold"]["embedded_texts"] == s["index_cold"]["chunks"] > 0
+    assert s["index_noop"]["embed_calls"] == 0
+    assert 0 < s["index_incremental"]["files_changed"] < 12
+    assert s["query_identifier"]["misses"] == 0 and s["query_identifier"]["embed_calls"] == 0
+    assert s["query_prose"]["embed_calls"] == 5
+
+    slower = {"scenarios": {"query_prose": {"p95_ms": s["query_prose"]["p95_ms"] / 2}}}
+    assert compare(result, slower) == [f"query_prose.p95_ms: {slower['scenarios']['query_prose']['p95_ms']} -> {s['query_prose']['p95_ms']}"]
+    assert compare(result, result) == []
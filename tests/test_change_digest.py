@@ -0,0 +1,40 @@
+import subprocess
+
+from repoguide_tools import changedigest as cd
+
+def _git(repo, *args):
+    subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True)
+
+def _commit(repo, name, msg):
+    (repo / name).write_text(msg)
+    _git(repo, "add", name)
+    _git(repo, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", msg)
+
+def test_git_digest_is_limited_and_cached(tmp_path, monkeypatch):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _git(repo, "init", "-q")
+    for i in range(5):
+        _commit(repo, "hot.py", f"change {i}")
+    _commit(repo, "cold.py", "cold")
+
+    monkeypatch.setattr(cd, "SCAN_LIMIT", 4)
+    r = cd.change_digest(str(repo), commit_limit=2)
+    assert r.commit_count == 2 and [c.subject for c in r.commits] == ["cold", "change 4"]
+    assert r.commits[0].files == ["cold.py"]
+    assert [(f.file, f.count) for f in r.top_files] == [("hot.py", 3), ("cold.py", 1)]
+    assert r.note == "Top files based on the latest 4 commits"
+
+    # same HEAD: served from cache without running git log
+    calls = []
+    monkeypatch.setattr(cd, "_stream_git_log", lambda *a: calls.append(a))
+    assert cd.change_digest(str(repo), commit_limit=2) == r
+    assert calls == []
+
+def test_mtime_fallback_skips_pruned_dirs(tmp_path):
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "node_modules" / "x.js").write_text("x")
+    (tmp_path / "a.txt").write_text("a")
+    r = cd.change_digest(str(tmp_path))
+    assert [f.file for f in r.top_files] == ["a.txt"]
+    assert r.commit_count == 0
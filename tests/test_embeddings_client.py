@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from repoguide_embeddings.batching import BatchSizer
+from repoguide_embeddings.cache import EmbeddingCache
+from repoguide_embeddings.client import EmbeddingClient
+
+from conftest import fake_vector
+
+def _client(srv, **kw):
+    return EmbeddingClient(srv.url, "fake", "2024-10-21", "test", backoff=0.01, **kw)
+
+def test_batches_run_concurrently_and_keep_order(fake_embeddings):
+    fake_embeddings.delay = 0.05
+    c = _client(fake_embeddings, concurrency=4)
+    try:
+        batches = [[f"text {i}-{j}" for j in range(3)] for i in range(8)]
+        out = c.embed_batches(batches)
+    finally:
+        c.close()
+    for got, b in zip(out, batches):
+        assert got.dtype == np.float32 and got.shape == (3, 8)
+        assert got.tolist() == [pytest.approx(fake_vector(t)) for t in b]
+    assert 1 < fake_embeddings.peak <= 4
+
+def test_retries_throttled_requests(fake_embeddings):
+    fake_embeddings.throttle = 2
+    c = _client(fake_embeddings)
+    try:
+        assert c.embed(["hello"]).tolist() == [pytest.approx(fake_vector("hello"))]
+    finally:
+        c.close()
+    assert c.retries == 2
+
+def test_cache_skips_known_texts(fake_embeddings, tmp_path):
+    c = _client(fake_embeddings, cache=EmbeddingCache(tmp_path / "emb.sqlite3"))
+    try:
+        c.embed(["a", "b"])
+        assert c.embed(["b", "a", "c"]).tolist() == [pytest.approx(fake_vector(t)) for t in "bac"]
+    finally:
+        c.close()
+    assert fake_embeddings.calls == [["a", "b"], ["c"]]
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(tmp_path / "emb.sqlite3", max_bytes=3 * 8 * 4)
+    try:
+        cache.put_many("dep", ["a", "b", "c"], [fake_vector(t) for t in "abc"])
+        cache.get_many("dep", ["a"])                # touch a so it outlives b and c
+        cache.put_many("dep", ["d"], [fake_vector("d")])
+        got = cache.get_many("dep", ["a", "b", "c", "d"])
+    finally:
+        cache.close()
+    assert got[0] is not None and got[3] is not None
+    assert (got[1] is None) + (got[2] is None) == 1
+    assert cache.stats()["evictions"] == 1
+
+def test_dimension_truncation_renormalizes(fake_embeddings):
+    c = _client(fake_embeddings, dim=4, encoding="float")
+    try:
+        out = c.embed(["a", "b"])
+    finally:
+        c.close()
+    assert out.shape == (2, 4)
+    assert np.linalg.norm(out, axis=1) == pytest.approx([1.0, 1.0])
+    full = np.asarray(fake_vector("a")[:4])
+    assert out[0] == pytest.approx(full / np.linalg.norm(full))
+
+def test_oversized_batch_is_split_and_retried(fake_embeddings):
+    fake_embeddings.max_request_chars = 25
+    c = _client(fake_embeddings, batching=BatchSizer(max_items=64, max_tokens=10_000))
+    texts = [f"text {i:05d}" for i in range(6)]  # 10 chars each
+    try:
+        assert c.embed(texts).tolist() == [pytest.approx(fake_vector(t)) for t in texts]
+    finally:
+        c.close()
+    assert all(sum(map(len, b)) <= 25 for b in fake_embeddings.calls)
+    assert sorted(t for b in fake_embeddings.calls for t in b) == texts
+    assert c.batching.too_large >= 2 and c.batching.max_tokens < 10_000
+
+def test_batch_sizer_packs_and_adapts():
+    b = BatchSizer(max_items=40, max_tokens=100, target_s=1.0, start=8)
+    assert b.pack(["x" * 30] * 12) == [(0, 8), (8, 12)]
+    assert b.pack(["x" * 150, "x" * 150, "x"]) == [(0, 1), (1, 3)]  # ~51 tokens each, budget 100
+    for _ in range(20):
+        b.observe(b.limit, 0.1)
+    assert b.limit == 40
+    b.observe(40, 5.0)
+    assert b.limit == 20
+    b.throttle()
+    assert b.limit == 10 and b.throttled == 1
+    b.observe(3, 0.1)  # a short batch says nothing about capacity
+    assert b.limit == 10
+
+def test_token_budget_recovers_after_rejection():
+    b = BatchSizer(max_tokens=1000, target_s=1.0)
+    b.rejected(800)
+    assert b.max_tokens == 400
+    b.observe(b.limit, 0.1, tokens=50)  # a light request proves nothing
+    b.observe(b.limit, 5.0, tokens=400)  # nor does a slow one
+    assert b.max_tokens == 400
+    for _ in range(20):
+        b.observe(1, 0.1, tokens=b.max_tokens)
+    assert b.max_tokens == b.budget == 1000
+
+def test_env_settings_fall_back_on_bad_values(monkeypatch):
+    from repoguide_config.env import env_flag, env_float, env_int
+    from repoguide_store import qdrant
+
+    monkeypatch.setenv("QDRANT_GRPC_PORT", "not-a-port")
+    monkeypatch.setenv("QDRANT_URL", "http://localhost:6333")
+    qdrant.make_client().close()  # used to raise ValueError
+    monkeypatch.setenv("X_INT", "0")
+    monkeypatch.setenv("X_FLOAT", "nan")
+    monkeypatch.setenv("X_FLAG", "maybe")
+    assert env_int("X_INT", 8) == 1 and env_int("X_INT", 8, lo=0) == 0 and env_int("X_UNSET", 8) == 8
+    assert env_float("X_FLOAT", 0.9, lo=0.5, hi=1.0) == 0.9
+    assert env_flag("X_FLAG", default=True) is True and env_flag("X_UNSET") is False
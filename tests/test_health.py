@@ -1,3 +1,6 @@
+import json, os, subprocess, sys, time
+from pathlib import Path
+
 from fastapi.testclient import TestClient
 from repoguide_api.main import app
 
@@ -6,3 +9,57 @@ def test_health():
     r = client.get("/health")
     assert r.status_code == 200
     assert r.json()["status"] == "ok"
+
+def test_lifespan_owns_shared_clients(qdrant, fake_embeddings):
+    from repoguide_api.main import vector_store
+    from repoguide_embeddings import client as emb
+    from repoguide_store import qdrant as store
+    with TestClient(app) as client:
+        assert client.get("/health").status_code == 200
+        deadline = time.monotonic() + 30  # the vector stack loads in the background
+        while not client.get("/health").json()["ready"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert client.get("/health").json()["ready"]
+        assert vector_store() is vector_store()
+        assert emb._client is not None
+    # shutdown closes both pools
+    assert store._client is None and emb._client is None
+
+def _startup(code: str) -> dict:
+    """Import timings and loaded modules from a fresh interpreter (no warm caches in sys.modules)."""
+    src = Path(__file__).resolve().parents[1] / "src"
+    env = {**os.environ, "PYTHONPATH": str(src)}
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+# Heavy subsystems that must load on first use, not at import / --help time
+LAZY = ["numpy", "httpx", "qdrant_client", "repoguide_indexer.index_repo", "repoguide_retriever.hybrid"]
+# Budget for our own modules on top of the framework (fastapi / typer); REPOGUIDE_IMPORT_BUDGET_MS overrides
+BUDGET_S = float(os.getenv("REPOGUIDE_IMPORT_BUDGET_MS", "250")) / 1000
+
+def test_api_import_stays_within_budget():
+    r = _startup(
+        "import json, sys, time\n"
+        "import fastapi, fastapi.middleware.cors, pydantic\n"
+        "t = time.perf_counter(); import repoguide_api.main; dt = time.perf_counter() - t\n"
+        f"print(json.dumps({{'s': dt, 'loaded': [m for m in {LAZY!r} if m in sys.modules]}}))"
+    )
+    assert r["loaded"] == []
+    assert r["s"] < BUDGET_S, f"import repoguide_api.main took {r['s'] * 1000:.0f} ms"
+
+def test_cli_help_stays_within_budget():
+    cli = Path(__file__).resolve().parents[1] / "cli" / "repoguide.py"
+    r = _startup(
+        "import json, runpy, sys, time\n"
+        "import typer\n"
+        f"sys.argv = [{str(cli)!r}, '--help']\n"
+        "t = time.perf_counter()\n"
+        "try:\n"
+        f"    runpy.run_path({str(cli)!r}, run_name='__main__')\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "dt = time.perf_counter() - t\n"
+        f"print(json.dumps({{'s': dt, 'loaded': [m for m in {LAZY!r} if m in sys.modules]}}))"
+    )
+    assert r["loaded"] == []
+    assert r["s"] < BUDGET_S, f"repoguide --help took {r['s'] * 1000:.0f} ms"
@@ -1,3 +1,4 @@
+import pytest
 from fastapi.testclient import TestClient
 from repoguide_api.main import app
 client = TestClient(app)
@@ -11,3 +12,112 @@ def test_preflight_demo_repo():
     j = r.json()
     assert j["path"].endswith("/demo_repo")
     assert "summary" in j
+def test_index_runs_as_background_job(tmp_path, qdrant, fake_embeddings):
+    import time
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "a.py").write_text("def a():\n    return 1\n")
+    (repo / "b.py").write_text("def a():\n    return 1\n")  # a copy: embedded once
+    r = client.post("/index", json={"path": str(repo)})
+    assert r.status_code == 202
+    job = r.json()
+    for _ in range(100):
+        j = client.get(f"/jobs/{job['id']}").json()
+        if j["state"] in ("done", "failed"):
+            break
+        time.sleep(0.05)
+    assert j["state"] == "done", j
+    assert j["result"] == {"chunks_indexed": 1}
+    assert j["progress"]["files_walked"] == 2 and j["progress"]["points_upserted"] == 1
+    assert j["progress"]["embeddings_saved"] == 1 and j["progress"]["near_duplicates"] == 0
+    assert client.get("/jobs/nope").status_code == 404
+
+def test_identical_jobs_merge_until_one_starts(tmp_path):
+    import threading, time
+    from repoguide_api.jobs import JobManager
+    started, gate, runs = threading.Event(), threading.Event(), []
+
+    def slow(p):
+        started.set()
+        gate.wait(5)
+        runs.append("first")
+        return {}
+
+    jobs = JobManager(workers=2)
+    a = jobs.submit("index", str(tmp_path), slow)
+    assert started.wait(5)
+    b = jobs.submit("index", str(tmp_path / "."), lambda p: runs.append("follow-up") or {})
+    assert jobs.submit("index", str(tmp_path), lambda p: runs.append("merged") or {}) is b
+    c = jobs.submit("index", str(tmp_path / "other"), lambda p: {})
+    assert b is not a and c is not b and b.state == "queued"  # waits for a, not beside it
+    gate.set()
+    for _ in range(100):
+        if b.state == "done":
+            break
+        time.sleep(0.05)
+    assert runs == ["first", "follow-up"]
+    jobs.shutdown()
+
+def test_job_shutdown_cancels_and_waits(tmp_path):
+    import threading
+    from repoguide_api.jobs import JobManager
+    started = threading.Event()
+    jobs = JobManager(workers=1)
+    running = jobs.submit("index", str(tmp_path), lambda p: started.set() or {"stopped": p.cancel.wait(5)})
+    assert started.wait(5)
+    queued = jobs.submit("index", str(tmp_path), lambda p: {})
+    jobs.shutdown()
+    assert (running.state, running.result) == ("done", {"stopped": True})
+    assert queued.state == "failed"
+
+def test_preflight_checks_are_cached_by_file_stat(tmp_path, monkeypatch):
+    from repoguide_tools import preflight as pf
+    (tmp_path / "README.md").write_text("run pytest -q")
+    calls = []
+    orig = pf._read_toml
+    monkeypatch.setattr(pf, "_read_toml", lambda p: calls.append(p) or orig(p))
+    (tmp_path / "pyproject.toml").write_text("[project]\nrequires-python = '>=3.11'\n")
+    first = pf.run_preflight(str(tmp_path))
+    assert pf.run_preflight(str(tmp_path)) == first
+    assert len(calls) == 1
+    (tmp_path / "pyproject.toml").write_text("[project]\nname = 'x'\n")
+    again = pf.run_preflight(str(tmp_path))
+    assert len(calls) == 2
+    assert [c.status for c in again.checks if c.name.startswith("Python")] == ["warn"]
+
+def test_preflight_bulk_discovers_projects(tmp_path):
+    for name in ("svc-a", "svc-b"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "package.json").write_text('{"engines": {"node": ">=20"}}')
+    (tmp_path / "node_modules" / "dep").mkdir(parents=True)
+    (tmp_path / "node_modules" / "dep" / "package.json").write_text("{}")
+    r = client.post("/preflight/bulk", json={"root": str(tmp_path)})
+    assert r.status_code == 200
+    paths = [rep["path"] for rep in r.json()["reports"]]
+    assert [p.rsplit("/", 1)[-1] for p in paths] == ["svc-a", "svc-b"]
+
+def test_preflight_bulk_reuses_cache_and_pool(tmp_path, monkeypatch):
+    from repoguide_tools import preflight as pf
+    repos = []
+    for name in ("a", "b", "c"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "pyproject.toml").write_text("[project]\nrequires-python = '>=3.11'\n")
+        repos.append(str(tmp_path / name))
+    try:
+        first = pf.run_preflight_bulk(repos)
+        pool = pf._procs
+        assert pool is not None
+
+        monkeypatch.setattr(pf, "_processes", lambda: pytest.fail("cached results went to the pool"))
+        assert pf.run_preflight_bulk(repos) == first
+        (tmp_path / "a" / "pyproject.toml").write_text("[project]\nname = 'a'\n")
+        again = pf.run_preflight_bulk(repos)  # one stale repo is checked in-process
+        assert [c.status for c in again.reports[0].checks if c.name.startswith("Python")] == ["warn"]
+        monkeypatch.undo()
+
+        for name in ("b", "c"):
+            (tmp_path / name / "README.md").write_text("pytest")
+        pf.run_preflight_bulk(repos)
+        assert pf._procs is pool
+    finally:
+        pf.close_preflight()
@@ -0,0 +1,177 @@
+import pytest
+
+from repoguide_indexer import index_repo as idx
+from repoguide_retriever import hybrid, lexical
+
+@pytest.fixture
+def indexed(tmp_path, vector_store, fake_embeddings):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "auth.py").write_text("def check_auth(token: str) -> bool:\n    return token.startswith('Bearer ')\n")
+    (repo / "README.md").write_text("# Demo\nRun the service with docker compose up.\n")
+    (repo / "db.py").write_text("class SessionStore:\n    def get_session(self, sid): ...\n")
+    idx.index_local_repo(str(repo))
+    fake_embeddings.calls.clear()
+    return repo
+
+def test_tokenize_splits_identifiers():
+    assert lexical.tokenize("check_auth HTTPServerError") == [
+        "check_auth", "check", "auth", "httpservererror", "http", "server", "error",
+    ]
+
+def test_identifier_question_skips_embedding(indexed, fake_embeddings):
+    ans = hybrid.explain_from_qdrant("where is check_auth defined?")
+    assert ans.citations[0].file.startswith("auth.py")
+    assert fake_embeddings.calls == []
+
+def test_prose_question_fuses_dense_and_lexical(indexed, fake_embeddings):
+    ans = hybrid.explain_from_qdrant("how do I start it with docker compose")
+    assert ans.citations[0].file.startswith("README.md")
+    assert len(fake_embeddings.calls) == 1
+
+def test_lexical_index_follows_deletes(indexed):
+    (indexed / "auth.py").unlink()
+    idx.index_local_repo(str(indexed))
+    assert lexical.search(idx.COLLECTION, "check_auth") == []
+
+def test_lexical_commit_writes_only_the_change(tmp_path, monkeypatch):
+    monkeypatch.setenv("REPOGUIDE_STATE_DIR", str(tmp_path / "state"))
+    w = lexical.LexicalWriter("c", "r")
+    w.add((f"p{i}", [f"f{i}.py"], f"def h{i}(): return shared") for i in range(50))
+    w.commit()
+    d = lexical._dir("c", "r")
+    first = {f.name: f.stat().st_mtime_ns for f in d.glob("seg-*.bin")}
+    w.add([("p3", ["f3.py"], "def renamed(): pass"), ("new", ["new.py", "vendor/new.py"], "def hnew(): pass")])
+    w.delete(["p7"])
+    w.commit()
+    assert all(d.joinpath(n).stat().st_mtime_ns == m for n, m in first.items() if d.joinpath(n).exists())
+    assert [h.pid for h in lexical.search("c", "renamed")] == ["p3"]
+    assert lexical.search("c", "h3") == lexical.search("c", "h7") == []
+    assert [h.paths for h in lexical.search("c", "hnew")] == [("new.py", "vendor/new.py")]
+    assert len(lexical.search("c", "shared", limit=100)) == 48
+    for i in range(200):
+        w.add([(f"q{i}", [f"g{i}.py"], f"def late{i}(): pass")])
+        w.commit()
+    assert len(list(d.glob("seg-*.bin"))) <= 8
+    assert lexical.search("c", "late0")[0].pid == "q0"
+    w.close()
+
+def test_explain_reports_stage_timings(indexed, monkeypatch):
+    from fastapi.testclient import TestClient
+    from repoguide_api.main import app
+    from repoguide_metrics import timing
+
+    timing.reset()
+    http = TestClient(app)
+    r = http.post("/explain", json={"question": "how do I start it with docker compose"})
+    assert r.status_code == 200
+    stages = [part.split(";")[0] for part in r.headers["server-timing"].split(", ")]
+    assert stages == [
+        "explain.lexical", "embed.request", "explain.embed", "explain.search", "explain.hydrate", "total",
+    ]
+
+    text = http.get("/metrics").text
+    assert 'repoguide_stage_seconds_count{stage="explain.search"} 1' in text
+    assert 'repoguide_stage_seconds_bucket{stage="embed.request",le="+Inf"} 1' in text
+    assert 'repoguide_request_seconds_count{endpoint="explain",method="POST",status="200"} 1' in text
+
+    monkeypatch.setattr(timing, "ENABLED", False)
+    assert timing.span("explain.search") is timing.span("explain.embed")  # shared no-op
+
+def test_explain_batch_uses_one_embedding_call(indexed, fake_embeddings):
+    from fastapi.testclient import TestClient
+    from repoguide_api.main import app
+
+    questions = [
+        "how do I start it with docker compose",
+        "where is check_auth defined?",
+        "what stores the session",
+        "how do I start it with docker compose",
+    ]
+    r = TestClient(app).post("/explain/batch", json={"questions": questions})
+    assert r.status_code == 200
+    answers = r.json()["answers"]
+    assert len(answers) == 4
+    assert answers[0]["citations"][0]["file"].startswith("README.md")
+    assert answers[1]["citations"][0]["file"].startswith("auth.py")
+    assert answers[3] == answers[0]
+    assert fake_embeddings.calls == [[questions[0], questions[2]]]
+
+@pytest.fixture
+def two_repos(tmp_path, vector_store, fake_embeddings):
+    for name in ("alpha", "beta"):
+        repo = tmp_path / name
+        (repo / "src" / "api").mkdir(parents=True)
+        (repo / "src" / "api" / "routes.py").write_text(f"def {name}_route():\n    return 'serve {name} requests'\n")
+        (repo / "notes.md").write_text(f"# {name}\nDeploy {name} with docker compose up.\n")
+        idx.index_local_repo(str(repo))
+    fake_embeddings.calls.clear()
+    return tmp_path
+
+def test_scope_limits_results_to_one_repo(two_repos):
+    ans = hybrid.explain_from_qdrant("how do I deploy with docker compose", scope="beta")
+    assert ans.citations and all("beta" in b for b in ans.bullets)
+    scoped = hybrid.explain_from_qdrant("where is alpha_route defined?", scope="repo:beta")
+    assert not any("alpha" in b for b in scoped.bullets)
+    assert hybrid.explain_from_qdrant("where is alpha_route defined?").citations[0].file.startswith("src/api/routes.py")
+
+def test_scope_filters_by_path_and_language(two_repos, vector_store):
+    ans = hybrid.explain_from_qdrant("how do I deploy with docker compose", scope="repo:alpha path:src/api")
+    assert [c.file for c in ans.citations] == ["src/api/routes.py"]
+    assert hybrid.explain_from_qdrant("how do I deploy", scope="lang:markdown path:src") is None
+
+def test_scope_matches_every_copy_of_a_deduplicated_chunk(tmp_path, vector_store, fake_embeddings):
+    repo = tmp_path / "repo"
+    body = "def check_auth(token):\n    return token.startswith('Bearer ')\n"
+    for rel in ("aaa_vendor/auth.py", "src/api/auth.py"):
+        (repo / rel).parent.mkdir(parents=True)
+        (repo / rel).write_text(body)
+    idx.index_local_repo(str(repo))
+    assert vector_store.count(idx.COLLECTION) == 1
+    for scope in ("path:src/api", "path:src/api/auth.py"):
+        for q in ("where is check_auth defined?", "how are bearer tokens checked"):
+            assert [c.file for c in hybrid.explain_from_qdrant(q, scope=scope).citations] == ["src/api/auth.py"]
+    assert hybrid.explain_from_qdrant("where is check_auth defined?").citations[0].file == "aaa_vendor/auth.py"
+
+def test_dedicated_repo_gets_its_own_collection(tmp_path, vector_store, fake_embeddings, monkeypatch):
+    monkeypatch.setenv("REPOGUIDE_DEDICATED_REPOS", "big")
+    repo = tmp_path / "big"
+    repo.mkdir()
+    (repo / "core.py").write_text("def big_handler():\n    return 1\n")
+    idx.index_local_repo(str(repo))
+    assert vector_store.count(f"{idx.COLLECTION}__big") == 1
+    assert not vector_store.collection_exists(idx.COLLECTION)
+    assert hybrid.explain_from_qdrant("where is big_handler defined?").citations[0].file.startswith("core.py")
+
+def test_answer_cache_serves_repeats_until_reindex(indexed, fake_embeddings):
+    from fastapi.testclient import TestClient
+    from repoguide_api.main import app
+    from repoguide_retriever.answer_cache import get_answer_cache
+
+    http = TestClient(app)
+    ask = lambda q: http.post("/explain", json={"question": q}).json()
+    first = ask("how do I start it with docker compose")
+    assert ask("  how do I start it   with docker compose? ") == first
+    assert len(fake_embeddings.calls) == 1
+    assert get_answer_cache().stats()["hits"] >= 1
+    assert 'repoguide_answer_cache_total{result="hit"}' in http.get("/metrics").text
+
+    (indexed / "README.md").write_text("# Demo\nRun the service with docker compose up -d.\n")
+    idx.index_local_repo(str(indexed))
+    assert "up -d" in ask("how do I start it with docker compose")["bullets"][0]
+
+def test_shared_answer_cache_spans_workers(tmp_path):
+    from repoguide_retriever.answer_cache import MISS, AnswerCache
+    from repoguide_schemas.models import Answer
+    from repoguide_store.base import Scope
+
+    a, b = (AnswerCache(shared_path=tmp_path / "answers.sqlite3") for _ in range(2))
+    key = AnswerCache.key("What is X?", Scope.parse("repo:r"), ("gen1",))
+    assert b.get(key) is MISS
+    a.put(key, Answer(summary="s", bullets=["x"], citations=[]))
+    a.put(AnswerCache.key("nothing", Scope(), ("gen1",)), None)
+    assert b.get(AnswerCache.key("What  is X", Scope.parse("repo:r"), ("gen1",))).bullets == ["x"]
+    assert b.get(AnswerCache.key("nothing", Scope(), ("gen1",))) is None
+    assert b.get(AnswerCache.key("What is X?", Scope.parse("repo:r"), ("gen2",))) is MISS
+    a.close()
+    b.close()
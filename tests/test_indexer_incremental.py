@@ -0,0 +1,249 @@
+import httpx
+import numpy as np
+import pytest
+
+from repoguide_indexer import index_repo as idx
+from repoguide_indexer.chunking import chunk_file
+from repoguide_store.backend import get_text_store
+from conftest import fake_vector
+
+@pytest.fixture
+def qc(vector_store):
+    return vector_store
+
+@pytest.fixture
+def repo(tmp_path):
+    d = tmp_path / "repo"
+    d.mkdir()
+    return d
+
+def test_reindex_only_embeds_changes(qc, repo, fake_embeddings):
+    (repo / "a.py").write_text("def a():\n    return 1\n")
+    (repo / "b.md").write_text("# B\nsome docs\n")
+
+    assert idx.index_local_repo(str(repo)) == 2
+    assert qc.count(idx.COLLECTION) == 2
+
+    # unchanged tree: no embedding calls, no new points
+    fake_embeddings.calls.clear()
+    assert idx.index_local_repo(str(repo)) == 0
+    assert fake_embeddings.calls == []
+    assert qc.count(idx.COLLECTION) == 2
+
+    # one edit + one delete
+    (repo / "a.py").write_text("def a():\n    return 2\n")
+    (repo / "b.md").unlink()
+    assert idx.index_local_repo(str(repo)) == 1
+    assert fake_embeddings.embedded == 1
+    points = qc.search(idx.COLLECTION, np.ones(8, dtype=np.float32), limit=10)
+    assert [(p.payload["path"], p.payload["start_line"], p.payload["end_line"]) for p in points] == [("a.py", 1, 2)]
+    assert "text" not in points[0].payload
+    assert "return 2" in get_text_store().get_many([points[0].payload["chunk"]])[points[0].payload["chunk"]]
+
+@pytest.mark.parametrize("upsert_batch", ["1", "100"])  # 100: points still buffered in the sink at the failure
+def test_partial_progress_survives_failure(qc, repo, fake_embeddings, monkeypatch, upsert_batch):
+    monkeypatch.setenv("REPOGUIDE_EMBED_BATCH", "1")
+    monkeypatch.setenv("REPOGUIDE_UPSERT_BATCH", upsert_batch)
+    monkeypatch.setenv("REPOGUIDE_EMBED_CONCURRENCY", "1")
+    for i in range(4):
+        (repo / f"f{i}.txt").write_text(f"file number {i}\n")
+
+    fake_embeddings.fail_after = 2
+    with pytest.raises(httpx.HTTPStatusError):
+        idx.index_local_repo(str(repo), inflight=1)
+    assert qc.count(idx.COLLECTION) == 2
+
+    fake_embeddings.fail_after = None
+    fake_embeddings.calls.clear()
+    assert idx.index_local_repo(str(repo)) == 2
+    assert qc.count(idx.COLLECTION) == 4
+
+def test_cancelled_run_keeps_the_index(qc, repo, fake_embeddings):
+    from repoguide_indexer.pipeline import Aborted
+    from repoguide_indexer.progress import IndexProgress
+    (repo / "a.py").write_text("def a():\n    return 1\n")
+    idx.index_local_repo(str(repo))
+    (repo / "b.py").write_text("def b():\n    return 2\n")
+    progress = IndexProgress()
+    progress.cancel.set()
+    with pytest.raises(Aborted):
+        idx.index_local_repo(str(repo), progress=progress)
+    assert qc.count(idx.COLLECTION) == 1  # nothing walked is taken for deleted
+    assert idx.index_local_repo(str(repo)) == 1
+
+def test_embedding_requests_pack_to_token_budget(qc, repo, fake_embeddings, monkeypatch):
+    from repoguide_embeddings.batching import estimate_tokens
+    monkeypatch.setenv("REPOGUIDE_EMBED_BATCH_TOKENS", "400")
+    for i in range(12):
+        (repo / f"s{i}.txt").write_text(f"small note {i}\n")
+    for i in range(3):
+        (repo / f"b{i}.txt").write_text(f"big {i} " + "word " * 150 + "\n")
+
+    assert idx.index_local_repo(str(repo)) == 15
+    sizes = [sum(map(estimate_tokens, b)) for b in fake_embeddings.calls]
+    assert all(s <= 400 for s in sizes)
+    assert len(fake_embeddings.calls) < 15  # small chunks share requests
+
+def test_deleted_chunks_leave_the_text_store(qc, tmp_path, fake_embeddings):
+    one, two = tmp_path / "one", tmp_path / "two"
+    for d in (one, two):
+        d.mkdir()
+        (d / "shared.py").write_text("def shared():\n    return 'same in both repos'\n")
+    (one / "gone.py").write_text("def gone():\n    return 'only here'\n")
+    idx.index_local_repo(str(one))
+    idx.index_local_repo(str(two))
+    texts = get_text_store()
+    assert texts.stats()["chunks"] == 2
+
+    (one / "gone.py").unlink()
+    (one / "shared.py").unlink()
+    idx.index_local_repo(str(one))
+    # gone.py's text is dropped; shared.py's is still referenced by repo two
+    assert texts.stats()["chunks"] == 1
+    (hit,) = qc.search(idx.COLLECTION, np.ones(8, dtype=np.float32), limit=10)
+    assert "same in both repos" in texts.get_many([hit.payload["chunk"]])[hit.payload["chunk"]]
+
+def test_duplicate_chunks_share_one_point(qc, repo, fake_embeddings):
+    header = " ".join(f"w{i}" for i in range(300))
+    (repo / "LICENSE.txt").write_text(header + "\n")
+    (repo / "vendor").mkdir()
+    (repo / "vendor" / "LICENSE.txt").write_text(header + "\n")                      # exact copy
+    (repo / "NOTICE.txt").write_text(header.replace("w150", "changed") + "\n")        # near copy
+    (repo / "a.py").write_text("def a():\n    return 1\n")
+
+    progress = idx.IndexProgress()
+    assert idx.index_local_repo(str(repo), progress=progress) == 2
+    assert (progress.embeddings_saved, progress.near_duplicates) == (2, 1)
+    assert qc.count(idx.COLLECTION) == 2
+    hit, = [h for h in qc.search(idx.COLLECTION, fake_vector(header), limit=10) if h.payload["lang"] == "text"]
+    assert hit.payload["locations"] == ["LICENSE.txt:1-1", "NOTICE.txt:1-1", "vendor/LICENSE.txt:1-1"]
+    assert hit.payload["dirs"] == ["vendor"]
+
+    # the cluster outlives its first file and goes away with its last one
+    (repo / "LICENSE.txt").unlink()
+    (repo / "NOTICE.txt").unlink()
+    assert idx.index_local_repo(str(repo)) == 0
+    hit, = [h for h in qc.search(idx.COLLECTION, fake_vector(header), limit=10) if h.payload["lang"] == "text"]
+    assert (hit.payload["path"], hit.payload["locations"]) == ("vendor/LICENSE.txt", ["vendor/LICENSE.txt:1-1"])
+    (repo / "vendor" / "LICENSE.txt").unlink()
+    assert idx.index_local_repo(str(repo)) == 0
+    assert qc.count(idx.COLLECTION) == 1
+
+def test_python_chunks_follow_definitions():
+    body = "\n".join(f"    x{i} = {i}" for i in range(30))
+    src = (
+        "import os\n\n\n"
+        f"def big():\n{body}\n    return x0\n\n\n"
+        f"class Thing:\n    def one(self):\n{body.replace('    ', '        ')}\n\n"
+        "    def two(self):\n        return 2\n"
+    )
+    chunks = chunk_file("m.py", src, max_chars=400)
+    lines = src.splitlines()
+    starts = [lines[c.start_line - 1].strip() for c in chunks]
+    assert starts[0] == "import os"
+    assert "def big():" in starts and "def two(self):" in starts
+    assert all(a.end_line < b.start_line for a, b in zip(chunks, chunks[1:]))
+    assert all(len(c.text) <= 400 for c in chunks)
+
+def test_collection_uses_truncated_dim_and_store_settings(qdrant, repo, fake_embeddings, monkeypatch):
+    from qdrant_client.models import ScalarQuantization
+    from repoguide_store import qdrant as store
+
+    monkeypatch.setenv("REPOGUIDE_EMBED_DIM", "4")
+    monkeypatch.setenv("REPOGUIDE_QDRANT_ON_DISK", "1")
+    monkeypatch.setenv("REPOGUIDE_QDRANT_QUANTIZATION", "scalar")
+    (repo / "a.py").write_text("def a():\n    return 1\n")
+    idx.index_local_repo(str(repo))
+
+    params = qdrant.get_collection(idx.COLLECTION).config.params.vectors
+    assert (params.size, params.on_disk) == (4, True)
+    assert isinstance(store.quantization_config(), ScalarQuantization)
+    assert store.search_params().quantization.rescore is True
+
+def test_route_table_tracks_handlers_and_tests(qc, repo, fake_embeddings):
+    from fastapi.testclient import TestClient
+    from repoguide_api.main import app
+
+    (repo / "api.py").write_text(
+        "from fastapi import APIRouter\n"
+        "router = APIRouter(prefix='/items')\n"
+        "\n"
+        "@router.get('/{item_id}')\n"
+        "def read(item_id: int):\n"
+        "    return {}\n"
+        "\n"
+        "@bp.route('/login', methods=['GET', 'POST'])\n"
+        "def login():\n"
+        "    return 'ok'\n"
+    )
+    (repo / "tests").mkdir()
+    (repo / "tests" / "test_api.py").write_text(
+        "def test_read(client):\n"
+        "    assert client.get(f'/items/{42}').status_code == 200\n"
+    )
+    idx.index_local_repo(str(repo))
+    client = TestClient(app)
+
+    r = client.get("/api-info", params={"route": "/items/7", "method": "get", "repo": "repo"})
+    assert r.status_code == 200
+    body = r.json()
+    assert [(c["file"], c["start_line"], c["end_line"]) for c in body["code_paths"]] == [("api.py", 4, 6)]
+    assert [(c["file"], c["start_line"], c["end_line"]) for c in body["tests"]] == [("tests/test_api.py", 1, 2)]
+    assert client.get("/api-info", params={"route": "/login", "method": "POST"}).json()["code_paths"][0]["start_line"] == 8
+
+    # edits move the spans; a deleted handler stops resolving
+    (repo / "api.py").write_text("from flask import Blueprint\n\n\n@bp.route('/login', methods=['POST'])\ndef login():\n    return 'ok'\n")
+    idx.index_local_repo(str(repo), paths=["api.py"])
+    assert client.get("/api-info", params={"route": "/login", "method": "POST"}).json()["code_paths"][0]["start_line"] == 4
+    assert client.get("/api-info", params={"route": "/login", "method": "GET"}).status_code == 404
+    assert client.get("/api-info", params={"route": "/items/{id}"}).json()["code_paths"] == []
+
+def test_route_commit_rewrites_only_touched_buckets(tmp_path, monkeypatch):
+    from repoguide_indexer import routes
+
+    monkeypatch.setenv("REPOGUIDE_STATE_DIR", str(tmp_path / "state"))
+    w = routes.RouteWriter("c", "r")
+    w.update("users.py", b"@app.get('/users/{uid}')\ndef user(uid): ...\n")
+    w.update("health.py", b"@app.get('/health')\ndef health(): ...\n")
+    w.update("tests/test_users.py", b"def test_user(client):\n    client.get('/users/7')\n")
+    w.commit()
+    d = routes._dir("c", "r")
+    before = {f.name: f.stat().st_mtime_ns for f in d.glob("*.json")}
+    assert sorted(before) == ["GET.1.json", "GET.2.json", "routes.json"]
+
+    w.update("health.py", b"\n@app.get('/health')\ndef health(): ...\n")
+    w.commit()
+    after = {f.name: f.stat().st_mtime_ns for f in d.glob("*.json")}
+    assert [n for n in before if after[n] != before[n]] == ["GET.1.json"]
+    assert routes.lookup("GET", "/health", ["c"]) == ([("r", ("health.py", 2, 3))], [])
+    assert routes.lookup("GET", "/users/9", ["c"])[1] == [("r", ("tests/test_users.py", 1, 2))]
+
+    # the partition list is cached until a repo directory comes or goes
+    scans = []
+    real = routes.os.scandir
+    monkeypatch.setattr(routes.os, "scandir", lambda p: scans.append(p) or real(p))
+    routes.lookup("GET", "/health", ["c"])
+    assert scans == []
+    routes.RouteWriter("c", "other").close()
+    assert routes.partitions("c") == ["other", "r"] and len(scans) == 1
+
+    w.remove(["health.py"])
+    w.commit()
+    assert not (d / "GET.1.json").exists()
+    assert routes.lookup("GET", "/health", ["c"]) == ([], [])
+    w.close()
+
+def test_existing_collection_is_upgraded(qdrant, repo, fake_embeddings, monkeypatch):
+    from qdrant_client.models import PointStruct, VectorParams, Distance
+
+    monkeypatch.setenv("REPOGUIDE_EMBED_DIM", "4")
+    qdrant.create_collection(idx.COLLECTION, vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+    qdrant.upsert(idx.COLLECTION, [PointStruct(id=123, vector=[1, 0, 0, 0], payload={"source": "a.py:0", "text": "old"})])
+    indexed = []
+    monkeypatch.setattr(type(qdrant), "create_payload_index", lambda self, c, field, **kw: indexed.append(field))
+    (repo / "a.py").write_text("def a():\n    return 1\n")
+    idx.index_local_repo(str(repo))
+
+    assert qdrant.retrieve(idx.COLLECTION, [123]) == []
+    assert qdrant.count(idx.COLLECTION).count == 1
+    assert indexed == ["repo", "paths", "dirs", "langs"]
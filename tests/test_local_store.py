@@ -0,0 +1,78 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from repoguide_store import local
+from repoguide_store.local import LocalStore
+
+def _vec(*xs):
+    return np.asarray([xs], dtype=np.float32)
+
+def test_search_upsert_delete_and_reopen(tmp_path):
+    s = LocalStore(tmp_path)
+    assert not s.collection_exists("c") and s.search("c", _vec(1, 0)[0], 3) == []
+    s.ensure_collection("c", 2)
+    s.upsert("c", ["a", "b", "c"], np.asarray([[1, 0], [0, 1], [1, 1]], dtype=np.float32),
+             [{"n": "a"}, {"n": "b"}, {"n": "c"}])
+    hits = s.search("c", _vec(1, 0.1)[0], 2)
+    assert [h.id for h in hits] == ["a", "c"] and hits[0].payload == {"n": "a"}
+    assert hits[0].score == pytest.approx(0.995, abs=1e-3)
+
+    s.upsert("c", ["a"], _vec(0, 1), [{"n": "a2"}])      # overwrite moves the point
+    s.delete("c", ["b"])
+    s.set_payloads("c", [("c", {"n": "c2"})])
+    assert s.count("c") == 2
+    assert [h.id for h in s.search("c", _vec(0, 1)[0], 5)] == ["a", "c"]
+    assert s.retrieve("c", ["a", "b", "c"]) == {"a": {"n": "a2"}, "c": {"n": "c2"}}
+
+    other = LocalStore(tmp_path)                       # e.g. the API process
+    assert other.count("c") == 2
+    s.upsert("c", ["d"], _vec(1, 0), [{}])
+    assert [h.id for h in other.search("c", _vec(1, 0)[0], 1)] == ["d"]
+    with pytest.raises(ValueError):
+        s.upsert("c", ["e"], _vec(1, 0, 0), [{}])
+    s.close()
+    other.close()
+
+def test_compaction_rewrites_vectors(tmp_path, monkeypatch):
+    monkeypatch.setattr(local, "COMPACT_MIN_DEAD", 4)
+    s = LocalStore(tmp_path)
+    ids = [f"p{i}" for i in range(10)]
+    vecs = np.eye(10, dtype=np.float32)
+    s.upsert("c", ids, vecs, [{"i": i} for i in range(10)])
+    s.delete("c", ids[:6])
+    files = list((tmp_path / "c").glob("vectors-*.f32"))
+    assert len(files) == 1 and files[0].stat().st_size == 4 * 10 * 4
+    assert [h.id for h in s.search("c", vecs[8], 1)] == ["p8"]
+    assert s.retrieve("c", ["p9"]) == {"p9": {"i": 9}}
+    s.close()
+
+def test_text_store_dedupes_and_round_trips(tmp_path):
+    from repoguide_store.text import TextStore
+
+    s = TextStore(tmp_path / "chunks.sqlite3")
+    body = "def handler(request):\n    return ok\n" * 50
+    s.put_many("a", [("h1", body), ("h2", "é unicode"), ("h1", body)])
+    s.put_many("b", [("h1", "ignored: same hash means same text")])
+    assert s.get_many(["h1", "h2", "nope"]) == {"h1": body, "h2": "é unicode"}
+    st = s.stats()
+    assert st["chunks"] == 2 and st["bytes"] < len(body) // 4
+    # text goes once its last owner lets go of it
+    assert s.release("a", ["h1", "h2"]) == 1
+    assert s.get_many(["h1", "h2"]) == {"h1": body}
+    assert s.release("b") == 1
+    assert s.stats()["chunks"] == 0
+    s.close()
+
+def test_text_store_recovers_from_a_failed_write(tmp_path):
+    from repoguide_store.text import TextStore
+
+    s = TextStore(tmp_path / "chunks.sqlite3")
+    s.put_many("a", [("h1", "one")])
+    with pytest.raises(sqlite3.Error):
+        s.release("a", ["h1", object()])  # fails inside the transaction
+    assert s.get_many(["h1"]) == {"h1": "one"}  # rolled back, not half-applied
+    s.put_many("a", [("h2", "two")])
+    assert s.release("a") == 2
+    s.close()
@@ -0,0 +1,50 @@
+from repoguide_indexer.walker import iter_files, walk
+
+def _tree(root, files):
+    for rel, content in files.items():
+        p = root / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_bytes(content if isinstance(content, bytes) else content.encode())
+
+def test_walk_prunes_and_honors_gitignore(tmp_path):
+    _tree(tmp_path, {
+        ".gitignore": "generated/\n*.log.txt\n/top.md\n!keep.log.txt\n",
+        "top.md": "anchored ignore",
+        "docs/top.md": "not anchored here",
+        "a.py": "x = 1",
+        "keep.log.txt": "negated",
+        "noise.log.txt": "ignored",
+        "generated/out.py": "ignored",
+        "node_modules/pkg/index.py": "pruned",
+        ".git/HEAD.txt": "pruned",
+        "pkg/.gitignore": "local.py\n",
+        "pkg/local.py": "ignored by nested .gitignore",
+        "pkg/mod.py": "kept",
+        "image.png": b"\x89PNG",
+    })
+    assert [f.rel for f in walk(tmp_path)] == ["a.py", "keep.log.txt", "docs/top.md", "pkg/mod.py"]
+    assert [f.rel for f in walk(tmp_path, excludes=["pkg/"])] == ["a.py", "keep.log.txt", "docs/top.md"]
+
+def test_iter_files_skips_binary_oversized_and_unchanged(tmp_path):
+    _tree(tmp_path, {
+        "text.py": "print('hi')\n",
+        "blob.txt": b"abc\x00def",
+        "huge.md": "x" * 5000,
+        "same.md": "unchanged",
+    })
+    got = {ref.rel: data for ref, data in iter_files(
+        tmp_path, max_bytes=4096, workers=2, unchanged=lambda ref: ref.rel == "same.md",
+    )}
+    assert got == {"same.md": None, "text.py": b"print('hi')\n"}
+
+def test_walk_only_applies_the_same_rules(tmp_path):
+    _tree(tmp_path, {
+        ".gitignore": "generated/\n",
+        "a.py": "x", "b.py": "y",
+        "generated/out.py": "ignored dir",
+        "pkg/.gitignore": "local.py\n",
+        "pkg/local.py": "ignored", "pkg/mod.py": "kept", "pkg/sub/deep.md": "kept",
+        "image.png": b"\x89PNG",
+    })
+    only = ["b.py", "generated/out.py", "pkg/local.py", "pkg", "pkg/mod.py", "image.png", "gone.py"]
+    assert [f.rel for f in walk(tmp_path, only=only)] == ["b.py", "pkg/mod.py", "pkg/sub/deep.md"]
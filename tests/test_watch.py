@@ -0,0 +1,113 @@
+import queue, shutil, threading
+
+import pytest
+
+from repoguide_indexer import index_repo as idx
+from repoguide_indexer import watch
+
+def test_targeted_pass_only_touches_given_paths(tmp_path, vector_store, fake_embeddings):
+    repo = tmp_path / "repo"
+    (repo / "pkg").mkdir(parents=True)
+    (repo / "a.py").write_text("def a():\n    return 1\n")
+    (repo / "b.py").write_text("def b():\n    return 1\n")
+    (repo / "pkg" / "c.py").write_text("def c():\n    return 1\n")
+    assert idx.index_local_repo(str(repo)) == 3
+
+    (repo / "a.py").write_text("def a():\n    return 2\n")
+    (repo / "b.py").write_text("def b():\n    return 2\n")
+    progress = idx.IndexProgress()
+    assert idx.index_local_repo(str(repo), paths=["a.py"], progress=progress) == 1
+    assert progress.files_walked == 1
+
+    shutil.rmtree(repo / "pkg")
+    assert idx.index_local_repo(str(repo), paths=["pkg"]) == 0
+    assert vector_store.count(idx.COLLECTION) == 2
+    assert idx.index_local_repo(str(repo)) == 1  # the edit to b.py was left for a full pass
+
+@pytest.mark.parametrize("poll", [False, True], ids=["native", "poll"])
+def test_watch_picks_up_edits(tmp_path, vector_store, fake_embeddings, monkeypatch, poll):
+    if not poll and watch.watchfiles is None:
+        pytest.skip("watchfiles not installed")
+    monkeypatch.setenv("REPOGUIDE_WATCH_POLL_MS", "50")
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "a.py").write_text("def a():\n    return 1\n")
+    passes: queue.Queue = queue.Queue()
+    stop = threading.Event()
+    t = threading.Thread(
+        target=watch.watch_repo, args=(str(repo),),
+        kwargs={"quiet_ms": 50, "max_ms": 500, "poll": poll, "stop": stop, "on_pass": passes.put},
+    )
+    t.start()
+    try:
+        first = passes.get(timeout=10)
+        assert (first.paths, first.embedded) == (None, 1)
+        (repo / "b.py").write_text("def b():\n    return 1\n")
+        (repo / "a.py").unlink()
+        seen: set[str] = set()
+        while seen != {"a.py", "b.py"}:  # notifications may split the burst
+            got = passes.get(timeout=10)
+            assert got.error is None
+            seen |= set(got.paths)
+        assert vector_store.count(idx.COLLECTION) == 1
+    finally:
+        stop.set()
+        t.join(timeout=10)
+    assert not t.is_alive()
+
+@pytest.mark.parametrize("poll", [False, True], ids=["native", "poll"])
+def test_edits_during_the_first_pass_are_indexed(tmp_path, vector_store, fake_embeddings, monkeypatch, poll):
+    if not poll and watch.watchfiles is None:
+        pytest.skip("watchfiles not installed")
+    monkeypatch.setenv("REPOGUIDE_WATCH_POLL_MS", "50")
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "a.py").write_text("def a():\n    return 1\n")
+    real = watch.index_local_repo
+
+    def first_pass_then_edit(path, **kw):
+        n = real(path, **kw)
+        if kw.get("paths") is None and not (repo / "b.py").exists():
+            (repo / "b.py").write_text("def b():\n    return 2\n")  # lands after the walk
+        return n
+
+    monkeypatch.setattr(watch, "index_local_repo", first_pass_then_edit)
+    passes: queue.Queue = queue.Queue()
+    stop = threading.Event()
+    t = threading.Thread(
+        target=watch.watch_repo, args=(str(repo),),
+        kwargs={"quiet_ms": 50, "max_ms": 500, "poll": poll, "stop": stop, "on_pass": passes.put},
+    )
+    t.start()
+    try:
+        assert passes.get(timeout=10).paths is None
+        assert passes.get(timeout=10).paths == ["b.py"]
+        assert vector_store.count(idx.COLLECTION) == 2
+    finally:
+        stop.set()
+        t.join(timeout=10)
+    assert not t.is_alive()
+
+def test_poll_runs_full_pass_when_gitignore_changes(tmp_path, vector_store, fake_embeddings, monkeypatch):
+    monkeypatch.setenv("REPOGUIDE_WATCH_POLL_MS", "50")
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "a.py").write_text("def a():\n    return 1\n")
+    (repo / "secret.py").write_text("def secret():\n    return 1\n")
+    passes: queue.Queue = queue.Queue()
+    stop = threading.Event()
+    t = threading.Thread(
+        target=watch.watch_repo, args=(str(repo),),
+        kwargs={"quiet_ms": 50, "max_ms": 500, "poll": True, "stop": stop, "on_pass": passes.put},
+    )
+    t.start()
+    try:
+        assert passes.get(timeout=10).paths is None
+        (repo / ".gitignore").write_text("secret.py\n")
+        got = passes.get(timeout=10)
+        assert got.paths is None and got.error is None  # a full pass, not just ".gitignore"
+        assert vector_store.count(idx.COLLECTION) == 1
+    finally:
+        stop.set()
+        t.join(timeout=10)
+    assert not t.is_alive()